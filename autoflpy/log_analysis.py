@@ -11,6 +11,7 @@ import json
 import autoflpy.util.flight_log_code as flight_log_code
 import autoflpy.util.log_to_xlsx as log_to_xlsx
 import autoflpy.util.nearest_ICAO_finder as nearest_ICAO_finder
+from autoflpy.util.flight_store import STORE_EXTENSION
 from shutil import copyfile
 
 """
@@ -22,7 +23,10 @@ TODO:
 """
 
 
-def autoflpy(input_file='Input_File.json', include_metar=False, run_log_to_xlsx=True):
+def autoflpy(input_file='Input_File.json', include_metar=False, run_log_to_xlsx=True, streaming=False,
+             export_xlsx=False, workers=None, index=False, parse_workers=1, time_window=False,
+             xlsx_overflow="split", compact_values=False, values_compression=None, in_memory=False,
+             cache_workbooks=False, pickle_values=False):
     """autoflpy serves as the user interface for flight report generation.
 
     Upon first time running of the script, sample data will be used to create a sample flight report for the user to
@@ -35,9 +39,9 @@ def autoflpy(input_file='Input_File.json', include_metar=False, run_log_to_xlsx=
 
     user_files
         * csv_data                  Contains sample CSV data. User data in the form of a csv file can be added here.
-        * excel_file_path		    Contains excel files generated from the log files.
+        * excel_file_path		    Contains the flight data (and excel files if exported) generated from the log files.
         * flight_logs_generated		Contains the generated flight reports.
-        * log_files					Contains the user input flight data in the .log format.
+        * log_files					Contains the user input flight data in the .log or .bin format.
         * METAR_storage				This acts as a database for the METAR data.
 
     arguments:
@@ -46,8 +50,72 @@ def autoflpy(input_file='Input_File.json', include_metar=False, run_log_to_xlsx=
             works when data from a single flight is being analysed.
 
         run_log_to_xlsx=True
-            If set to False, xlsx files will not be generated which will save time. Do this if these files have already
-            been created. It will cause errors if the xlsx files are not present or in the wrong directory.
+            If set to False, the log files will not be read again which will save time. Do this if the flight data (or
+            xlsx files) have already been created. It will cause errors if they are not present or in the wrong
+            directory.
+
+        streaming=False
+            If set to True, the lines of each .log file are sorted into temporary files rather than being held in
+            memory, which keeps the memory used low for long flights.
+
+        export_xlsx=False
+            If set to True, an xlsx file is also written for each flight so that the data can be opened in a
+            spreadsheet. The flight reports are generated from the flight data (.flightdata) saved alongside it, so
+            this is not needed to generate them. The xlsx files are written from the flight data in the background
+            while the flight reports are generated, and any that could not be written are shown at the end.
+
+        workers=None
+            The number of flights read at the same time, each in its own process. If not given, the "workers" entry
+            of the "log_to_xlsx_input" in the Input_File.json is used, and flights are read one at a time if that is
+            blank or missing. On Windows, scripts using more than one worker need to call autoflpy from within an
+            if __name__ == "__main__": block.
+
+        index=False
+            If set to True, an index of where each data source is in each .log file is saved next to it, so that
+            when the log is read again (for example after a data source has been added to Data_sources.txt) only the
+            lines needed are read from it.
+
+        parse_workers=1
+            The number of processes each .log file is split between to be parsed, which speeds up reading a single
+            long log. The data read is the same as when it is parsed in one process. This is not used when streaming.
+
+        time_window=False
+            If set to True, only the data recorded between the start_time_hours and end_time_hours (UTC) of each
+            flight in the Input_File.json is read from its log, found using the GPS time in the log. This saves time
+            and memory when a long log contains bench testing as well as the flight. Logs without GPS time are read
+            in full.
+
+        xlsx_overflow="split"
+            How a data source with more rows than fit on an xlsx sheet (1,048,576) is written when export_xlsx is
+            True: "split" writes its rows across numbered sheets (IMU, IMU.2, ...), which are joined back together
+            when the xlsx file is read, and "decimate" writes only every n-th row so that it fits on one sheet.
+
+        compact_values=False
+            If set to True, the data used by the flight reports is saved in less space without changing it: float
+            channels logged with few enough decimal places are saved as float32, increasing channels such as time
+            are saved as the differences between their values and integers are saved with the smallest type that
+            holds them. The largest float32 error of each channel can be found with values_store.compact_report().
+
+        values_compression=None
+            Set to "zlib" or "lzma" to compress the data used by the flight reports (losslessly). It is then
+            read more slowly, as it can no longer be memory mapped.
+
+        in_memory=False
+            If set to True, the data read from each log is compiled for the flight reports straight from memory,
+            without saving the flight data (.flightdata) and reading it back, which saves time when the flight data
+            is not needed again. The logs are then always read in full, and export_xlsx and run_log_to_xlsx=False
+            can not be used.
+
+        cache_workbooks=False
+            If set to True, the data read from xlsx files (made by older versions of AutoFLpy) is cached in the
+            .autoflpy/workbook_cache folder of the user's home directory, so that an xlsx file is only read again
+            once it has changed.
+
+        pickle_values=False
+            If set to True, the data used by the flight reports is saved as a single .pkl file rather than a .values
+            folder: a pickle (protocol 5) with the data of each channel saved as an array after it, which the flight
+            reports read straight from the file without copying it. compact_values and values_compression can not be
+            used with it.
     """
     # Finds the file path from where this code is being run.
     base_path = os.path.join(os.path.dirname(__file__), "data") + os.sep
@@ -130,6 +198,20 @@ def autoflpy(input_file='Input_File.json', include_metar=False, run_log_to_xlsx=
     # Generates an appropriate file name
     excel_file_names = name_generator.excel_file_name_updater(flight_dates, flight_numbers)
 
+    # Finds the number of flights to be read at the same time
+    if workers is None:
+        try:
+            workers = data["log_to_xlsx_input"]["workers"]
+        except KeyError:
+            workers = 1
+        if str(workers).strip() == "":
+            workers = 1
+    try:
+        workers = int(workers)
+    except ValueError:
+        print("'workers' is not a whole number in the Input_File.json. Flights will be read one at a time.")
+        workers = 1
+
     # Imports custom weather data entered into the input file
     try:
         weather_data_multi = data["weather_data"]
@@ -160,31 +242,69 @@ def autoflpy(input_file='Input_File.json', include_metar=False, run_log_to_xlsx=
     aircraft_data_lists = flight_log_code.multi_dictionary_data_formatter(
         aircraft_data_multi, flight_dates, "aircraft_data")
 
-    if run_log_to_xlsx is True:
-        # Runs the xlsx converter
-        log_to_xlsx.log_reader_multi(log_file_paths,
-                                     name_converter_file_path,
-                                     data_sources_path,
-                                     excel_file_path,
-                                     excel_file_names,
-                                     flight_dates,
-                                     flight_numbers,
-                                     weather_data_lists,
-                                     runway_data_lists,
-                                     aircraft_data_lists)
-    else:
-        print("log_to_xlsx has been disabled. This will cause errors if .xlsx data has not been generated previously or"
-              " is not in the correct folder.")
-
     start_times_hours = flight_log_code.multi_string_data_formatter(
         data["flight_log_generator_input"]["start_time_hours"], flight_dates, "start_time_hours")
     end_times_hours = flight_log_code.multi_string_data_formatter(
         data["flight_log_generator_input"]["end_time_hours"], flight_dates, "end_time_hours")
+    time_windows = None
+    if time_window is True:
+        # The start and end hours of each flight, which are used to read only that part of its log.
+        time_windows = []
+        for flight in range(len(flight_dates)):
+            try:
+                time_windows.append([float(start_times_hours[flight]), float(end_times_hours[flight])])
+            except (IndexError, ValueError):
+                print("No time window has been entered for flight {}, so all of its log will be read."
+                      .format(flight_numbers[flight]))
+                time_windows.append(None)
+
+    if pickle_values is True and (compact_values is True or values_compression is not None):
+        raise ValueError("compact_values and values_compression can not be used with pickle_values=True, as they are "
+                         "only used for .values folders")
+    if in_memory is True and (run_log_to_xlsx is False or export_xlsx is True):
+        raise ValueError("in_memory can not be used with run_log_to_xlsx=False, as the logs have to be read, or with "
+                         "export_xlsx=True, as no flight data is saved to write the xlsx files from")
+    # xlsx files being written in the background
+    xlsx_exports = None
+    # Data frames of each flight read from its log, when the flight data is not saved
+    frame_lists = None
+    if run_log_to_xlsx is True:
+        # Runs the xlsx converter. The xlsx files are written afterwards from the flight data saved, so the flight
+        # reports do not have to wait for them.
+        frame_lists = log_to_xlsx.log_reader_multi(log_file_paths,
+                                                   name_converter_file_path,
+                                                   data_sources_path,
+                                                   excel_file_path,
+                                                   excel_file_names,
+                                                   flight_dates,
+                                                   flight_numbers,
+                                                   weather_data_lists,
+                                                   runway_data_lists,
+                                                   aircraft_data_lists,
+                                                   streaming,
+                                                   False,
+                                                   workers,
+                                                   index,
+                                                   parse_workers,
+                                                   time_windows,
+                                                   xlsx_overflow,
+                                                   in_memory=in_memory)
+        if export_xlsx is True:
+            xlsx_exports = log_to_xlsx.xlsx_export_starter(excel_file_path, excel_file_names, xlsx_overflow)
+    else:
+        print("log_to_xlsx has been disabled. This will cause errors if flight data has not been generated previously"
+              " or is not in the correct folder.")
+
     csv_flight_data_names = flight_log_code.multi_string_data_formatter(
         data["flight_log_generator_input"]["csv_flight_data_name"], flight_dates, "csv_flight_data_name")
     flight_data_file_names = []
     for name in excel_file_names:
-        flight_data_file_names.append(str(name) + ".xlsx")
+        # Uses the xlsx file if no flight data has been saved, for xlsx files made by older versions.
+        if os.path.exists(excel_file_path + os.sep + str(name) + STORE_EXTENSION) is False and \
+                os.path.exists(excel_file_path + os.sep + str(name) + ".xlsx") is True:
+            flight_data_file_names.append(str(name) + ".xlsx")
+        else:
+            flight_data_file_names.append(str(name) + STORE_EXTENSION)
 
     # Assigns variables - checks if any information is entered into the input
     # file for the directories before creating new directories in the current
@@ -282,29 +402,45 @@ def autoflpy(input_file='Input_File.json', include_metar=False, run_log_to_xlsx=
     # Finds the nearest airfield for METAR information
     if include_metar is True:
         icao_airfields = nearest_ICAO_finder.multi_icao_finder(flight_data_file_path,
-                                                               flight_data_file_names, excel_file_names)
+                                                               flight_data_file_names, excel_file_names,
+                                                               frame_lists)
     else:
         # ICAO airfields not required
         icao_airfields = []
 
-    # Runs the flight log generator
-    flight_log_code.flight_log_maker(template_file_path,
-                                     template_file_name,
-                                     flight_log_file_path,
-                                     flight_data_file_path,
-                                     flight_data_file_names,
-                                     csv_flight_data_file_path,
-                                     csv_flight_data_names,
-                                     flight_dates,
-                                     flight_numbers,
-                                     flight_log_file_name_header,
-                                     icao_airfields,
-                                     start_times_hours,
-                                     end_times_hours,
-                                     metar_file_path,
-                                     weather_data_lists,
-                                     runway_data_lists,
-                                     include_metar)
+    try:
+        # Runs the flight log generator
+        flight_log_code.flight_log_maker(template_file_path,
+                                         template_file_name,
+                                         flight_log_file_path,
+                                         flight_data_file_path,
+                                         flight_data_file_names,
+                                         csv_flight_data_file_path,
+                                         csv_flight_data_names,
+                                         flight_dates,
+                                         flight_numbers,
+                                         flight_log_file_name_header,
+                                         icao_airfields,
+                                         start_times_hours,
+                                         end_times_hours,
+                                         metar_file_path,
+                                         weather_data_lists,
+                                         runway_data_lists,
+                                         include_metar,
+                                         compact=compact_values,
+                                         compression=values_compression,
+                                         frame_lists=frame_lists,
+                                         use_cache=cache_workbooks,
+                                         pickle_values=pickle_values)
+    except Exception:
+        if xlsx_exports is not None:
+            # The xlsx files are still waited for, but any that could not be written are only shown, so that the
+            # error from the flight reports is the one raised.
+            log_to_xlsx.xlsx_export_finisher(xlsx_exports, raise_failures=False)
+        raise
+    if xlsx_exports is not None:
+        # Waits for the xlsx files to be written, and shows any that could not be.
+        log_to_xlsx.xlsx_export_finisher(xlsx_exports)
 
 
 if __name__ == "__main__":
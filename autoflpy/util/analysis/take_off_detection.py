@@ -1,4 +1,5 @@
 import numpy as np
+from autoflpy.util.flight_dataset import channel_index
 
 
 def take_off_point_finder(values_list, alt_sensitivity=0.3, groundspeed_sensitivity=0.3):
@@ -9,33 +10,15 @@ def take_off_point_finder(values_list, alt_sensitivity=0.3, groundspeed_sensitiv
 
     The same method is also used on the gps groundspeed data to give an idea of the take-off run.
 
+    values_list can also be a FlightDataset (see flight_dataset.py).
+
     Returns:    take_off_time_alt (take-off time from the altitude data),
                 take_off_groundspeed (at the altitude take-off time),
                 take_off_time_spd (take-off time from the groundspeed data i.e. start of the take-off run)"""
 
-    # Imports GPS data
-    gps_index = [["altitude", "gps"], ["groundspeed", "gps"], ["time", "gps"]]
-    gps_data = []
-
-    for index in gps_index:
-        values_list_index = 0
-        # sets value_found to a default of False
-        # Checks to see if the 'data source' recorded in the graph list
-        # matches the 'data sources' in the list structure values_list.
-        for values_list_data in values_list[0][1]:
-            # Finds data source.
-            if index[1] == values_list_data[0].lower():
-                index.append(values_list_index)
-                # Finds corresponding time source.
-                # Goes through each column searching for a match.
-                for column in values_list[0][1][values_list_index][1:]:
-                    # Checks to see if they have the same title.
-                    if column[0].lower() == index[0]:
-                        # if they do then the data is appended.
-                        gps_data.append(column)
-                        # exits for loop if data has been appended.
-                        break
-            values_list_index += 1
+    # Imports GPS data, using an index of the GPS channels.
+    flight_index = channel_index(values_list, ["gps"])[0]
+    gps_data = [flight_index[("gps", name)][0] for name in ["altitude", "groundspeed", "time"]]
 
     # find the runway altitude from the initial altitude points and uses a root mean squared error to determine the
     # point of unacceptable altitude variation (take-off).
@@ -45,15 +28,15 @@ def take_off_point_finder(values_list, alt_sensitivity=0.3, groundspeed_sensitiv
     ground_alt_data, mean_ground_alt, take_off_data_point_alt, alt_error = \
         significant_data_change_via_rms_error(alt_data, alt_sensitivity)
 
-    take_off_time_alt = gps_data[2][2][take_off_data_point_alt]
-    take_off_groundspeed = gps_data[1][2][take_off_data_point_alt]
+    take_off_time_alt = float(gps_data[2][2][take_off_data_point_alt])
+    take_off_groundspeed = float(gps_data[1][2][take_off_data_point_alt])
 
     # Repeats the process for groundspeed
     spd_data = gps_data[1][2]
     ground_spd_data, mean_ground_spd, take_off_data_point_spd, spd_error = \
         significant_data_change_via_rms_error(spd_data, groundspeed_sensitivity)
 
-    take_off_time_spd = gps_data[2][2][take_off_data_point_spd]
+    take_off_time_spd = float(gps_data[2][2][take_off_data_point_spd])
 
     return round(take_off_time_alt, 2), round(take_off_groundspeed, 2), round(take_off_time_spd, 2)
 
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+Reads ArduPilot DataFlash .bin logs directly, without first converting them to
+a .log file in mission planner.
+
+Every message in a .bin log starts with the two header bytes 0xA3 0x95 and a
+message type byte. The layout of each message type is described by the FMT
+messages in the log itself, which are decoded here into NumPy structured
+dtypes so that all of the messages of one type can be read into columns at
+once.
+
+@author: Adrian Weishaeupl
+aw6g15@soton.ac.uk 2019
+"""
+
+import struct
+import numpy as np
+
+# Header bytes at the start of every message.
+HEAD_1 = 0xA3
+HEAD_2 = 0x95
+# The FMT message describes itself and always has the following type and length.
+FMT_TYPE = 128
+FMT_LENGTH = 89
+FMT_STRUCT = struct.Struct("<BB4s16s64s")
+
+# NumPy types for each of the DataFlash format characters.
+FORMAT_DTYPES = {
+    "a": ("<i2", (32,)),
+    "b": "i1",
+    "B": "u1",
+    "h": "<i2",
+    "H": "<u2",
+    "i": "<i4",
+    "I": "<u4",
+    "f": "<f4",
+    "d": "<f8",
+    "n": "S4",
+    "N": "S16",
+    "Z": "S64",
+    "c": "<i2",
+    "C": "<u2",
+    "e": "<i4",
+    "E": "<u4",
+    "L": "<i4",
+    "M": "u1",
+    "q": "<i8",
+    "Q": "<u8",
+}
+
+# Format characters which are stored as integers but represent scaled values. These are divided by the value given
+# to match the values written to .log files by mission planner.
+FORMAT_DIVISORS = {
+    "c": 100,
+    "C": 100,
+    "e": 100,
+    "E": 100,
+    "L": 10 ** 7,
+}
+
+
+def format_dtype(message_format):
+    """Returns the NumPy structured dtype of the payload of a message with the DataFlash format message_format."""
+    return np.dtype([("f" + str(index), FORMAT_DTYPES[message_format[index]])
+                     for index in range(len(message_format))])
+
+
+def bin_log_reader(bin_file_path, message_types=None):
+    """Reads a DataFlash .bin log.
+
+    Returns fmt_lines, a list of the FMT messages in the log in the same form as the split FMT lines of a .log file
+    (["FMT", type, length, name, format, columns]), and message_columns, a dictionary with the message type name as
+    the key and a list of NumPy arrays, one per column in the order of the FMT columns, as the value. If message_types
+    is given, only the messages of those types are decoded."""
+    with open(bin_file_path, "rb") as bin_file:
+        data = bin_file.read()
+
+    fmt_lines = []
+    # Message type number: [name, format, columns, length]
+    formats = {FMT_TYPE: ["FMT", "BBnNZ", "Type,Length,Name,Format,Columns", FMT_LENGTH]}
+    # Message type number: list of the offsets of each message of that type.
+    offsets = {}
+    position = 0
+    end = len(data)
+    # Walks through the messages to find where each one starts. The payloads are decoded afterwards.
+    while position + 3 <= end:
+        if data[position] != HEAD_1 or data[position + 1] != HEAD_2:
+            # Corrupt data is skipped until the next header.
+            position = data.find(bytes([HEAD_1, HEAD_2]), position + 1)
+            if position == -1:
+                break
+            continue
+        message_type = data[position + 2]
+        try:
+            length = formats[message_type][3]
+        except KeyError:
+            # Unknown message types cannot be skipped over, so the search continues from the next byte.
+            position += 1
+            continue
+        if position + length > end:
+            # The last message was cut off when the log was written.
+            break
+        if message_type == FMT_TYPE:
+            new_type, new_length, name, message_format, columns = FMT_STRUCT.unpack_from(data, position + 3)
+            name = name.rstrip(b"\x00").decode("ascii", "replace")
+            message_format = message_format.rstrip(b"\x00").decode("ascii", "replace")
+            columns = columns.rstrip(b"\x00").decode("ascii", "replace")
+            formats[new_type] = [name, message_format, columns, new_length]
+            fmt_lines.append(["FMT", str(new_type), str(new_length), name, message_format, columns])
+        try:
+            offsets[message_type].append(position)
+        except KeyError:
+            offsets[message_type] = [position]
+        position += length
+
+    # Reads each message type into columns.
+    raw = np.frombuffer(data, dtype=np.uint8)
+    message_columns = {}
+    for message_type in offsets:
+        name, message_format, columns, length = formats[message_type]
+        if message_type == FMT_TYPE:
+            continue
+        if message_types is not None and name not in message_types:
+            continue
+        try:
+            dtype = format_dtype(message_format)
+        except KeyError:
+            print("Unknown format {0} for {1}, this message type has been skipped.".format(message_format, name))
+            continue
+        if dtype.itemsize != length - 3:
+            print("Length of {0} does not match its format, this message type has been skipped.".format(name))
+            continue
+        # Gathers the payload of every message of this type into one contiguous block.
+        payload_offsets = np.array(offsets[message_type], dtype=np.int64) + 3
+        payload = raw[payload_offsets[:, None] + np.arange(dtype.itemsize)]
+        records = np.ascontiguousarray(payload).view(dtype).ravel()
+        message_columns[name] = [column_converter(records["f" + str(index)], message_format[index])
+                                 for index in range(len(message_format))]
+    return fmt_lines, message_columns
+
+
+def column_converter(column, format_character):
+    """Converts a column read from a .bin log to the values written in a .log file: scaled values are divided down to
+    floats, integers become int64 (or stay uint64 if they are above the range of int64, as when they are read from a
+    .log file), floats become float64 and strings are decoded. Flight modes (M) are kept as their numbers."""
+    if format_character in FORMAT_DIVISORS:
+        return column / FORMAT_DIVISORS[format_character]
+    if format_character in "nNZ":
+        return np.char.decode(column, "ascii", "replace")
+    if format_character == "a":
+        # Arrays are written as a single value.
+        return np.array([str(list(value)) for value in column])
+    if column.dtype == np.uint64 and (column > np.iinfo(np.int64).max).any():
+        return column
+    if column.dtype.kind in "iu":
+        return column.astype(np.int64)
+    if column.dtype == np.float32:
+        return float32_rounder(column)
+    return column.astype(np.float64)
+
+
+def float32_rounder(column):
+    """Rounds float32 values to the 7 significant figures mission planner writes to a .log file, so that 1.348 is
+    read as 1.348 rather than 1.34800005."""
+    values = column.astype(np.float64)
+    rounded = np.isfinite(values) & (values != 0)
+    exponent = np.zeros(len(values))
+    exponent[rounded] = np.floor(np.log10(np.abs(values[rounded])))
+    digits = 6 - exponent
+    # Negative powers of ten are not exact, so values are only ever multiplied or divided by positive powers.
+    up = 10.0 ** np.maximum(digits, 0)
+    down = 10.0 ** np.maximum(-digits, 0)
+    values[rounded] = (np.round(values * up / down) * down / up)[rounded]
+    return values
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+An object model of the compiled flight data used by the flight reports (the
+values_list made by flight_log_code.flight_data_and_axis(), with the
+structure [[flight, [[data source, [name, unit, data], ...], ...]], ...]).
+
+A FlightDataset holds a Channel for every [name, unit, data] of the
+values_list, with its data as an array, and indexes the channels of each
+flight by data source and name (in any case), so a channel is found without
+searching every data source. Its values_list attribute is a view of the
+channels with the structure of the values_list, for code written for it.
+
+The same index is built for a values_list by channel_index(). The flight
+reports load their data as a FlightDataset, whose index is built once and
+used by every figure plotted from it, while the plotting functions build the
+index of a values_list once per figure.
+
+@author: Adrian Weishaeupl
+aw6g15@soton.ac.uk 2019
+"""
+
+import numpy as np
+from autoflpy.util.values_store import LazyChannel, column_converter, values_list_reader
+
+
+def array_converter(column):
+    """Returns the data of a channel as an array, from an array, a list, the path of a .npy file (memory mapped) or a
+    function returning an array. Values of mixed types are kept in an object array."""
+    if isinstance(column, str):
+        return np.load(column, mmap_mode="r", allow_pickle=False)
+    if callable(column):
+        column = column()
+    array = column_converter(column)
+    return np.array(list(column), dtype=object) if array is None else array
+
+
+def channel_indexer(flight_sources, data_sources=None):
+    """Returns the index of the channels of each flight, given the data sources of each flight ([[data source,
+    [name, unit, data], ...], ...], as in a values_list). The index of a flight is a dictionary of the channels with
+    each lower case data source and name, in the order of the values_list. A data source may be split into more than
+    one group of channels (one per time column), in which case the first matching channel of each group is kept.
+
+    If data_sources is given, only the channels of those data sources (in any case) are indexed."""
+    if data_sources is not None:
+        data_sources = set(data_source.lower() for data_source in data_sources)
+    index = []
+    for sources in flight_sources:
+        flight_index = {}
+        for source in sources:
+            if data_sources is not None and source[0].lower() not in data_sources:
+                continue
+            group_keys = set()
+            for channel in source[1:]:
+                key = (source[0].lower(), channel[0].lower())
+                if key not in group_keys:
+                    group_keys.add(key)
+                    flight_index.setdefault(key, []).append(channel)
+        index.append(flight_index)
+    return index
+
+
+def channel_index(values_list, data_sources=None):
+    """Returns the index (see channel_indexer()) of the channels of a values_list or FlightDataset. The index of a
+    FlightDataset is the one built with it (of all its data sources), and the index of a values_list is built from
+    its current channels each time, so a function making several lookups builds it once and passes it on."""
+    if isinstance(values_list, FlightDataset):
+        return values_list.index
+    return channel_indexer([flight[1] for flight in values_list], data_sources)
+
+
+class Channel:
+    """A channel of a flight, with its data source, name, unit and data. The data is an array, converted from the
+    column it is made with the first time it is used. A channel can also be used as the [name, unit, data] list it
+    replaces in a values_list."""
+
+    __slots__ = ("source", "name", "unit", "column", "_data")
+
+    def __init__(self, source, name, unit, column):
+        self.source = source
+        self.name = name
+        self.unit = unit
+        self.column = column
+        self._data = None
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = array_converter(self.column)
+            self.column = None
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._data = array_converter(value)
+        self.column = None
+
+    def __getitem__(self, index):
+        # The name and unit are given without reading the data.
+        if index in [0, -3]:
+            return self.name
+        if index in [1, -2]:
+            return self.unit
+        return [self.name, self.unit, self.data][index]
+
+    def __setitem__(self, index, value):
+        if index in [0, -3]:
+            self.name = value
+        elif index in [1, -2]:
+            self.unit = value
+        elif index in [2, -1]:
+            self.data = value
+        else:
+            raise IndexError("Channel index out of range")
+
+    def __len__(self):
+        return 3
+
+    def __iter__(self):
+        return iter([self.name, self.unit, self.data])
+
+    def __repr__(self):
+        return "Channel({0!r}, {1!r}, {2!r})".format(self.source, self.name, self.unit)
+
+
+class OffsetChannel:
+    """A view of a channel, [name, unit, data], with an offset added to its data (such as a time offset). The channel
+    is not changed, and the offset is added to its data (as floats) the first time the data is used."""
+
+    __slots__ = ("channel", "offset", "_data")
+
+    def __init__(self, channel, offset):
+        self.channel = channel
+        self.offset = offset
+        self._data = None
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = np.asarray(self.channel[2], dtype=float) + self.offset
+        return self._data
+
+    def __getitem__(self, index):
+        if index in [0, -3, 1, -2]:
+            return self.channel[index]
+        return [self.channel[0], self.channel[1], self.data][index]
+
+    def __len__(self):
+        return 3
+
+    def __iter__(self):
+        return iter([self.channel[0], self.channel[1], self.data])
+
+    def __repr__(self):
+        return "OffsetChannel({0!r}, {1!r})".format(self.channel[0], self.offset)
+
+
+class FlightDataset:
+    """The channels of one or more flights, indexed by flight, data source and name. flights is the list of flight
+    identifiers, and values_list is a view of the channels as a values_list (see the module docstring)."""
+
+    __slots__ = ("flights", "values_list", "index")
+
+    def __init__(self, values_list):
+        self.flights = []
+        self.values_list = []
+        for flight, sources in values_list:
+            flight_sources = []
+            for source in sources:
+                channels = [source[0]]
+                for channel in source[1:]:
+                    if isinstance(channel, LazyChannel) and channel.loaded is False:
+                        # The data is read from the column of the lazy channel when it is used.
+                        channels.append(Channel(source[0], channel[0], channel[1], channel.column))
+                    else:
+                        channels.append(Channel(source[0], channel[0], channel[1], channel[2]))
+                flight_sources.append(channels)
+            self.flights.append(flight)
+            self.values_list.append([flight, flight_sources])
+        # The channels of each flight, by their lower case data source and name.
+        self.index = channel_indexer([flight[1] for flight in self.values_list])
+
+    @classmethod
+    def from_file(cls, data_file_path):
+        """Returns the FlightDataset saved at data_file_path (read with values_store.values_list_reader()). The data
+        of each channel is read when it is first used."""
+        return cls(values_list_reader(data_file_path))
+
+    def channels(self, source, name, flight=0):
+        """Returns the list of channels of a flight with a data source and name, in the order of the values_list.
+        There is usually one, unless the data source has more than one time column."""
+        return self.index[flight].get((source.lower(), name.lower()), [])
+
+    def channel(self, source, name, flight=0):
+        """Returns the first channel of a flight with a data source and name, or None if there is not one."""
+        channels = self.channels(source, name, flight)
+        return channels[0] if channels else None
+
+    def __len__(self):
+        return len(self.flights)
+
+    def __getitem__(self, flight):
+        # Indexed as the values_list.
+        return self.values_list[flight]
+
+    def __iter__(self):
+        return iter(self.values_list)
@@ -1,16 +1,23 @@
 
 import pandas as pd
+from collections import namedtuple
+from functools import lru_cache
 import pickle as pk
 import os
 from openpyxl import load_workbook
+from autoflpy.util.flight_store import STORE_EXTENSION, store_reader
+from autoflpy.util.log_to_xlsx import CHUNK_SEPARATOR
+from autoflpy.util.workbook_cache import cache_reader, cache_writer
+from autoflpy.util.values_store import VALUES_EXTENSION, pickle5_available, values_pickle_writer, values_store_writer
 from autoflpy.util.metar_processing import *
 from autoflpy.util.text_manipulation import *
 
 
 """
 Flight Report Generation Code.
-This code takes flight data in the form of an .xlsx document (generated from a
-.log file in log_to_xlsx.py) or a correctly formatted .csv and plots and
+This code takes flight data in the form of a flight store or an .xlsx document
+(generated from a .log file in log_to_xlsx.py) or a correctly formatted .csv
+and plots and
 formats the data to be displayed using a template .ipynb file.
 
 @author Adrian Weishaeupl
@@ -34,9 +41,15 @@ def flight_log_maker(template_file_path, template_file_name,
                      csv_flight_data_names, flight_dates, flight_numbers,
                      flight_log_file_name_header, icao_airfields, start_times_hours,
                      end_times_hours, metar_file_path, weather_data_lists, runway_data_lists,
-                     include_metar):
+                     include_metar, compact=False, compression=None, frame_lists=None, use_cache=False,
+                     pickle_values=False):
     """This code will edit a specified template and return the result that has
-    been produced after the substitution of data into the template."""
+    been produced after the substitution of data into the template.
+
+    The data used by the flight log is saved as a values store, or as a pickle with the data of each channel saved
+    out-of-band if pickle_values is True (see compile_and_compress()).
+
+    compact, compression, frame_lists and use_cache are passed to compile_and_compress()."""
     print('Starting Flight Log Maker')
     # Sets the number of flights for iterating through the data lists
     number_of_flights = len(flight_dates)
@@ -68,9 +81,10 @@ def flight_log_maker(template_file_path, template_file_name,
     # suitable length to that it is not just greater than 1.
     directories_present = []
     for flight in range(number_of_flights):
-        if (os.path.exists(flight_data_file_path + os.sep + flight_data_file_names[flight])
-            is True and
-            len(flight_data_file_path + os.sep + flight_data_file_names[flight]) > 1) \
+        if (frame_lists is not None and frame_lists[flight] is not None) or \
+            (os.path.exists(flight_data_file_path + os.sep + flight_data_file_names[flight])
+             is True and
+             len(flight_data_file_path + os.sep + flight_data_file_names[flight]) > 1) \
             or \
             (os.path.exists(csv_flight_data_file_path + os.sep +
                             csv_flight_data_names[flight]) is True and
@@ -80,11 +94,12 @@ def flight_log_maker(template_file_path, template_file_name,
         else:
             directories_present.append(False)
         # Assigns file name based on excel data
-        compressed_data_file_name += str(flight_data_file_names[flight])[:-5] + "-"  # [:-5] removes the ".xslx"
+        # Removes the ".xlsx" or ".flightdata" extension
+        compressed_data_file_name += os.path.splitext(str(flight_data_file_names[flight]))[0] + "-"
     compressed_data_file_name = compressed_data_file_name[:-1]  # [:-1] removes the last "-"
 
     if all(directories_present):  # If all are true, carry on.
-        print('Importing xlsx data')
+        print('Importing flight data')
         # This replaces the file path with the necessary information
         contents = contents.replace("PYTHON_FILE_PATH", "\\\"" +
                                     os.getcwd().replace("\\", jupyter_sep) +
@@ -112,11 +127,18 @@ def flight_log_maker(template_file_path, template_file_name,
         contents = line_remover(contents, "GRAPH_LINE")
 
     # Assigns file name based on excel data
-    compressed_data_file_path = flight_data_file_path + compressed_data_file_name + ".pkl"
+    if pickle_values is True:
+        compressed_data_file_path = flight_data_file_path + compressed_data_file_name + ".pkl"
+    else:
+        compressed_data_file_path = flight_data_file_path + compressed_data_file_name + VALUES_EXTENSION
     # This replaces the file path to the compressed data
     contents = contents.replace("COMPRESSED_DATA_FILE_PATH", "\\\"" +
                                 (compressed_data_file_path
                                  ).replace("\\", jupyter_sep) + "\\\"")
+    # Templates copied by older versions unpickle the data or read it as a values_list. It is now loaded as a
+    # FlightDataset, whose channel index is built once and used by every figure.
+    for data_loader in ["pk.load(open(data_file_path, \\\"rb\\\"))", "values_list_reader(data_file_path)"]:
+        contents = contents.replace(data_loader, "FlightDataset.from_file(data_file_path)")
 
     # Checks to see if the start and end time are in the correct format
     hours_valid = []
@@ -254,27 +276,60 @@ def flight_log_maker(template_file_path, template_file_name,
     # Compresses the flight data for faster loading
     compile_and_compress(flight_data_file_path, flight_data_file_names,
                          csv_flight_data_file_path,
-                         csv_flight_data_names, compressed_data_file_path)
+                         csv_flight_data_names, compressed_data_file_path,
+                         compact=compact, compression=compression, frame_lists=frame_lists, use_cache=use_cache)
     print('Flight log maker finished')
 
 
-def flight_data(file_path, file_name):
-    """This imports the data excel using pandas"""
+def flight_data(file_path, file_name, use_cache=False, cache_path=None, cache_size_limit=None, content_hash=False):
+    """This imports the flight data as a list of data frames, one per sheet. Flight stores (file names ending in
+    .flightdata) are read directly and xlsx files are read using pandas, with the sheets a message type was split
+    across joined back into one data frame.
+
+    If use_cache is True, the data frames read from an xlsx file are kept in a cache on disk (see
+    workbook_cache.py), and are read from there while the xlsx file is unchanged. Nothing is cached by default.
+    cache_path and cache_size_limit default to workbook_cache.CACHE_PATH and workbook_cache.CACHE_SIZE_LIMIT. If
+    content_hash is True, the contents of the xlsx file are also checked, which catches changes that keep its size and
+    modification time."""
     # Excel file.
     file_path_with_name = file_path + file_name
+    if file_name.endswith(STORE_EXTENSION):
+        return store_reader(file_path_with_name)
+    if use_cache is True:
+        frame_list = cache_reader(file_path_with_name, cache_path, content_hash)
+        if frame_list is not None:
+            return frame_list
     # # Extracts data from each sheet.
     frame = pd.read_excel(file_path_with_name, sheet_name=None, engine='openpyxl')
-    frame_list = []
+    # Names of the sheets read and the frames of each, which hold more than one frame when the rows of a message type
+    # have been split across numbered sheets (IMU, IMU.2, IMU.3, ...) by the log reader.
+    sheet_names = []
+    sheet_frames = []
     for data in frame.keys():
-        frame_list.append(frame[data])
+        base_name, separator, number = data.rpartition(CHUNK_SEPARATOR)
+        if separator != "" and number.isdigit() and len(sheet_names) > 0 and sheet_names[-1] == base_name and \
+                list(frame[data].columns) == list(sheet_frames[-1][0].columns):
+            sheet_frames[-1].append(frame[data])
+        else:
+            sheet_names.append(data)
+            sheet_frames.append([frame[data]])
+    frame_list = []
+    for frames in sheet_frames:
+        if len(frames) == 1:
+            frame_list.append(frames[0])
+        else:
+            frame_list.append(pd.concat(frames, ignore_index=True))
+    if use_cache is True:
+        cache_writer(file_path_with_name, frame_list, cache_path, cache_size_limit, content_hash)
     return frame_list
 
 
-def flight_data_and_axis(new_frames):
+def flight_data_and_axis(new_frames, as_arrays=False):
     """Returns list of lists with the following structure:
     [[flight, [data source, [name, unit, data],[name, unit, data]]], [flight, [data source, [name, unit, data],
-    [name, unit, data]]]]."""
-    # TODO: try rewriting this code in a more legible way.
+    [name, unit, data]]]].
+
+    The data of each column is a list, or an array if as_arrays is True."""
     # Creates an empty list for all the data.
     values_list = []
     # Finds the flight date and number from the data
@@ -287,100 +342,83 @@ def flight_data_and_axis(new_frames):
         unit_present = True
         for column in frame.columns:
             # Converts values from data frame into a list.
-            y = frame[column].tolist()
-            # This code creates the y-axis label.
-            # Creates a name
-            name = ""
-            unit = ""
-            # b is used to place a capital letter for the first letter.
-            b = 0
-            # This checks the length of the columns to check if units need to
-            # be included.
-            if len(column.split("_")) == 5:
-                # a is used to check if the underscore has been reached.
-                a = 0
-                # unit_present is used to indicate that there is a unit.
-                unit_present = True
-            else:
-                if len(column.split("_")) == 4:
-                    # This indicates that there are no units for that
-                    # particular value.
-                    unit_present = False
-                    a = 0
-                else:
-                    a = 5 - len(column.split("_"))
-
-            # This for loop creates the name and unit data.
-            for letter in column:
-                if b == 0:
-                    # Adds an uppercase letter to the start of the name
-                    name = letter.upper()
-                    # Sets b to 1 to indicate that a capital letter has been
-                    # inserted.
-                    b = 1
-                else:
-                    if a <= 0:
-                        # Replaces underscore with a space.
-                        if letter != "_":
-                            # Adds letters to build up name.
-                            name = name + letter
-                        else:
-                            # Increment a
-                            a += 1
-                            # If the name has more than one word in it, use
-                            # a space as a separator
-                            if a <= 0:
-                                name += " "
-                    else:
-                        # TODO: unit_present is only set when a is 0 but only accessed when a is > 0. This is a problem.
-                        if letter != "_" and unit_present is True:
-                            unit = unit + letter
-                        elif unit_present is False:
-                            unit = "no unit"
-                            break
-                        else:
-                            break
-            # Replaces per with the superscript notation.
-            if "per" in unit:
-                # splits unit into list about per.
-                unit_split = unit.split("per")
-                # Creates a blank list for counting the number of occurrences.
-                # of a particular denominator.
-                denominators = []
-                # a is used to check if the value is a numerator or a
-                # denominator.
-                a = 0
-                for count in range(1, len(unit_split)):
-                    # Checks through denominator list
-                    for item in denominators:
-                        # Checks if there is already a denominator with that
-                        # unit.
-                        if unit_split[count] in item[0]:
-                            # If there is then it increases the power of that
-                            # unit.
-                            item[1] = item[1] + 1
-                            # Sets the check to 1 to show that this unit has
-                            # appeared before.
-                            a = 1
-                    # Checks if the denominator has appeared before.
-                    if a == 1:
-                        a = 0
-                    else:
-                        # If not it creates a new entry.
-                        denominators.append([unit_split[count], 1])
-                # recreates unit.
-                unit = unit_split[0]
-                # Goes through each denominators and formats adds it to the
-                # unit list.
-                for denominator in denominators:
-                    # Puts units in format with powers
-                    unit = unit + denominator[0] + "$^{-" + \
-                           str(denominator[1]) + "}$"
-            data_lists.append([name, unit, y])
+            y = frame[column].to_numpy() if as_arrays is True else frame[column].tolist()
+            # Longer titles (names containing underscores) have a unit if the title before them has one.
+            if column.count("_") in [3, 4]:
+                unit_present = column.count("_") == 4
+            header = header_parser(column, unit_present)
+            data_lists.append([header.name, header.unit, y])
         values_list.append(data_lists)
     return [flight_identifier, values_list]
 
 
+# The parts of a column title.
+HeaderRecord = namedtuple("HeaderRecord", ["name", "unit", "source", "date", "flight"])
+
+
+def header_parser(column, unit_present=True):
+    """Returns the HeaderRecord of a column title such as "Altitude_m_GPS_20190123_2", with the name and unit used as
+    the axis label ("Altitude", "m") and the data source, date and flight number of the column.
+
+    unit_present is used for titles with more than five parts, where the last part of the name can not be told apart
+    from a unit, and is ignored for titles with four or five parts. Parts missing from short titles are None."""
+    parts = column.split("_")
+    # Titles with five parts have a unit and titles with four parts do not.
+    if len(parts) in [4, 5]:
+        unit_present = len(parts) == 5
+    if len(parts) >= 4 and parts[0] != "":
+        # The date and flight number are never part of the name or unit, so they are left out of the label to share
+        # it between flights.
+        label = column[:len(column) - len(parts[-2]) - len(parts[-1]) - 1]
+    else:
+        label = column
+    name, unit = label_parser(label, len(parts), unit_present)
+    source, date, flight = ([None, None, None] + parts[1:])[-3:]
+    return HeaderRecord(name, unit, source, date, flight)
+
+
+@lru_cache(maxsize=None)
+def label_parser(label, part_count, unit_present):
+    """Returns the name and unit of a column title, where label is the title up to its date and part_count is the
+    number of parts of the whole title. The results are cached as the same titles are read for every flight."""
+    if label == "":
+        return "", ""
+    # The first letter of the name is a capital letter.
+    first_letter = label[0].upper()
+    words = label[1:].split("_")
+    # The number of words in the name.
+    if part_count in [4, 5]:
+        name_length = 1
+    else:
+        name_length = max(part_count - 4, 0)
+    if name_length > len(words) - 1:
+        # There is no unit after the name.
+        return first_letter + " ".join(words), ""
+    name = first_letter + " ".join(words[:name_length])
+    if "_".join(words[name_length:]) == "":
+        unit = ""
+    elif unit_present is True:
+        unit = words[name_length]
+    else:
+        unit = "no unit"
+    # Replaces per with the superscript notation.
+    if "per" in unit:
+        # splits unit into list about per.
+        unit_split = unit.split("per")
+        # Counts the number of occurrences of each denominator. A denominator contained in one found before increases
+        # the power of that denominator.
+        denominators = []
+        for denominator in unit_split[1:]:
+            matches = [item for item in denominators if denominator in item[0]]
+            for item in matches:
+                item[1] += 1
+            if not matches:
+                denominators.append([denominator, 1])
+        # Puts units in format with powers
+        unit = unit_split[0] + "".join(denominator + "$^{-" + str(power) + "}$" for denominator, power in denominators)
+    return name, unit
+
+
 def flight_log_creator(contents, file_path, file_name_data,
                        file_name_header="Flight_Log_"):
     """This creates or overwrites a file with the name file_name_header date
@@ -396,97 +434,42 @@ def flight_log_creator(contents, file_path, file_name_data,
 
 
 def flight_data_time_sorter(frame_list):
-    """Splits the data by the title containing time."""
-    a = 0
-    # Creates a blank dictionary for the time columns.
-    renamed_time_columns = {}
-    # Empty list to be populated by columns that contain time.
-    time_columns = []
-    # Empty list for new frames to fill.
-    new_frames = []
-    # Edits one frame at a time.
-    for frame_data in frame_list:
-        # Empty list to be populated by columns that contain time more than
-        # once.
-        frame_columns_list = []
-        # Columns is a list of columns.
-        columns = frame_list[a].columns
-        # Increments a
-        a = a + 1
-        # Loops through each column to see if it contains the word time.
-        for column_data in columns:
-            # Checks to see if the word time appears in the column.
-            try:
-                if "action_time" in column_data.lower():
-                    # Exceptons are passed here.
-                    pass
-                elif "time" in column_data.lower():
-                    # If time appears then it is appended to the list time_columns.
-                    time_columns.append(column_data)
-                    # Divides column by 1*10^6 to return it to seconds.
-                    frame_data[column_data] = frame_data[column_data].div(10 ** 6)
-                    # Adds columns in this data frame that contain the word time to
-                    # a list.
-                    frame_columns_list.append(column_data)
-                    # appends replacement column to dictionary.
-                    renamed_time_columns[column_data] = (column_data.replace("_US_", "_s_"))
-            except TypeError:  # This exception is for the user collected environmental data time
-                if "dummy_time" in column_data.lower():
-                    frame_columns_list.append(column_data)
-                else:
-                    pass
-
-        # Creates a copy of the columns to delete parts from.
-        frame_copy = frame_data.copy()
-        # The variable b will be used to divide the list.
-        b = 0
-        # This variable is used to trigger the appending of the data frames to
-        # the list data frames.
-        d = 0
-        # Checks through each of the columns.
-        frame_duplicate = None
-        for column_data in columns:
-            if b == 0:
-                frame_duplicate = frame_copy.copy()
-                b = 1
-                # Checks to see if column is a time column.
-                for time_column in time_columns:
-                    if column_data == time_column:
-                        d = 1
-                # Removes frames
-                frame_copy = frame_copy.drop(labels=column_data, axis=1)
-                if d == 1:
-                    # Removes columns from the frame_duplicate list
-                    for column_drop in frame_copy.columns:
-                        frame_duplicate = frame_duplicate.drop(labels=column_drop, axis=1)
-                    # Checks if time appears in column being checked.
-                    new_frames.append(frame_duplicate)
-                    b = d = 0
-            else:
-                # Checks to see if column is a time column.
-                for time_column in time_columns:
-                    if column_data == time_column:
-                        d = 1
-                # Removes frames
-                frame_copy = frame_copy.drop(labels=column_data, axis=1)
-                if d == 1:
-                    # Removes columns from the frame_duplicate list
-                    for column_drop in frame_copy.columns:
-                        frame_duplicate = frame_duplicate.drop(labels=column_drop, axis=1)
-                    # Checks if time appears in column being checked.
-                    new_frames.append(frame_duplicate)
-                    b = d = 0
+    """Splits the data by the title containing time.
+
+    Each data frame is split into a data frame for each time column, holding the columns from after the previous time
+    column up to and including the time column, in the order of the columns. Columns after the last time column are
+    left out. The time columns are changed from microseconds to seconds, with "_US_" in their titles replaced by
+    "_s_". Each data frame is split in a single pass over its columns, the new data frames are made from slices of its
+    columns, and the data frames given are not changed."""
     # Creates a blank list for the frames with the seconds unit fixed.
     arranged_frames = []
-    # Renames columns and changes the units of time from US (microseconds) to s
-    for frame_data in new_frames:
-        # Replaces the unit
-        frame_data.rename(columns=renamed_time_columns, inplace=True)
-        # Appends the frame.
-        arranged_frames.append(frame_data)
+    for frame_data in frame_list:
+        # Position of the first column of the next data frame.
+        group_start = 0
+        for column_index, column_data in enumerate(frame_data.columns):
+            if time_column_checker(column_data) is False:
+                continue
+            time_data = frame_data.iloc[:, column_index]
+            try:
+                # Divides column by 1*10^6 to return it to seconds.
+                time_data = time_data.div(10 ** 6).rename(column_data.replace("_US_", "_s_"))
+            except TypeError:
+                # The time of the user collected environmental data is text, which is kept as it is.
+                pass
+            # Joins the columns before the time column to the time column without copying them.
+            arranged_frames.append(pd.concat([frame_data.iloc[:, group_start:column_index], time_data], axis=1,
+                                             copy=False))
+            group_start = column_index + 1
     return arranged_frames
 
 
+def time_column_checker(column_data):
+    """Returns True if a column title contains the word time, other than the action time of the weather data."""
+    if not isinstance(column_data, str):
+        return False
+    return "time" in column_data.lower() and "action_time" not in column_data.lower()
+
+
 def file_type_finder(file_path, extension):
     """ Returns files of a particular type given an input file path
     and extension."""
@@ -557,17 +540,36 @@ def csv_frame(flight_data_file_path, csv_flight_data_name):
 
 def compile_and_compress(flight_data_file_path, flight_data_file_name,
                          csv_data_file_path, csv_data_file_name,
-                         comp_data_file_path):
+                         comp_data_file_path, compact=False, compression=None, frame_lists=None, use_cache=False):
     """
-    This is used to compile all the entered data. This is then pickled and saved for faster loading.
+    This is used to compile all the entered data. This is then saved for faster loading: as a values store (see
+    values_store.py) if comp_data_file_path ends in .values, which the notebook reads one channel at a time, or
+    pickled otherwise, with the data of each channel saved as an array which is read without copying it (if pickle
+    protocol 5 is available).
+
+    If compact is True, the channels of a values store are saved in as little space as they can be without changing
+    their values, and compression ("zlib" or "lzma") compresses them further (see values_store.values_store_writer()).
+
+    If frame_lists is given, it is the list of data frames of each flight returned by log_to_xlsx.log_reader_multi()
+    with in_memory=True, which are compiled in place of reading the flight data files.
+
+    If use_cache is True, the data read from xlsx files is cached (see flight_data()).
 
     flight_data_file_names and csv_data_file_name are of type list.
     """
+    values_store = comp_data_file_path.endswith(VALUES_EXTENSION)
+    if values_store is False and (compact is True or compression is not None):
+        raise ValueError("compact and compression are only used for values stores (" + VALUES_EXTENSION + ")")
+    as_arrays = values_store or pickle5_available
     values_list = []
     for data_set in range(len(flight_data_file_name)):
         # Excel Sheets
         print(flight_data_file_name[data_set])
-        frame_list = flight_data(flight_data_file_path, flight_data_file_name[data_set])
+        if frame_lists is not None:
+            # The frames are copied as the data frame of the csv data is added to the list.
+            frame_list = list(frame_lists[data_set])
+        else:
+            frame_list = flight_data(flight_data_file_path, flight_data_file_name[data_set], use_cache=use_cache)
         # Retrieves csv flight data if present
         if csv_data_file_name != ['']:
             csv_flight_data_frame = csv_frame(csv_data_file_path,
@@ -576,11 +578,17 @@ def compile_and_compress(flight_data_file_path, flight_data_file_name,
             frame_list.append(csv_flight_data_frame)
         # Sorts frames by time
         sorted_frames = flight_data_time_sorter(frame_list)
-        values = flight_data_and_axis(sorted_frames)
+        values = flight_data_and_axis(sorted_frames, as_arrays=as_arrays)
         # Creates a list of all the values.
         values_list.append(values)
-    # Compresses (pickles) the data and saves it in the excel files folder.
-    pk.dump(values_list, open(comp_data_file_path, "wb"))
+    if values_store is True:
+        values_store_writer(comp_data_file_path, values_list, compact=compact, compression=compression)
+    elif pickle5_available is True:
+        # Pickles the data, with the arrays saved after the pickle so they can be memory mapped.
+        values_pickle_writer(comp_data_file_path, values_list)
+    else:
+        # Compresses (pickles) the data and saves it in the excel files folder.
+        pk.dump(values_list, open(comp_data_file_path, "wb"))
     print('Pickling finished')
 
 
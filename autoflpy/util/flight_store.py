@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+"""
+Stores the data read from a flight log on disk in columns, so that it can be
+read back without going through an xlsx file.
+
+A flight store is a directory containing a manifest.json, which lists the
+sheets (one per message type, in the same order and with the same headings
+as the sheets of the xlsx file) and one file per column. The columns are
+saved as .npy files, or as Parquet files (one per sheet, plus one for each
+set of rows added to it) when pyarrow is installed. Rows are added onto the
+end of a saved sheet without reading it again, so a log can be saved a part
+at a time. The small WEATHER_DATA, RUNWAY_DATA and AIRCRAFT_DATA sheets are
+kept in the manifest itself. Stores read from a .log file also contain a
+checkpoint.json, recording how far through the log was read.
+
+@author: Adrian Weishaeupl
+aw6g15@soton.ac.uk 2019
+"""
+
+import json
+import os
+import struct
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+
+    parquet_available = True
+except ImportError:
+    parquet_available = False
+
+# Extension of the flight store directories, used in place of .xlsx.
+STORE_EXTENSION = ".flightdata"
+MANIFEST_NAME = "manifest.json"
+# Saved with the store of a .log file, so that the log can be read on from where it was read up to.
+CHECKPOINT_NAME = "checkpoint.json"
+# Size of the header of the .npy files written, leaving room for the number of rows to grow as rows are added.
+NPY_HEADER_SIZE = 128
+# Number of rows of a .npy file converted at a time when the type of its values changes.
+NPY_BLOCK_ROWS = 2 ** 20
+
+
+def store_format_selector(store_format=None):
+    """Returns the format the columns are saved in: "parquet" if pyarrow is installed and "npy" otherwise, unless a
+    format is given."""
+    if store_format is None:
+        if parquet_available is True:
+            return "parquet"
+        return "npy"
+    if store_format == "parquet" and parquet_available is False:
+        print("pyarrow is not installed, so the flight store will be saved as .npy files instead of Parquet.")
+        return "npy"
+    if store_format not in ["npy", "parquet"]:
+        raise ValueError("Unknown flight store format {}. Use npy or parquet.".format(store_format))
+    return store_format
+
+
+def sheet_writer(store_path, sheet_index, sheet_name, headings, columns, store_format):
+    """Saves the columns of one sheet to the flight store at store_path and returns its entry for the manifest. More
+    rows can be added to the sheet with sheet_appender()."""
+    os.makedirs(store_path, exist_ok=True)
+    if store_format == "parquet":
+        file_names = ["{}.parquet".format(sheet_index)]
+        parquet_writer(store_path + os.sep + file_names[0], columns)
+    else:
+        file_names = []
+        for index in range(len(columns)):
+            file_name = "{0}_{1}.npy".format(sheet_index, index)
+            npy_appender(store_path + os.sep + file_name, columns[index])
+            file_names.append(file_name)
+    return {"name": sheet_name, "headings": headings, "files": file_names, "rows": len(columns[0])}
+
+
+def sheet_appender(store_path, sheet, columns, store_format):
+    """Adds the rows of columns onto the end of a sheet saved by sheet_writer(), given its manifest entry sheet, which
+    is updated with the new number of rows and returned. The rows saved before are not read: each column is added
+    onto the end of its .npy file, or the rows are saved as one more Parquet file of the sheet."""
+    if len(columns[0]) == 0:
+        return sheet
+    if store_format == "parquet":
+        file_name = "{0}.{1}.parquet".format(os.path.splitext(sheet["files"][0])[0], len(sheet["files"]))
+        parquet_writer(store_path + os.sep + file_name, columns)
+        sheet["files"].append(file_name)
+    else:
+        for file_name, column in zip(sheet["files"], columns):
+            npy_appender(store_path + os.sep + file_name, column)
+    sheet["rows"] += len(columns[0])
+    return sheet
+
+
+def sheet_index_finder(sheets):
+    """Returns the index after the largest index in the file names of the sheets of a manifest, so that the files of
+    sheets added to the store are numbered from it."""
+    # Files are named "{sheet index}_{column}.npy", "{sheet index}.parquet" or "{sheet index}.{part}.parquet".
+    indices = [int(file_name.split("_")[0].split(".")[0]) for sheet in sheets for file_name in sheet.get("files", [])]
+    return max(indices, default=-1) + 1
+
+
+def parquet_writer(file_path, columns):
+    """Saves columns as a Parquet file."""
+    # Columns are named by their position as the headings are not always unique.
+    frame = pd.DataFrame({str(index): columns[index] for index in range(len(columns))})
+    frame.to_parquet(file_path, index=False)
+
+
+def npy_header(dtype, rows, header_size=NPY_HEADER_SIZE):
+    """Returns the header of a .npy file of rows values of type dtype, padded to header_size bytes, or None if the
+    header does not fit in header_size bytes."""
+    header = "{{'descr': {0!r}, 'fortran_order': False, 'shape': ({1},), }}".format(
+        np.lib.format.dtype_to_descr(dtype), rows)
+    # The magic string, version and header length take up 10 bytes, and the header ends with a new line.
+    padding = header_size - 11 - len(header)
+    if padding < 0:
+        return None
+    return b"\x93NUMPY\x01\x00" + struct.pack("<H", header_size - 10) + (header + " " * padding + "\n").encode("latin1")
+
+
+def npy_header_reader(npy_file):
+    """Returns the type, number of rows and header size of the open .npy file npy_file."""
+    version = np.lib.format.read_magic(npy_file)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(npy_file)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(npy_file)
+    return dtype, shape[0], npy_file.tell()
+
+
+def npy_appender(file_path, column):
+    """Adds column onto the end of the .npy file at file_path, creating it if it does not exist. Only the header and
+    the new values are written, unless the type of the values changes (for example from integers to decimals, as
+    with np.concatenate()), in which case the file is converted NPY_BLOCK_ROWS rows at a time."""
+    column = np.asarray(column)
+    if not os.path.isfile(file_path):
+        with open(file_path, "wb") as npy_file:
+            npy_file.write(npy_header(column.dtype, 0))
+    with open(file_path, "rb") as npy_file:
+        dtype, rows, header_size = npy_header_reader(npy_file)
+    new_dtype = np.result_type(dtype, column.dtype)
+    header = npy_header(new_dtype, rows + len(column), header_size)
+    if new_dtype != dtype or header is None:
+        npy_converter(file_path, dtype, rows, header_size, new_dtype)
+        header_size = NPY_HEADER_SIZE
+        header = npy_header(new_dtype, rows + len(column))
+    with open(file_path, "r+b") as npy_file:
+        # Anything after the rows in the header, such as rows from an interrupted write, is written over.
+        npy_file.seek(header_size + rows * new_dtype.itemsize)
+        npy_file.truncate()
+        npy_file.write(np.ascontiguousarray(column, dtype=new_dtype).data)
+        # The number of rows is only updated once the new rows have been written.
+        npy_file.seek(0)
+        npy_file.write(header)
+
+
+def npy_converter(file_path, dtype, rows, header_size, new_dtype):
+    """Converts the rows of the .npy file at file_path from dtype to new_dtype, NPY_BLOCK_ROWS rows at a time."""
+    with open(file_path + ".converting", "wb") as new_file:
+        new_file.write(npy_header(new_dtype, rows))
+        if rows > 0:
+            saved = np.memmap(file_path, dtype=dtype, mode="r", offset=header_size, shape=(rows,))
+            for start in range(0, rows, NPY_BLOCK_ROWS):
+                new_file.write(np.ascontiguousarray(saved[start:start + NPY_BLOCK_ROWS], dtype=new_dtype).data)
+            del saved
+    os.replace(file_path + ".converting", file_path)
+
+
+def metadata_sheet(sheet_name, headings, values):
+    """Returns the manifest entry of a sheet of user entered data (weather, runway or aircraft data), which is kept
+    in the manifest itself."""
+    return {"name": sheet_name, "headings": headings, "values": values}
+
+
+def manifest_writer(store_path, sheets, store_format):
+    """Writes the manifest listing the sheets of the flight store. This is written last, so a store is only read once
+    all of its columns have been saved."""
+    os.makedirs(store_path, exist_ok=True)
+    with open(store_path + os.sep + MANIFEST_NAME, "w") as manifest_file:
+        json.dump({"format": store_format, "sheets": sheets}, manifest_file, indent=1)
+
+
+def manifest_reader(store_path):
+    """Returns the manifest of the flight store at store_path."""
+    with open(store_path + os.sep + MANIFEST_NAME) as manifest_file:
+        return json.load(manifest_file)
+
+
+def checkpoint_writer(store_path, checkpoint):
+    """Writes the checkpoint of the log the flight store at store_path was read from."""
+    with open(store_path + os.sep + CHECKPOINT_NAME, "w") as checkpoint_file:
+        json.dump(checkpoint, checkpoint_file, indent=1)
+
+
+def checkpoint_reader(store_path):
+    """Returns the checkpoint saved with the flight store at store_path, or None if there is no checkpoint or the store
+    was not finished."""
+    if not os.path.isfile(store_path + os.sep + MANIFEST_NAME):
+        return None
+    try:
+        with open(store_path + os.sep + CHECKPOINT_NAME) as checkpoint_file:
+            return json.load(checkpoint_file)
+    except (OSError, ValueError):
+        return None
+
+
+def sheet_reader(store_path, sheet, store_format, memory_map=False):
+    """Returns the columns of a sheet from the manifest as a list of arrays. The .npy columns are memory mapped if
+    memory_map is True, so only the values used are read from disk."""
+    if "values" in sheet:
+        # "N/A" is read as NaN, as it was from the xlsx file.
+        return [np.array([np.nan if value == "N/A" else value]) for value in sheet["values"]]
+    if store_format == "parquet":
+        frames = [pd.read_parquet(store_path + os.sep + file_name) for file_name in sheet["files"]]
+        frame = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+        return [frame[column].to_numpy() for column in frame.columns]
+    mmap_mode = "r" if memory_map is True else None
+    # Only the rows in the manifest are read, in case rows were being added when it was last saved.
+    return [np.load(store_path + os.sep + file_name, mmap_mode=mmap_mode, allow_pickle=False)[:sheet["rows"]]
+            for file_name in sheet["files"]]
+
+
+def store_reader(store_path):
+    """Reads a flight store and returns a list of data frames, one per sheet, in the same form as those read from the
+    xlsx file by flight_log_code.flight_data()."""
+    manifest = manifest_reader(store_path)
+    frame_list = []
+    for sheet in manifest["sheets"]:
+        frame_list.append(frame_creator(sheet_reader(store_path, sheet, manifest["format"]), sheet["headings"]))
+    return frame_list
+
+
+def frame_creator(columns, headings):
+    """Returns the data frame of a sheet from its columns and headings."""
+    # The columns are added by position as the headings are not always unique.
+    frame = pd.DataFrame({index: columns[index] for index in range(len(columns))})
+    frame.columns = headings
+    return frame
+
+
+def store_column_reader(store_path, sheet_name, column_index):
+    """Returns a single column of the first sheet called sheet_name in a flight store, without reading the rest of
+    the store."""
+    manifest = manifest_reader(store_path)
+    for sheet in manifest["sheets"]:
+        if sheet["name"] == sheet_name:
+            return sheet_reader(store_path, sheet, manifest["format"], memory_map=True)[column_index]
+    raise KeyError("{0} is not in the flight store {1}".format(sheet_name, store_path))
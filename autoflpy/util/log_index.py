@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+Builds a sidecar index of a .log file, recording where the lines of each
+message type are in the file, so that the lines of any message type can be
+read again without reading through the rest of the log.
+
+The index is saved next to the log in a folder named after it with the .index
+extension. This contains an index.json, recording the size and modification
+time of the log, its FMT block, the number of lines of each message type and
+the time stamp at every (roughly) 1 MB of the log, and one .npy file per
+message type holding the byte offset and length of each of its lines. The
+index is only used while the size and modification time of the log are
+unchanged.
+
+@author: Adrian Weishaeupl
+aw6g15@soton.ac.uk 2019
+"""
+
+import json
+import mmap
+import os
+import shutil
+import numpy as np
+
+INDEX_EXTENSION = ".index"
+INDEX_NAME = "index.json"
+# Number of bytes at the start of each line searched for the end of its message type.
+PREFIX_LENGTH = 8
+# Number of bytes of the log searched for new line characters at a time.
+SCAN_BLOCK_SIZE = 2 ** 24
+
+
+def index_path(log_file_path):
+    """Returns the path of the sidecar index of a log file."""
+    return log_file_path + INDEX_EXTENSION
+
+
+def index_builder(log_file_path, end=None, checkpoint_spacing=2 ** 20):
+    """Builds and saves the sidecar index of the lines of a log file up to the byte offset end (or the end of the
+    file), which should be the end of a line. Returns the index in the same form as index_reader()."""
+    stat = os.stat(log_file_path)
+    if end is None:
+        end = stat.st_size
+    if end == 0:
+        starts = np.zeros(0, dtype=np.int64)
+        lengths = np.zeros(0, dtype=np.int64)
+        raw = np.zeros(0, dtype=np.uint8)
+    else:
+        raw = np.memmap(log_file_path, dtype=np.uint8, mode="r", shape=(end,))
+        starts = line_start_finder(raw)
+        if starts[-1] == end:
+            starts = starts[:-1]
+        lengths = np.diff(np.append(starts, end))
+    message_types, line_types = line_type_finder(raw, starts, lengths)
+
+    # The FMT block is every line before the first line of another message type.
+    fmt_type = message_types.index("FMT") if "FMT" in message_types else -1
+    not_fmt = np.flatnonzero(line_types != fmt_type)
+    fmt_block_end = not_fmt[0] if len(not_fmt) > 0 else len(starts)
+    fmt_lines = [line_decoder(raw, starts[line], lengths[line]).split(", ") for line in range(fmt_block_end)]
+
+    path = index_path(log_file_path)
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    os.makedirs(path)
+    # Lines of each message type, in the order they appear in the log.
+    # Stable sorts of small integers are radix sorts.
+    order = np.argsort(line_types.astype(np.int16) if len(message_types) < 2 ** 15 else line_types, kind="stable")
+    counts = np.bincount(line_types, minlength=len(message_types))
+    message_index = {}
+    position = 0
+    for type_number in range(len(message_types)):
+        lines = order[position:position + counts[type_number]]
+        position += counts[type_number]
+        # Files are numbered as message types are not always valid file names.
+        file_name = "{}.npy".format(type_number)
+        np.save(path + os.sep + file_name, np.stack([starts[lines], lengths[lines]], axis=1), allow_pickle=False)
+        message_index[message_types[type_number]] = {"file": file_name, "rows": int(counts[type_number])}
+
+    # Lines of the message types with a time stamp as their first value
+    timed_types = [message_types.index(data[3]) for data in fmt_lines
+                   if len(data) > 5 and data[5].split(",")[0] == "TimeUS" and data[3] in message_types]
+    timed_lines = np.flatnonzero(np.isin(line_types, timed_types))
+    log_index = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "end": int(end), "fmt_lines": fmt_lines,
+                 "message_types": message_index,
+                 "time_checkpoints": time_checkpoint_finder(raw, starts, lengths, timed_lines, checkpoint_spacing)}
+    # The index file is written last, so an index is only used once all of its files have been saved.
+    with open(path + os.sep + INDEX_NAME, "w") as index_file:
+        json.dump(log_index, index_file, indent=1)
+    return log_index
+
+
+def index_reader(log_file_path):
+    """Returns the sidecar index of a log file, or None if it has not been built or the size or modification time of
+    the log have changed since it was."""
+    try:
+        with open(index_path(log_file_path) + os.sep + INDEX_NAME) as index_file:
+            log_index = json.load(index_file)
+    except (OSError, ValueError):
+        return None
+    stat = os.stat(log_file_path)
+    if log_index["size"] != stat.st_size or log_index["mtime_ns"] != stat.st_mtime_ns:
+        return None
+    return log_index
+
+
+def line_start_finder(raw, block_size=SCAN_BLOCK_SIZE):
+    """Returns the byte offset of the start of every line in raw, the bytes of a log. Every line starts after a new
+    line character, apart from the first. The log is searched block_size bytes at a time, so that only the offsets
+    are kept rather than a comparison of every byte of the log."""
+    blocks = [np.zeros(1, dtype=np.int64)]
+    for block_start in range(0, len(raw), block_size):
+        new_lines = np.flatnonzero(raw[block_start:block_start + block_size] == ord("\n"))
+        blocks.append(new_lines.astype(np.int64) + (block_start + 1))
+    return np.concatenate(blocks)
+
+
+def line_type_finder(raw, starts, lengths, block_lines=2 ** 18):
+    """Finds the message type at the start of each line, in the same way as line.split(", ", 1)[0].
+
+    Returns a list of the message types found and an array of the position of the message type of each line in that
+    list. The start of each line is read block_lines lines at a time."""
+    # The message type of each line as an 8 byte integer, which is much faster to compare than text.
+    prefix_keys = np.zeros(len(starts), dtype="<u8")
+    found = np.zeros(len(starts), dtype=bool)
+    for block_start in range(0, len(starts), block_lines):
+        block = slice(block_start, block_start + block_lines)
+        prefix_keys[block], found[block] = prefix_key_finder(raw, starts[block], lengths[block])
+    line_types = np.zeros(len(starts), dtype=np.int64)
+    keys, line_types[found] = np.unique(prefix_keys[found], return_inverse=True)
+    message_types = [key.tobytes().rstrip(b"\x00").decode("utf-8", "replace") for key in keys.astype("<u8")]
+    type_numbers = {message_types[number]: number for number in range(len(message_types))}
+    # Lines without ", " near their start are split one at a time.
+    for line in np.flatnonzero(~found):
+        message_type = line_decoder(raw, starts[line], lengths[line]).split(", ", 1)[0]
+        if message_type not in type_numbers:
+            type_numbers[message_type] = len(message_types)
+            message_types.append(message_type)
+        line_types[line] = type_numbers[message_type]
+    return message_types, line_types
+
+
+def prefix_key_finder(raw, starts, lengths):
+    """Returns the bytes before the first ", " in the first PREFIX_LENGTH bytes of each line as an 8 byte integer, and
+    whether ", " was found there."""
+    # The first bytes of every line, with those past the end of the line set to zero.
+    columns = np.arange(PREFIX_LENGTH)
+    prefixes = raw[np.minimum(starts[:, None] + columns, len(raw) - 1)] if len(raw) > 0 else \
+        np.zeros((0, PREFIX_LENGTH), dtype=np.uint8)
+    prefixes[columns >= lengths[:, None]] = 0
+    # Position of the first ", " in each prefix
+    separators = (prefixes[:, :-1] == ord(",")) & (prefixes[:, 1:] == ord(" "))
+    found = separators.any(axis=1)
+    prefixes[columns >= np.argmax(separators, axis=1)[:, None]] = 0
+    return prefixes.view("<u8").ravel(), found
+
+
+def line_decoder(raw, start, length):
+    """Returns the text of the line starting at byte start, without its line ending."""
+    return bytes(raw[start:start + length]).decode("utf-8", "replace").rstrip("\n").rstrip("\r")
+
+
+def time_checkpoint_finder(raw, starts, lengths, timed_lines, checkpoint_spacing):
+    """Returns [byte offset, TimeUS] of the first line with a time stamp after every checkpoint_spacing bytes of the
+    log. timed_lines are the numbers of the lines of message types whose first column is TimeUS, in order."""
+    time_checkpoints = []
+    if len(timed_lines) == 0:
+        return time_checkpoints
+    timed_starts = starts[timed_lines]
+    for boundary in range(0, int(starts[-1]) + 1, checkpoint_spacing):
+        position = int(np.searchsorted(timed_starts, boundary))
+        if position == len(timed_lines):
+            break
+        line = timed_lines[position]
+        try:
+            time_us = int(line_decoder(raw, starts[line], lengths[line]).split(", ", 2)[1])
+        except (IndexError, ValueError):
+            # A line cut off or corrupted in the log
+            continue
+        if len(time_checkpoints) == 0 or time_checkpoints[-1][0] != int(starts[line]):
+            time_checkpoints.append([int(starts[line]), time_us])
+    return time_checkpoints
+
+
+def index_line_reader(log_file_path, log_index, message_type, start=0, end=None):
+    """Returns the lines of one message type, read from a log file using its sidecar index, in the same form as
+    those from log_ingestion.log_ingestor(). Only the lines starting between the byte offsets start and end are
+    read."""
+    if message_type not in log_index["message_types"]:
+        return []
+    positions = np.load(index_path(log_file_path) + os.sep + log_index["message_types"][message_type]["file"])
+    if start > 0 or end is not None:
+        # The lines are in the order they appear in the log.
+        positions = positions[np.searchsorted(positions[:, 0], start):
+                              np.searchsorted(positions[:, 0], log_index["end"] if end is None else end)]
+    if len(positions) == 0:
+        return []
+    with open(log_file_path, "rb") as log_file:
+        with mmap.mmap(log_file.fileno(), 0, access=mmap.ACCESS_READ) as log_map:
+            text = b"".join([log_map[start:start + length] for start, length in positions.tolist()])
+    text = text.decode("utf-8", "replace")
+    if "\r" in text:
+        text = text.replace("\r\n", "\n")
+    if text.endswith("\n"):
+        text = text[:-1]
+    return text.split("\n")
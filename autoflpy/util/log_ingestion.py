@@ -0,0 +1,353 @@
+# -*- coding: utf-8 -*-
+"""
+Reads .log files (generated using mission planner from a .bin file) and sorts
+their contents by message type so that each line of the log only has to be
+read once. The lines of each message type are then parsed into typed columns
+using the format characters in the FMT block.
+
+@author: Adrian Weishaeupl
+aw6g15@soton.ac.uk 2019
+"""
+
+import codecs
+import csv
+import hashlib
+import io
+import os
+import warnings
+from itertools import islice
+import numpy as np
+import pandas as pd
+
+# DataFlash format characters of values written as integers in a .log file. Time stamps (TimeUS) are Q, so they are
+# kept as integer microseconds.
+INTEGER_FORMATS = "bBhHiIqQ"
+# Format characters of values written as decimals. The scaled integer formats (c, C, e, E and L) are already divided
+# down in the .log file.
+FLOAT_FORMATS = "fdcCeEL"
+
+
+def log_line_reader(log_file_path, buffer_size=2 ** 20, start=0, end=None):
+    """Yields the lines of a log file one at a time. The file is read in chunks of buffer_size bytes so that the
+    whole log is never held in memory. The lines yielded are the same as those from splitting the whole file about
+    "\n".
+
+    Only the bytes from start up to end (or the end of the file) are read, so that a log which is still being written
+    can be read from where it was read up to before."""
+    decoder = codecs.getincrementaldecoder("utf-8")("replace")
+    with open(log_file_path, "rb") as log_file:
+        log_file.seek(start)
+        remaining = None if end is None else end - start
+        # Part of a line left over from the previous chunk.
+        remainder = ""
+        while True:
+            if remaining is None:
+                chunk = log_file.read(buffer_size)
+            else:
+                chunk = log_file.read(min(buffer_size, remaining))
+                remaining -= len(chunk)
+            if len(chunk) == 0:
+                break
+            text = remainder + decoder.decode(chunk)
+            if "\r" in text:
+                # Windows line endings are read as "\n", as they are when the file is opened as text.
+                text = text.replace("\r\n", "\n")
+            lines = text.split("\n")
+            remainder = lines.pop()
+            for line in lines:
+                yield line
+        yield remainder + decoder.decode(b"", final=True)
+
+
+def complete_line_offset(log_file_path, buffer_size=2 ** 16):
+    """Returns the byte offset just after the last "\n" in a log file, or 0 if there is none. Anything after it is a
+    line still being written."""
+    with open(log_file_path, "rb") as log_file:
+        position = log_file.seek(0, os.SEEK_END)
+        while position > 0:
+            start = max(0, position - buffer_size)
+            log_file.seek(start)
+            index = log_file.read(position - start).rfind(b"\n")
+            if index != -1:
+                return start + index + 1
+            position = start
+    return 0
+
+
+def line_boundaries(log_file_path, start, end, parts):
+    """Splits the bytes of a log file from start to end into up to parts ranges of about the same size, each starting
+    at the beginning of a line. Returns the byte offsets of the boundaries between them, starting with start and
+    ending with end."""
+    boundaries = [start]
+    with open(log_file_path, "rb") as log_file:
+        for part in range(1, parts):
+            position = start + (end - start) * part // parts
+            if position <= boundaries[-1]:
+                continue
+            # Moves on to the start of the next line. A range which already starts at the beginning of a line is kept.
+            log_file.seek(position - 1)
+            log_file.readline()
+            position = log_file.tell()
+            if position >= end:
+                break
+            if position > boundaries[-1]:
+                boundaries.append(position)
+    boundaries.append(end)
+    return boundaries
+
+
+def fmt_block_reader(log_file_path):
+    """Returns the FMT lines at the start of a log (split about ", "), in the same way as log_ingestor(), reading the
+    log only as far as the first line of data."""
+    fmt_lines = []
+    for line in log_line_reader(log_file_path):
+        if line.split(", ", 1)[0] != "FMT":
+            break
+        fmt_lines.append(line.split(", "))
+    return fmt_lines
+
+
+def range_parser(log_file_path, start, end, fmt_lines):
+    """Sorts and parses the lines of a log between the byte offsets start and end, which should be the start of lines,
+    so that parts of a log can be parsed in separate processes.
+
+    Returns a dictionary with the message type as the key and the columns from message_column_parser() as the value,
+    for the message types of the split FMT lines fmt_lines."""
+    message_types = set(fmt_line[3] for fmt_line in fmt_lines)
+    message_data = log_ingestor(log_line_reader(log_file_path, start=start, end=end), message_types, False)[1]
+    message_columns = {}
+    for fmt_line in fmt_lines:
+        if fmt_line[3] in message_data:
+            message_columns[fmt_line[3]] = message_column_parser(fmt_line, message_data.pop(fmt_line[3]))
+    return message_columns
+
+
+def log_fingerprint(log_file_path, offset, size=2 ** 16):
+    """Returns a hash of the first and last size bytes before offset in a log file, used to check that a longer log
+    starts with the same data as one read before."""
+    fingerprint = hashlib.sha1()
+    with open(log_file_path, "rb") as log_file:
+        fingerprint.update(log_file.read(min(size, offset)))
+        log_file.seek(max(0, offset - size))
+        fingerprint.update(log_file.read(offset - max(0, offset - size)))
+    return fingerprint.hexdigest()
+
+
+def log_ingestor(log_lines, message_types=None, fmt_block=True):
+    """Sorts the lines of a log into their message types in a single pass.
+
+    Returns fmt_lines, a list of the FMT lines found at the start of the log (split about ", ") in the order they
+    were written, and message_data, a dictionary with the message type as the key and a list of all of the lines of
+    that message type (in the order they appear in the log) as the value. The lines are kept as strings, which takes
+    far less memory than keeping them split.
+
+    If message_types is given, only the lines of those message types are kept. Every other line is dropped once its
+    message type has been read from the start of the line, so it is never split or stored.
+
+    fmt_block is set to False when the lines do not start at the beginning of the log, so that no FMT block is
+    read."""
+    fmt_lines = []
+    message_data = {}
+    # The FMT block is only read until the first line of data, as before.
+    for line in log_lines:
+        # Finds the message type from the start of the line
+        message_type = line.split(", ", 1)[0]
+        if fmt_block is True:
+            if message_type == "FMT":
+                # Splits data into columns
+                fmt_lines.append(line.split(", "))
+            else:
+                fmt_block = False
+        # Skips the lines of message types which are not used
+        if message_types is not None and message_type not in message_types:
+            continue
+        # Buckets the line by its message type
+        try:
+            message_data[message_type].append(line)
+        except KeyError:
+            message_data[message_type] = [line]
+    return fmt_lines, message_data
+
+
+def log_line_sorter(log_lines, directory, message_types=None, fmt_block=True):
+    """Sorts the lines of a log into their message types in a single pass, in the same way as log_ingestor(), but
+    writes the lines of each message type to their own file in directory instead of keeping them in memory.
+
+    Returns fmt_lines and message_files, a dictionary with the message type as the key and the path to the file
+    containing its lines as the value. If message_types is given, only the lines of those message types are written.
+    fmt_block is used in the same way as by log_ingestor()."""
+    fmt_lines = []
+    message_files = {}
+    # Files opened so far for each message type
+    open_files = {}
+    # The FMT block is only read until the first line of data, as before.
+    try:
+        for line in log_lines:
+            # Finds the message type from the start of the line
+            message_type = line.split(", ", 1)[0]
+            if fmt_block is True:
+                if message_type == "FMT":
+                    # Splits data into columns
+                    fmt_lines.append(line.split(", "))
+                else:
+                    fmt_block = False
+            # Skips the lines of message types which are not used
+            if message_types is not None and message_type not in message_types:
+                continue
+            # Writes the line to the file for its message type
+            try:
+                open_files[message_type].write(line + "\n")
+            except KeyError:
+                # Files are numbered as message types are not always valid file names.
+                message_files[message_type] = directory + os.sep + str(len(open_files)) + ".log"
+                open_files[message_type] = open(message_files[message_type], "w")
+                open_files[message_type].write(line + "\n")
+    finally:
+        for message_file in open_files.values():
+            message_file.close()
+    return fmt_lines, message_files
+
+
+def line_splitter(line, number_of_columns):
+    """Splits a line of the log into its values, without the message type, so that there is exactly one value per
+    column. Text in the last column may contain ", " itself, so any extra values are joined back onto it, and missing
+    values at the end of a cut off line are left as empty strings."""
+    values = line.split(", ")[1:]
+    if len(values) > number_of_columns:
+        values[number_of_columns - 1:] = [", ".join(values[number_of_columns - 1:])]
+    elif len(values) < number_of_columns:
+        values += [""] * (number_of_columns - len(values))
+    return values
+
+
+def message_column_parser(fmt_line, lines, chunk_size=2 ** 16):
+    """Parses the lines of one message type into a list of NumPy arrays, one per column in the order of the columns
+    in the split FMT line fmt_line. Integers (including TimeUS) become int64, decimals become float64 and anything
+    else is kept as strings. The lines are parsed chunk_size at a time, so that only one chunk of text is held in
+    memory at once.
+
+    Message types made up only of numbers are parsed in bulk by the C parser of pandas.read_csv(). Those with text
+    columns (which are only ever written a few times a second) are split one line at a time, as text may itself
+    contain ", "."""
+    number_of_columns = len(fmt_line[-1].split(","))
+    numeric = all(format_character(fmt_line, index) in INTEGER_FORMATS + FLOAT_FORMATS
+                  for index in range(number_of_columns))
+    chunks = []
+    for start in range(0, len(lines), chunk_size):
+        chunk = lines[start:start + chunk_size]
+        columns = None
+        if numeric is True:
+            columns = table_parser(fmt_line, chunk, number_of_columns)
+        if columns is None:
+            columns = row_parser(fmt_line, chunk, number_of_columns)
+        chunks.append(columns)
+    return column_concatenator(chunks, number_of_columns)
+
+
+def table_parser(fmt_line, lines, number_of_columns):
+    """Parses lines of a message type made up only of numbers with pandas.read_csv(). The columns are returned in
+    the same form as from row_parser(), or None if any line has more values than there are columns, in which case
+    row_parser() is used instead to join the extra values onto the last column as before."""
+    # One more column than the FMT line has is read, so that lines with extra values can be found.
+    with warnings.catch_warnings():
+        # A first line with more than one extra value is warned about, but still leaves the extra column filled.
+        warnings.simplefilter("ignore", pd.errors.ParserWarning)
+        try:
+            frame = pd.read_csv(io.StringIO("\n".join(lines)), sep=",", skipinitialspace=True, header=None,
+                                names=list(range(number_of_columns + 2)), index_col=False,
+                                dtype={number_of_columns + 1: str}, keep_default_na=False,
+                                quoting=csv.QUOTE_NONE, engine="c")
+        except pd.errors.ParserError:
+            return None
+    if (frame[number_of_columns + 1] != "").any():
+        return None
+    columns = []
+    for index in range(number_of_columns):
+        column = frame[index + 1].to_numpy()
+        fc = format_character(fmt_line, index)
+        if column.dtype in [np.int64, np.uint64] and fc in INTEGER_FORMATS:
+            # pandas reads unsigned 64 bit values (Q) above the range of int64 as uint64.
+            columns.append(column)
+        elif column.dtype.kind in "if" and fc in FLOAT_FORMATS:
+            columns.append(column.astype(np.float64))
+        else:
+            # Missing values, text and anything else pandas did not read as a number are converted in the same way
+            # as by row_parser().
+            columns.append(column_parser(column.astype(str), fc))
+    return columns
+
+
+def row_parser(fmt_line, lines, number_of_columns):
+    """Parses lines of a message type by splitting them one at a time with line_splitter()."""
+    rows = [line_splitter(line, number_of_columns) for line in lines]
+    columns = []
+    for index in range(number_of_columns):
+        column = np.array([row[index] for row in rows])
+        columns.append(column_parser(column, format_character(fmt_line, index)))
+    return columns
+
+
+def column_concatenator(chunks, number_of_columns):
+    """Joins the columns parsed from each chunk of lines into one array per column."""
+    if len(chunks) == 0:
+        return [np.array([]) for _ in range(number_of_columns)]
+    if len(chunks) == 1:
+        return chunks[0]
+    return [np.concatenate([chunk[index] for chunk in chunks]) for index in range(number_of_columns)]
+
+
+def column_parser(column, format_character):
+    """Converts a column of strings to the type given by its format character. Integer columns with missing values
+    become float64 with NaN in their place, integer columns with values above the range of int64 (unsigned 64 bit Q
+    values) become uint64 and columns that cannot be converted are left as strings."""
+    if format_character not in INTEGER_FORMATS and format_character not in FLOAT_FORMATS:
+        return column
+    # Missing values are read as NaN
+    missing = column == ""
+    if missing.any():
+        column = np.where(missing, "nan", column)
+    elif format_character in INTEGER_FORMATS:
+        try:
+            return column.astype(np.int64)
+        except ValueError:
+            pass
+        except OverflowError:
+            try:
+                return column.astype(np.uint64)
+            except (ValueError, OverflowError):
+                # Values outside the range of uint64 as well are read as decimals.
+                pass
+    try:
+        return column.astype(np.float64)
+    except ValueError:
+        print("A column of {} values could not be read as numbers and has been kept as text.".format(len(column)))
+        return np.where(missing, "", column)
+
+
+def format_character(fmt_line, index):
+    """Returns the format character of column index of the message type described by the split FMT line fmt_line, or
+    an empty string if the format is shorter than the columns."""
+    message_format = fmt_line[4]
+    if index < len(message_format):
+        return message_format[index]
+    return ""
+
+
+def message_file_reader(fmt_line, file_path, chunk_size=2 ** 16):
+    """Parses the lines of one message type written to a file by log_line_sorter() in the same way as
+    message_column_parser(), yielding the columns of each chunk_size lines of the file in turn. Only one chunk is held
+    in memory at a time, so each can be saved before the next is read."""
+    with open(file_path, "r") as message_file:
+        while True:
+            # Removes the new line character from the end of each line
+            lines = [line[:-1] for line in islice(message_file, chunk_size)]
+            if len(lines) == 0:
+                break
+            yield message_column_parser(fmt_line, lines, chunk_size)
+
+
+def message_file_parser(fmt_line, file_path, chunk_size=2 ** 16):
+    """Parses the lines of one message type written to a file by log_line_sorter() into one array per column, joining
+    the chunks read by message_file_reader()."""
+    return column_concatenator(list(message_file_reader(fmt_line, file_path, chunk_size)),
+                               len(fmt_line[-1].split(",")))
@@ -1,13 +1,27 @@
 
 import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from openpyxl import Workbook
 from openpyxl.cell import WriteOnlyCell
+import numpy as np
+from autoflpy.util.log_ingestion import (column_concatenator, complete_line_offset, fmt_block_reader,
+                                         line_boundaries, log_fingerprint, log_ingestor, log_line_reader,
+                                         log_line_sorter, message_column_parser, message_file_reader, range_parser)
+from autoflpy.util.bin_reader import bin_log_reader
+from autoflpy.util.log_index import index_builder, index_line_reader, index_reader
+from autoflpy.util.time_window import window_byte_range, window_time_us, window_trimmer
+from autoflpy.util.flight_store import (CHECKPOINT_NAME, STORE_EXTENSION, checkpoint_reader, checkpoint_writer,
+                                        frame_creator, manifest_reader, manifest_writer, metadata_sheet, sheet_appender,
+                                        sheet_index_finder, sheet_reader, sheet_writer, store_format_selector)
 
 
 
 """
 This code converts a .log file (generated using mission planner from a .bin
-file) into a .xls document to be used with the automated flight log creator.
+file) or the .bin file itself into a flight store (and optionally a .xlsx
+document) to be used with the automated flight log creator.
 @author: Adrian Weishaeupl
 aw6g15@soton.ac.uk 2019
 
@@ -15,26 +29,105 @@ Based on work done by Samuel Pearson (sp1g18@soton.ac.uk) (06-08/2019)
 """
 
 
+# Number of rows on an xlsx sheet, including the heading line.
+XLSX_MAX_ROWS = 1048576
+# Separates the name of a sheet from the number of each further sheet its rows are split across in the xlsx file.
+CHUNK_SEPARATOR = "."
+
+# Name converter tables read so far, with the file path as the key and [modified time, table] as the value.
+name_converter_tables = {}
+
+
 def log_reader(log_file_path, name_converter_file_path, data_sources_path,
-               excel_file_path, excel_file_name, flight_date, flight_number, weather_data, runway_data, aircraft_data):
-    """Creates a formatted excel file from a log file. """
+               excel_file_path, excel_file_name, flight_date, flight_number, weather_data, runway_data, aircraft_data,
+               streaming=False, export_xlsx=False, resume=True, index=False, parse_workers=1, time_window=None,
+               xlsx_overflow="split", in_memory=False):
+    """Reads a log file and saves its data as a flight store (see flight_store.py) in excel_file_path, named
+    excel_file_name with the .flightdata extension. Files ending in .bin are read directly as DataFlash logs, anything
+    else is read as a .log file.
+
+    The log is read in separate steps: the data is read from the log (log_data_reader()), trimmed to the time window
+    (time_window_chunks()), saved to the flight store (flight_store_saver()) and, if asked for, written to an xlsx
+    file from the flight store (xlsx_exporter()).
+
+    The values are saved as numbers, with the time stamps kept as integer microseconds, so that they do not have to be
+    parsed from text again when the data is read.
+
+    If export_xlsx is set to True, the same data is also written to a formatted excel file, which can be opened by
+    the user but is no longer needed by the rest of AutoFLpy. A message type with more rows than fit on an xlsx sheet
+    (1,048,576 including the heading line) is either split across numbered sheets (IMU, IMU.2, IMU.3, ...) if
+    xlsx_overflow is "split", which flight_log_code.flight_data() joins back together, or written with only every
+    n-th row if xlsx_overflow is "decimate". The flight store always keeps every row.
+
+    If streaming is set to True, the lines of a .log file are sorted into temporary files on disk rather than being
+    held in memory, and each message type is then read from its file in turn, a chunk of lines at a time. Each chunk
+    is added onto the flight store as soon as it has been parsed, so the memory used depends on the size of a chunk
+    rather than the size of the log. Streaming does not apply to .bin files.
+
+    A checkpoint is saved with the flight store of a .log file, recording how far through the log was read. If resume
+    is set to True and the same log is read again after more has been written to it (for example when it is copied
+    off the ground station during a long flight), only the new lines are read, and their rows are added onto the end
+    of the columns already saved, so the data saved before is not read or written again.
+    The last line of a log is only read once it has been finished.
+
+    If index is set to True, a sidecar index of where the lines of each message type are in a .log file is saved next
+    to it (see log_index.py), and the log is read using it. When the log is read again, for example after a data
+    source has been added to Data_sources.txt, only the lines of the message types saved are read from the log. The
+    index is built again if the size or modification time of the log have changed.
+
+    If parse_workers is more than 1, a .log file is split into parts at the start of lines, which are parsed at the
+    same time in that many processes. The columns of each part are joined in the order of the parts in the log, so
+    the data saved is the same as if the log had been parsed in one process. This is not used when streaming.
+
+    If time_window is given as [start_time_hours, end_time_hours] (UTC hours on flight_date, see time_window.py),
+    only the rows with a time stamp inside the time window are saved. The time of day is found from the first GPS
+    message with a fix, and the part of a .log file around the time window is looked up from the time checkpoints of
+    its index if index is True, or found by a binary search otherwise, so the rest of the log is not read. If the log
+    has no GPS time, all of it is saved. No checkpoint is saved for a time window,
+    so the next read of the log is not carried on from it.
+
+    If in_memory is set to True, nothing is saved: the data frames that flight_log_code.flight_data() would read from
+    the flight store are returned instead, so that the flight data can be compiled without being written to disk and
+    read back. The whole log is read, as there is no checkpoint to carry on from, and no xlsx file is written."""
     print('Starting log reader')
-    print('Creating new work book')
-    # Creates a new write only workbook for faster writing
-    workbook = Workbook(write_only=True)
-    # Opens log file
-    print('Reading log file')
-    log_opened = open(log_file_path, "r")
-    # Reads contents
-    log_contents_text = log_opened.read()
-    # Closes file
-    log_opened.close()
-    # Opens file
-    name_list_opened = open(name_converter_file_path, "r")
-    # Reads contents
-    name_list_text = name_list_opened.read()
-    # Closes file
-    name_list_opened.close()
+    if xlsx_overflow not in ["split", "decimate"]:
+        raise ValueError('xlsx_overflow must be "split" or "decimate", not {}'.format(repr(xlsx_overflow)))
+    # Looks up the names and units of each heading from the name converter list, which is only read again if it changes
+    name_table = name_converter_table(name_converter_file_path)
+    data_sources = data_sources_reader(data_sources_path)
+    store_format = store_format_selector()
+    store_path = excel_file_path + os.sep + excel_file_name + STORE_EXTENSION
+    user_sheets = user_data_sheets(weather_data, runway_data, aircraft_data, flight_date, flight_number)
+
+    log_data = log_data_reader(log_file_path, data_sources, store_path, store_format, name_table, flight_date,
+                               flight_number, streaming, resume is True and in_memory is False, index, parse_workers,
+                               time_window)
+    try:
+        # Message types already said to be split or decimated in the xlsx file
+        planned_types = set()
+        if export_xlsx is True and in_memory is False:
+            planned_types = xlsx_export_planner(log_data, data_sources, xlsx_overflow)
+        sheets = message_sheets(log_file_path, log_data, data_sources, name_table, flight_date, flight_number)
+        if in_memory is True:
+            print('Compiling flight data')
+            frame_list = flight_frame_compiler(sheets, user_sheets)
+            print('Log reader finished for {}'.format(str(excel_file_name)))
+            return frame_list
+        print('Saving flight data')
+        flight_store_saver(store_path, sheets, user_sheets, log_data, log_file_path, data_sources, store_format)
+    finally:
+        if log_data["line_directory"] is not None:
+            shutil.rmtree(log_data["line_directory"])
+
+    if export_xlsx is True:
+        # The rows are read back from the flight store as they are written to the workbook.
+        print('Saving workbook')
+        xlsx_exporter(store_path, excel_file_path + os.sep + excel_file_name + ".xlsx", xlsx_overflow, planned_types)
+    print('Log reader finished for {}'.format(str(excel_file_name)))
+
+
+def data_sources_reader(data_sources_path):
+    """Returns the message types listed in the data sources file, skipping its key line."""
     # Opens file
     data_sources_opened = open(data_sources_path, "r")
     # Reads contents
@@ -42,152 +135,589 @@ def log_reader(log_file_path, name_converter_file_path, data_sources_path,
     # Closes file
     data_sources_opened.close()
     # Splits text from data sources into individual lines
-    data_sources = data_sources_text.split("\n")[1:]
-    # splits name list into lines and ignored the first key line.
-    name_list = name_list_text.split("\n")[1:]
-    # splits log contents about each new line
-    log_contents = log_contents_text.split("\n")
-
-    # Goes through each line
-    print('Populating work book')
-    for line in log_contents:
-        # Splits data into columns
-        data = line.split(", ")
-        if data[0] == "FMT":
-            # Specifies whether data is available
-            data_available = False
-            # Checks to see if data was recorded for a particular heading.
-            for check_line in log_contents:
-                # splits data into lines
-                check_line_list = check_line.split(", ")
-                # Checks through all data to see if there was any data recorded
-                # for a particular variable.
-                if data[3] == check_line_list[0]:
-                    # Specifies that data is available
-                    data_available = True
-                    # breaks from for loop
-                    break
-            if data[3] != "FMT" and data[3] != "UNIT" and data[3] != "FMTU" \
-                    and data_available is True and data[3] in data_sources:
-
-                # Defines line for titles and resets this for every sheet
-                heading_line = []
-
-                # Creates a new worksheet for all of the data.
-                worksheet = workbook.create_sheet(title=data[3])
-
-                # Excludes the first time column and puts it at the end.
-                data_list_time_end = data[-1].split(",")[1:]
-                # Appends time column at the end.
-                data_list_time_end.append(data[-1].split(",")[0])
-                # Creates the headings and appends the time column to the end
-                # to match the format of the previous data sets.
-                for heading_name in data_list_time_end:
-                    # Code will be here to find the units
-                    unit = "unavailable_"
-                    # heading name check code will go here.
-                    heading = heading_name
-                    # Goes through the names in the name_list to check the
-                    # units
-                    for name_data in name_list:
-                        # splits name list
-                        name_info = name_data.split(", ")
-                        # Checks to see if the information in the list matches
-                        # that being from the log file
-                        if name_info[0] == data[3] and name_info[1] == \
-                                heading_name:
-                            # Sets heading name to be same as from name
-                            heading = name_info[2]
-                            # Checks to see if there were units
-                            if unit == "no unit":
-                                unit = ""
-                            else:
-                                # Sets unit to be that from name converter list
-                                unit = name_info[3] + "_"
-                            break
-                    # Creates heading from data
-                    heading = heading + "_" + unit + data[3] + "_" + flight_date + "_Flight" + flight_number
-
-                    # Creates the heading line
-                    heading_cell = WriteOnlyCell(worksheet, value=heading)
-                    heading_line.append(heading_cell)
-
-                # Writes heading line to the worksheet
-                worksheet.append(heading_line)
-
-                # Goes through all data searching for a match
-                for lines in log_contents:
-                    # Splits line data
-                    line_data = lines.split(", ")
-                    #  Checks to see if data name is the one being searched.
-                    if line_data[0] == data[3]:
-                        # Resets row to be written
-                        row = []
-                        # Goes through all data in line, starting from the
-                        # column after the time column
-                        for recorded_data in line_data[2:]:
-                            row.append(recorded_data)
-                        # Appends time data for the row
-                        row.append(line_data[1])
-                        # Writes the row to the worksheet
-                        worksheet.append(row)
-        else:
-            # Ends for loop and so saves code
-            break
-
-    # Adds custom weather data to the xlsx document
-    worksheet = workbook.create_sheet("WEATHER_DATA")
-    weather_keys_to_be_named = list(weather_data.keys())
-    weather_keys_to_be_named.append("dummy_time")  # To sort the runway data in flight_data_time_sorter()
-    # Formats names correctly
-    weather_keys = []
-    for key in weather_keys_to_be_named:
-        weather_keys.append(str(key) + "_WEATHER_" + str(flight_date) + "_Flight" + str(flight_number))
-    weather_values = list(weather_data.values())
-    weather_values.append("N/A")
-    worksheet.append(weather_keys)
-    worksheet.append(weather_values)
-
-    # Adds custom runway data to the xlsx document
-    worksheet = workbook.create_sheet("RUNWAY_DATA")
-    runway_keys_to_be_named = list(runway_data.keys())
-    runway_keys_to_be_named.append("dummy_time")  # To sort the runway data in flight_data_time_sorter()
-    # Formats names correctly
-    runway_keys = []
-    for key in runway_keys_to_be_named:
-        runway_keys.append(str(key) + "_RUNWAY_" + str(flight_date) + "_Flight" + str(flight_number))
-    runway_values = list(runway_data.values())
-    runway_values.append("N/A")
-    worksheet.append(runway_keys)
-    worksheet.append(runway_values)
-
-    # Adds custom aircraft data to the xlsx document
-    worksheet = workbook.create_sheet("AIRCRAFT_DATA")
-    aircraft_keys_to_be_named = list(aircraft_data.keys())
-    aircraft_keys_to_be_named.append("dummy_time")  # To sort the runway data in flight_data_time_sorter()
-    # Formats names correctly
-    aircraft_keys = []
-    for key in aircraft_keys_to_be_named:
-        aircraft_keys.append(str(key) + "_AIRCRAFT_" + str(flight_date) + "_Flight" + str(flight_number))
-    aircraft_values = list(aircraft_data.values())
-    aircraft_values.append("N/A")
-    worksheet.append(aircraft_keys)
-    worksheet.append(aircraft_values)
-
-    # Saves file
-    print('Saving workbook')
-    xlsx_file_name_and_path = excel_file_path + os.sep + excel_file_name + ".xlsx"
-    workbook.save(filename=xlsx_file_name_and_path)
-    print('Log reader finished for {}'.format(str(excel_file_name)))
+    return data_sources_text.split("\n")[1:]
+
+
+def log_data_reader(log_file_path, data_sources, store_path, store_format, name_table, flight_date, flight_number,
+                    streaming=False, resume=True, index=False, parse_workers=1, time_window=None):
+    """Reads the data of the selected data sources from a .bin or .log file (see log_reader() for the options).
+    Returns a dictionary of what was read, which the later steps of log_reader() use:
+    "fmt_lines": the split FMT lines of the log.
+    "message_columns": the typed columns of each message type parsed while reading the log.
+    "message_files": the files the lines of each message type were sorted into when streaming, in "line_directory",
+    which is to be removed once they have been read.
+    "log_index": the sidecar index the lines of each message type are read from when they are saved, or None.
+    "start" and "end": the byte offsets of the part of a .log file read.
+    "window_us": the time window as [start, end] in the TimeUS of the log, or None if all of it is kept.
+    "checkpoint": the checkpoint of the flight store carried on from, or None, with the manifest entries of the sheets
+    it saved for each message type ("previous_sheets") and the index to number the files of new sheets from
+    ("first_sheet_index").
+    "resumable": whether a checkpoint can be saved with the flight store, which is only the case for the whole of a
+    .log file."""
+    if os.path.splitext(log_file_path)[1].lower() == ".bin":
+        return bin_data_reader(log_file_path, data_sources, flight_date, time_window)
+
+    # Only complete lines are read, as the last line of a log that is still being written may be cut off.
+    end = complete_line_offset(log_file_path)
+    if end < os.path.getsize(log_file_path):
+        print("The last line of the log has not been finished, so it has not been read.")
+    start = 0
+    checkpoint = None
+    log_index = None
+    fmt_lines = None
+    previous_sheets = {}
+    first_sheet_index = 0
+    if resume is True and time_window is None:
+        checkpoint = checkpoint_matcher(store_path, log_file_path, end, data_sources, store_format, name_table,
+                                        flight_date, flight_number)
+    if checkpoint is None and index is True:
+        # The sidecar index is built again if the log has changed since it was built.
+        log_index = index_reader(log_file_path)
+        if log_index is None or log_index["end"] != end:
+            print('Indexing log file')
+            log_index = index_builder(log_file_path, end)
+    if checkpoint is not None:
+        # Carries on from the end of the lines read before.
+        print('Reading log file from byte {}'.format(checkpoint["offset"]))
+        start = checkpoint["offset"]
+        previous_sheets, first_sheet_index = checkpoint_sheets(store_path, checkpoint)
+        # The FMT block was read with the start of the log.
+        fmt_lines = checkpoint["fmt_lines"]
+    elif log_index is not None:
+        # The lines of each message type are read from the log when it is saved.
+        print('Reading log file using its index')
+        fmt_lines = log_index["fmt_lines"]
+    else:
+        print('Reading log file')
+        if time_window is not None or (streaming is False and parse_workers > 1):
+            # The FMT block is read first, as only part of the log is read after it.
+            fmt_lines = fmt_block_reader(log_file_path)
+    window_us = None
+    if time_window is not None:
+        window_us, start, end = log_window_finder(log_file_path, fmt_lines, flight_date, time_window, start, end,
+                                                  log_index)
+    message_columns = {}
+    message_files = {}
+    line_directory = None
+    if log_index is None:
+        fmt_lines, message_columns, message_files, line_directory = log_line_parser(
+            log_file_path, start, end, fmt_lines, data_sources, streaming, parse_workers)
+    return {"fmt_lines": fmt_lines, "message_columns": message_columns, "message_files": message_files,
+            "line_directory": line_directory, "log_index": log_index, "start": start, "end": end,
+            "window_us": window_us, "checkpoint": checkpoint, "previous_sheets": previous_sheets,
+            "first_sheet_index": first_sheet_index, "resumable": time_window is None}
+
+
+def bin_data_reader(log_file_path, data_sources, flight_date, time_window=None):
+    """Decodes the messages of the selected data sources from a .bin file straight into columns for each message
+    type. Returns a dictionary of what was read (see log_data_reader())."""
+    print('Reading bin file')
+    selected_types = set(data_sources)
+    if time_window is not None:
+        # The GPS messages are needed to find the time window, even if they are not saved.
+        selected_types.add("GPS")
+    fmt_lines, message_columns = bin_log_reader(log_file_path, selected_types)
+    window_us = None
+    if time_window is not None:
+        window_us = window_time_us(fmt_lines, flight_date, time_window, gps_columns=message_columns.get("GPS"))
+        if window_us is None:
+            print("No GPS time was found in the log, so all of it has been saved.")
+    return {"fmt_lines": fmt_lines, "message_columns": message_columns, "message_files": {}, "line_directory": None,
+            "log_index": None, "start": 0, "end": None, "window_us": window_us, "checkpoint": None,
+            "previous_sheets": {}, "first_sheet_index": 0, "resumable": False}
+
+
+def log_window_finder(log_file_path, fmt_lines, flight_date, time_window, start, end, log_index=None):
+    """Returns the time window as [start, end] in the TimeUS of a .log file, or None if the log has no GPS time, and
+    the byte offsets of the part of the log between start and end around the time window."""
+    window_us = window_time_us(fmt_lines, flight_date, time_window, log_file_path, end)
+    if window_us is None:
+        print("No GPS time was found in the log, so all of it has been read.")
+        return window_us, start, end
+    # The time checkpoints of the index are used in place of searching the log, if it has an index.
+    start, end = window_byte_range(log_file_path, fmt_lines, window_us, start, end,
+                                   None if log_index is None else log_index["time_checkpoints"])
+    print('Reading bytes {0} to {1} of the log file for the time window'.format(start, end))
+    return window_us, start, end
+
+
+def log_line_parser(log_file_path, start, end, fmt_lines, data_sources, streaming=False, parse_workers=1):
+    """Reads the lines of the selected data sources between the byte offsets start and end of a .log file. The FMT
+    block is read from the log with them if fmt_lines is None. Returns the split FMT lines, the typed columns of each
+    message type, and the files the lines of each message type were sorted into when streaming with the temporary
+    directory holding them (or None)."""
+    message_columns = {}
+    message_files = {}
+    line_directory = None
+    if streaming is False and parse_workers > 1:
+        # Parses parts of the log in separate processes, using the FMT block read from the start of the log.
+        print('Parsing log file using {} processes'.format(parse_workers))
+        message_columns = parallel_log_parser(log_file_path, start, end, [
+            data for data in fmt_lines if sheet_selected(data, data_sources) is True], parse_workers)
+        return fmt_lines, message_columns, message_files, line_directory
+    # Message types whose lines are kept when the log is read. The lines of every other message type are dropped as
+    # soon as their message type is known.
+    selected_types = set(data_sources)
+    log_lines = log_line_reader(log_file_path, start=start, end=end)
+    # The FMT block is only read from the log here if it has not been read already.
+    if streaming is True:
+        # Sorts every line of a selected message type into a file for its message type in a single pass.
+        line_directory = tempfile.mkdtemp()
+        block_lines, message_files = log_line_sorter(log_lines, line_directory, selected_types, fmt_lines is None)
+    else:
+        # Reads the log file one line at a time and sorts the lines of the selected message types in a single pass.
+        block_lines, message_data = log_ingestor(log_lines, selected_types, fmt_lines is None)
+    if fmt_lines is None:
+        fmt_lines = block_lines
+    if streaming is False:
+        # Parses the lines of each message type to be written into typed columns
+        for data in fmt_lines:
+            if sheet_selected(data, data_sources) is True and data[3] in message_data:
+                message_columns[data[3]] = message_column_parser(data, message_data.pop(data[3]))
+    return fmt_lines, message_columns, message_files, line_directory
+
+
+def message_chunk_reader(log_file_path, log_data, data):
+    """Returns the columns of the message type described by the split FMT line data from the data read from the log
+    by log_data_reader(), as an iterable of chunks of columns with the time column first."""
+    if data[3] in log_data["message_columns"]:
+        return [log_data["message_columns"][data[3]]]
+    if data[3] in log_data["message_files"]:
+        # The lines of the message type being saved are read from its file a chunk at a time, and each chunk is
+        # saved before the next is read.
+        return message_file_reader(data, log_data["message_files"][data[3]])
+    log_index = log_data["log_index"]
+    if log_index is not None and data[3] in log_index["message_types"]:
+        # Only the lines of the message type being saved are read from the log.
+        return [message_column_parser(data, index_line_reader(log_file_path, log_index, data[3], log_data["start"],
+                                                              log_data["end"]))]
+    return []
+
+
+def time_window_chunks(data, chunks, window_us):
+    """Yields each chunk of columns of the message type described by the split FMT line data with only the rows inside
+    the time window window_us ([start, end] in the TimeUS of the log) kept, or with every row if window_us is None.
+    Chunks left without any rows are skipped."""
+    for columns in chunks:
+        if window_us is not None:
+            columns = window_trimmer(data, columns, window_us)
+        if len(columns[0]) > 0:
+            yield columns
+
+
+def message_sheets(log_file_path, log_data, data_sources, name_table, flight_date, flight_number):
+    """Yields the split FMT line, the headings and the chunks of columns of each selected message type read from the
+    log by log_data_reader(), in the order of the FMT block. The chunks are trimmed to the time window and read one at
+    a time, with the time column moved to the end to match the headings."""
+    # Goes through each FMT line
+    for data in log_data["fmt_lines"]:
+        # Checks to see if data was recorded for a particular heading.
+        if sheet_selected(data, data_sources) is False:
+            continue
+        chunks = time_window_chunks(data, message_chunk_reader(log_file_path, log_data, data), log_data["window_us"])
+        # Moves the time column to the end to match the format of the previous data sets.
+        yield (data, heading_creator(data, name_table, flight_date, flight_number),
+               (columns[1:] + columns[:1] for columns in chunks))
+
+
+def flight_store_saver(store_path, sheets, user_sheets, log_data, log_file_path, data_sources, store_format):
+    """Saves the message types yielded by message_sheets() and the weather, runway and aircraft data sheets from
+    user_data_sheets() as a flight store at store_path. Each chunk of columns is added onto its sheet as soon as it
+    has been read. When carrying on from a checkpoint, the new rows are added onto the end of the sheets already
+    saved. Otherwise the store is written to a partial store first, which only replaces the previous one once it is
+    complete. A checkpoint of how far through the log was read is saved with the store if it can be carried on from."""
+    # The store is written here first and only replaces the previous one once it is complete.
+    partial_store_path = store_path + ".partial"
+    if log_data["checkpoint"] is not None:
+        # The new rows are added onto the end of the flight store. Its checkpoint is removed first, so that if this
+        # is stopped part way through, the whole log is read again next time.
+        save_path = store_path
+        os.remove(store_path + os.sep + CHECKPOINT_NAME)
+    else:
+        if os.path.isdir(partial_store_path):
+            shutil.rmtree(partial_store_path)
+        save_path = partial_store_path
+    # Manifest entries of the sheets saved
+    saved_sheets = []
+    # Sheet name and number of rows saved for each message type
+    message_types = {}
+    for data, headings, chunks in sheets:
+        # Manifest entry of the sheet once its first rows are saved. The new rows are added onto the sheet of the
+        # rows read before.
+        sheet = log_data["previous_sheets"].get(data[3])
+        sheet_name = sheet_namer(data[3], saved_sheets) if sheet is None else sheet["name"]
+        for columns in chunks:
+            if sheet is None:
+                sheet = sheet_writer(save_path, log_data["first_sheet_index"] + len(saved_sheets), sheet_name,
+                                     headings, columns, store_format)
+            else:
+                sheet = sheet_appender(save_path, sheet, columns, store_format)
+        if sheet is None:
+            continue
+        saved_sheets.append(sheet)
+        if data[3] not in message_types:
+            message_types[data[3]] = {"sheet": sheet_name, "rows": sheet["rows"]}
+
+    manifest_writer(save_path, saved_sheets + user_sheets, store_format)
+    if log_data["resumable"] is True:
+        # Only a store of the whole log can be carried on from.
+        checkpoint_writer(save_path, {"offset": log_data["end"],
+                                      "fingerprint": log_fingerprint(log_file_path, log_data["end"]),
+                                      "fmt_lines": log_data["fmt_lines"], "data_sources": data_sources,
+                                      "format": store_format, "message_types": message_types})
+    if save_path == partial_store_path:
+        # Replaces the data saved from a previous run
+        if os.path.isdir(store_path):
+            shutil.rmtree(store_path)
+        os.rename(partial_store_path, store_path)
+
+
+def flight_frame_compiler(sheets, user_sheets):
+    """Returns the data frames of the message types yielded by message_sheets() and of the weather, runway and
+    aircraft data sheets from user_data_sheets(), as flight_log_code.flight_data() would read them from a flight
+    store, without saving anything."""
+    frame_list = []
+    for data, headings, chunks in sheets:
+        chunk_list = list(chunks)
+        if len(chunk_list) > 0:
+            frame_list.append(frame_creator(column_concatenator(chunk_list, len(headings)), headings))
+    for sheet in user_sheets:
+        frame_list.append(frame_creator(sheet_reader(None, sheet, None), sheet["headings"]))
+    return frame_list
+
+
+def user_data_sheets(weather_data, runway_data, aircraft_data, flight_date, flight_number):
+    """Returns the manifest entries of the sheets of the custom weather, runway and aircraft data of a flight."""
+    sheets = []
+    for sheet_name, label, user_data in [["WEATHER_DATA", "_WEATHER_", weather_data],
+                                         ["RUNWAY_DATA", "_RUNWAY_", runway_data],
+                                         ["AIRCRAFT_DATA", "_AIRCRAFT_", aircraft_data]]:
+        keys_to_be_named = list(user_data.keys())
+        keys_to_be_named.append("dummy_time")  # To sort the user data in flight_data_time_sorter()
+        # Formats names correctly
+        keys = []
+        for key in keys_to_be_named:
+            keys.append(str(key) + label + str(flight_date) + "_Flight" + str(flight_number))
+        values = list(user_data.values())
+        values.append("N/A")
+        sheets.append(metadata_sheet(sheet_name, keys, values))
+    return sheets
+
+
+def xlsx_export_planner(log_data, data_sources, xlsx_overflow):
+    """Says up front how the message types with too many rows for an xlsx sheet are written to the xlsx file, using the
+    number of rows already known from reading the log (see xlsx_sheet_planner()). Returns the message types planned.
+    Nothing is planned for a time window, as the rows kept are only known once they have been trimmed."""
+    planned_types = set()
+    if log_data["window_us"] is not None:
+        return planned_types
+    log_index = log_data["log_index"]
+    for data in log_data["fmt_lines"]:
+        if sheet_selected(data, data_sources) is False:
+            continue
+        rows = None
+        if log_data["message_columns"].get(data[3]) is not None:
+            rows = len(log_data["message_columns"][data[3]][0])
+        elif log_index is not None and data[3] in log_index["message_types"]:
+            rows = log_index["message_types"][data[3]]["rows"]
+        if rows is not None and data[3] in log_data["previous_sheets"]:
+            rows += log_data["previous_sheets"][data[3]]["rows"]
+        if rows is not None:
+            xlsx_sheet_planner(data[3], rows, xlsx_overflow)
+            planned_types.add(data[3])
+    return planned_types
 
 
 def log_reader_multi(log_file_paths, name_converter_file_path, data_sources_path,
                      excel_file_path, excel_file_names, flight_dates, flight_numbers, weather_data_multi,
-                     runway_data_multi, aircraft_data_multi):
-    """Runs the log_reader for once per flight log entered in the Input_file.json"""
-    # Iterates through the number of flights
+                     runway_data_multi, aircraft_data_multi, streaming=False, export_xlsx=False, workers=1,
+                     index=False, parse_workers=1, time_windows=None, xlsx_overflow="split", in_memory=False):
+    """Runs the log_reader for once per flight log entered in the Input_file.json
+
+    If workers is more than 1, that many flights are read at the same time in separate processes. A flight that cannot
+    be read does not stop the others from being read: each failure is printed as it happens and an exception listing
+    the failed flights is raised once all of the flights have been tried. parse_workers is the number of processes
+    each log is parsed in (see log_reader()). time_windows is a list of the time window of each flight, or None to
+    save the whole of every log. xlsx_overflow is how message types with too many rows for an xlsx sheet are
+    written (see log_reader()).
+
+    If in_memory is True, nothing is saved and the list of data frames of each flight is returned instead (see
+    log_reader())."""
+    # The arguments for the log reader of each flight
+    flight_arguments = []
     for flight in range(len(flight_numbers)):
-        print("Creating workbook for {}".format(str(excel_file_names[flight])))
-        log_reader(log_file_paths[flight], name_converter_file_path, data_sources_path, excel_file_path,
-                   excel_file_names[flight], flight_dates[flight], flight_numbers[flight], weather_data_multi[flight],
-                   runway_data_multi[flight], aircraft_data_multi[flight])
+        flight_arguments.append([log_file_paths[flight], name_converter_file_path, data_sources_path, excel_file_path,
+                                 excel_file_names[flight], flight_dates[flight], flight_numbers[flight],
+                                 weather_data_multi[flight], runway_data_multi[flight], aircraft_data_multi[flight],
+                                 streaming, export_xlsx, True, index, parse_workers,
+                                 None if time_windows is None else time_windows[flight], xlsx_overflow, in_memory])
+    # Flights which could not be read, with the error raised
+    failures = []
+    # Data frames of each flight, when nothing is saved
+    frame_lists = [None] * len(flight_arguments)
+    if workers > 1 and len(flight_arguments) > 1:
+        print("Reading flight data for {0} flights using {1} processes".format(len(flight_arguments), workers))
+        with ProcessPoolExecutor(max_workers=min(workers, len(flight_arguments))) as executor:
+            futures = [executor.submit(log_reader, *arguments) for arguments in flight_arguments]
+            for flight in range(len(futures)):
+                try:
+                    frame_lists[flight] = futures[flight].result()
+                except Exception as error:
+                    failures.append([excel_file_names[flight], error])
+                    print("Reading flight data for {0} failed: {1}".format(str(excel_file_names[flight]), repr(error)))
+    else:
+        # Iterates through the number of flights
+        for flight in range(len(flight_arguments)):
+            print("Reading flight data for {}".format(str(excel_file_names[flight])))
+            try:
+                frame_lists[flight] = log_reader(*flight_arguments[flight])
+            except Exception as error:
+                failures.append([excel_file_names[flight], error])
+                print("Reading flight data for {0} failed: {1}".format(str(excel_file_names[flight]), repr(error)))
+    if len(failures) > 0:
+        # The error from the first failed flight is kept as the cause.
+        raise Exception("Flight data could not be read for {0} of {1} flights: {2}".format(
+            len(failures), len(flight_arguments), ", ".join(str(failure[0]) for failure in failures))) \
+            from failures[0][1]
+    if in_memory is True:
+        return frame_lists
+
+
+def xlsx_exporter(store_path, xlsx_file_path, xlsx_overflow="split", planned_sheets=()):
+    """Writes the data of a flight store to an xlsx file. How message types with more rows than fit on a sheet are
+    written is set by xlsx_overflow (see log_reader()). This is not said again for the sheets in planned_sheets, which
+    log_reader() has already planned from the rows read from the log."""
+    manifest = manifest_reader(store_path)
+    workbook = Workbook(write_only=True)
+    # Says up front how the sheets with too many rows are written.
+    sheets_rows = [None if "values" in sheet else xlsx_sheet_planner(sheet["name"], sheet["rows"], xlsx_overflow,
+                                                                     sheet["name"] not in planned_sheets)
+                   for sheet in manifest["sheets"]]
+    for sheet, sheet_rows in zip(manifest["sheets"], sheets_rows):
+        if sheet_rows is None:
+            # Weather, runway and aircraft data
+            worksheet = workbook.create_sheet(sheet["name"])
+            worksheet.append(sheet["headings"])
+            worksheet.append(sheet["values"])
+        else:
+            # Only the rows being written are read from the .npy files.
+            columns = sheet_reader(store_path, sheet, manifest["format"], memory_map=True)
+            xlsx_sheet_writer(workbook, sheet["name"], sheet["headings"], columns, sheet_rows)
+    workbook.save(filename=xlsx_file_path)
+
+
+def xlsx_export_starter(excel_file_path, excel_file_names, xlsx_overflow="split"):
+    """Starts writing the xlsx file of each flight from its flight store in a background thread, so that the flight
+    reports can be generated while they are written. Returns the exports to be passed to xlsx_export_finisher()."""
+    print("Writing xlsx files for {} flights in the background".format(len(excel_file_names)))
+    executor = ThreadPoolExecutor(max_workers=1)
+    futures = [executor.submit(xlsx_exporter, excel_file_path + os.sep + str(name) + STORE_EXTENSION,
+                               excel_file_path + os.sep + str(name) + ".xlsx", xlsx_overflow)
+               for name in excel_file_names]
+    # The thread finishes once the last xlsx file has been written.
+    executor.shutdown(wait=False)
+    return [excel_file_names, futures]
+
+
+def xlsx_export_finisher(exports, raise_failures=True):
+    """Waits for the xlsx files started by xlsx_export_starter() to be written. Each xlsx file that could not be
+    written is printed, and an exception listing them is raised once all of them have been tried, unless
+    raise_failures is False."""
+    excel_file_names, futures = exports
+    # Flights whose xlsx file could not be written, with the error raised
+    failures = []
+    for flight in range(len(futures)):
+        try:
+            futures[flight].result()
+        except Exception as error:
+            failures.append([excel_file_names[flight], error])
+            print("Writing the xlsx file for {0} failed: {1}".format(str(excel_file_names[flight]), repr(error)))
+    if len(failures) > 0 and raise_failures is True:
+        # The error from the first failed flight is kept as the cause.
+        raise Exception("xlsx files could not be written for {0} of {1} flights: {2}".format(
+            len(failures), len(futures), ", ".join(str(failure[0]) for failure in failures))) from failures[0][1]
+    print("xlsx files written for {0} of {1} flights".format(len(futures) - len(failures), len(futures)))
+
+
+def parallel_log_parser(log_file_path, start, end, fmt_lines, parse_workers):
+    """Parses the lines of a log between the byte offsets start and end in parse_workers processes, for the message
+    types of the split FMT lines fmt_lines. Returns a dictionary with the message type as the key and its columns as
+    the value, as read by log_ingestion.message_column_parser() from all of the lines at once."""
+    # Each part is at most 64 MB, so that the text of each part held in memory by each process stays small.
+    parts = max(parse_workers, -(-(end - start) // 2 ** 26))
+    boundaries = line_boundaries(log_file_path, start, end, parts)
+    with ProcessPoolExecutor(max_workers=parse_workers) as executor:
+        futures = [executor.submit(range_parser, log_file_path, boundaries[part], boundaries[part + 1], fmt_lines)
+                   for part in range(len(boundaries) - 1)]
+        part_columns = [future.result() for future in futures]
+    message_columns = {}
+    for data in fmt_lines:
+        chunks = [columns[data[3]] for columns in part_columns if data[3] in columns]
+        if len(chunks) > 0 and data[3] not in message_columns:
+            message_columns[data[3]] = column_concatenator(chunks, len(chunks[0]))
+    return message_columns
+
+
+def checkpoint_matcher(store_path, log_file_path, end, data_sources, store_format, name_table, flight_date,
+                       flight_number):
+    """Returns the checkpoint of the flight store at store_path if the log can be read on from it, or None if the whole
+    log has to be read again. This is only the case if the log starts with the same data as the log read before, and
+    the same data sources, names and format would be used to save it."""
+    checkpoint = checkpoint_reader(store_path)
+    if checkpoint is None or checkpoint["offset"] > end:
+        return None
+    if checkpoint["data_sources"] != data_sources or checkpoint["format"] != store_format:
+        return None
+    # The FMT block is only known to have been read in full once a line of data has been read after it.
+    if sum(message_type["rows"] for message_type in checkpoint["message_types"].values()) == 0:
+        return None
+    if log_fingerprint(log_file_path, checkpoint["offset"]) != checkpoint["fingerprint"]:
+        return None
+    manifest_sheets = {sheet["name"]: sheet for sheet in manifest_reader(store_path)["sheets"]}
+    for data in checkpoint["fmt_lines"]:
+        if data[3] not in checkpoint["message_types"]:
+            continue
+        sheet = manifest_sheets.get(checkpoint["message_types"][data[3]]["sheet"])
+        if sheet is None or sheet["rows"] != checkpoint["message_types"][data[3]]["rows"]:
+            return None
+        if sheet["headings"] != heading_creator(data, name_table, flight_date, flight_number):
+            return None
+    return checkpoint
+
+
+def checkpoint_sheets(store_path, checkpoint):
+    """Returns the manifest entries of the sheets saved in the flight store at store_path for each message type in the
+    checkpoint, and the index to number the files of new sheets from, after those of the sheets already saved."""
+    manifest = manifest_reader(store_path)
+    manifest_sheets = {sheet["name"]: sheet for sheet in manifest["sheets"]}
+    previous_sheets = {message_type: manifest_sheets[saved["sheet"]]
+                       for message_type, saved in checkpoint["message_types"].items()}
+    return previous_sheets, sheet_index_finder(manifest["sheets"])
+
+
+def name_converter_table(name_converter_file_path):
+    """Returns a dictionary with (data source, old variable name) as the key and [new variable name, unit] as the
+    value, read from the name converter list. The table is kept for the rest of the session and only read again when
+    the file is modified, so it is not parsed again for every flight."""
+    modified_time = os.stat(name_converter_file_path).st_mtime_ns
+    try:
+        cached_time, name_table = name_converter_tables[name_converter_file_path]
+        if cached_time == modified_time:
+            return name_table
+    except KeyError:
+        pass
+    # Opens file
+    name_list_opened = open(name_converter_file_path, "r")
+    # Reads contents
+    name_list_text = name_list_opened.read()
+    # Closes file
+    name_list_opened.close()
+    name_table = {}
+    # splits name list into lines and ignores the first key line.
+    for name_data in name_list_text.split("\n")[1:]:
+        # splits name list
+        name_info = name_data.split(", ")
+        # Skips blank and incomplete lines
+        if len(name_info) < 4:
+            continue
+        # The first entry for a heading is used, as before.
+        if (name_info[0], name_info[1]) not in name_table:
+            name_table[(name_info[0], name_info[1])] = [name_info[2], name_info[3]]
+    name_converter_tables[name_converter_file_path] = [modified_time, name_table]
+    return name_table
+
+
+def sheet_selected(data, data_sources):
+    """Checks whether the message type described by the split FMT line data is to be written to the workbook."""
+    return data[3] != "FMT" and data[3] != "UNIT" and data[3] != "FMTU" and data[3] in data_sources
+
+
+def sheet_namer(message_type, sheets):
+    """Returns the name of the sheet for a message type. If a sheet of that name has already been saved a number is
+    added, in the same way as openpyxl names repeated worksheets."""
+    sheet_names = [sheet["name"] for sheet in sheets]
+    sheet_name = message_type
+    number = 1
+    while sheet_name in sheet_names:
+        sheet_name = message_type + str(number)
+        number += 1
+    return sheet_name
+
+
+def heading_creator(data, name_table, flight_date, flight_number):
+    """Returns the headings of the columns of the message type described by the split FMT line data, with the time
+    column moved to the end."""
+    headings = []
+    # Excludes the first time column and puts it at the end.
+    data_list_time_end = data[-1].split(",")[1:]
+    # Appends time column at the end.
+    data_list_time_end.append(data[-1].split(",")[0])
+    # Creates the headings and appends the time column to the end
+    # to match the format of the previous data sets.
+    for heading_name in data_list_time_end:
+        # Used when the heading is not in the name converter list
+        unit = "unavailable_"
+        heading = heading_name
+        # Looks up the new name and unit of the heading
+        if (data[3], heading_name) in name_table:
+            heading = name_table[(data[3], heading_name)][0]
+            unit = name_table[(data[3], heading_name)][1] + "_"
+        # Creates heading from data
+        headings.append(heading + "_" + unit + data[3] + "_" + flight_date + "_Flight" + flight_number)
+    return headings
+
+
+def xlsx_sheet_planner(message_type, rows, xlsx_overflow, announce=True):
+    """Returns the rows of a message type written to each of its sheets in the xlsx file, as a list of slices of its
+    columns. Only one sheet is needed unless there are more rows than fit on a sheet, in which case the rows are
+    split across several sheets or decimated depending on xlsx_overflow (see log_reader()). The choice is printed if
+    announce is True."""
+    max_rows = XLSX_MAX_ROWS - 1
+    if rows <= max_rows:
+        return [slice(None)]
+    if xlsx_overflow == "decimate":
+        step = -(-rows // max_rows)
+        if announce is True:
+            print("{0} has {1} rows, more than the {2} that fit on an xlsx sheet, so only one in every {3} rows is "
+                  "written to the xlsx file. Every row is kept in the flight data.".format(message_type, rows,
+                                                                                           max_rows, step))
+        return [slice(None, None, step)]
+    sheet_rows = [slice(start, start + max_rows) for start in range(0, rows, max_rows)]
+    if announce is True:
+        print("{0} has {1} rows, more than the {2} that fit on an xlsx sheet, so it is split across {3} sheets in the "
+              "xlsx file.".format(message_type, rows, max_rows, len(sheet_rows)))
+    return sheet_rows
+
+
+def xlsx_sheet_writer(workbook, sheet_name, headings, columns, sheet_rows):
+    """Writes the columns of a message type to the workbook, with the rows of each slice in sheet_rows (from
+    xlsx_sheet_planner()) on their own sheet. The sheets after the first are numbered: IMU, IMU.2, IMU.3, ..."""
+    for chunk in range(len(sheet_rows)):
+        chunk_name = sheet_name if chunk == 0 else sheet_name + CHUNK_SEPARATOR + str(chunk + 1)
+        worksheet = sheet_creator(workbook, chunk_name, headings)
+        column_writer(worksheet, [column[sheet_rows[chunk]] for column in columns])
+
+
+def sheet_creator(workbook, sheet_name, headings):
+    """Creates a new worksheet and writes the heading line to it. Returns the worksheet."""
+    worksheet = workbook.create_sheet(title=sheet_name)
+    # Creates the heading line
+    heading_line = [WriteOnlyCell(worksheet, value=heading) for heading in headings]
+    # Writes heading line to the worksheet
+    worksheet.append(heading_line)
+    return worksheet
+
+
+def column_writer(worksheet, columns, chunk_size=2 ** 13):
+    """Writes the typed columns of a message type to the worksheet one row at a time. Missing values (NaN) are left as
+    empty cells. The columns are converted to python values chunk_size rows at a time to keep the memory used low."""
+    for start in range(0, len(columns[0]), chunk_size):
+        # Converts the columns to python values
+        column_values = []
+        for column in columns:
+            values = column[start:start + chunk_size].tolist()
+            if column.dtype.kind == "f" and np.isnan(column[start:start + chunk_size]).any():
+                values = [None if value != value else value for value in values]
+            column_values.append(values)
+        for row in zip(*column_values):
+            worksheet.append(row)
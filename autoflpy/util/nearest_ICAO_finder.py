@@ -13,26 +13,29 @@ import numpy as np
 import os
 import pandas as pd
 from openpyxl import load_workbook
+from autoflpy.util.flight_store import STORE_EXTENSION, store_column_reader
 
 
-def multi_icao_finder(file_path, file_names, flight_names):
-    """Runs the icao_finder for multiple file_names in the form of lists from the same file_path
+def multi_icao_finder(file_path, file_names, flight_names, frame_lists=None):
+    """Runs the icao_finder for multiple file_names in the form of lists from the same file_path, or for the data
+    frames of each flight in frame_lists if given.
 
     returns a list of ICAO codes found for the respective flights
     """
     icaos = []
     for flight in range(len(flight_names)):
         print("Finding ICAO for {}".format(flight_names[flight]))
-        icaos.append(icao_finder(file_path, file_names[flight]))
+        icaos.append(icao_finder(file_path, file_names[flight],
+                                 None if frame_lists is None else frame_lists[flight]))
     return icaos
 
 
-def icao_finder(file_path, file_name):
+def icao_finder(file_path, file_name, frame_list=None):
     """Puts together sub-functions to find the UAV's nearest ICAO"""
     # Finds airport latitudes and longitudes
     airport_data = airport_lat_long()
     # Finds uav latitude and longitude at switch on
-    uav_location = uav_lat_long(file_path, file_name)
+    uav_location = uav_lat_long(file_path, file_name, frame_list)
     # Finds the ICAO code of the closest airfield
     nearest_icao = closest_icao(uav_location, np.array([airport_data[:, 1],
                                                        airport_data[:, 2]]))
@@ -75,18 +78,30 @@ def airport_lat_long():
     return np.transpose(information)
 
 
-def uav_lat_long(file_path, file_name):
+def uav_lat_long(file_path, file_name, frame_list=None):
     """Returns the UAV's latitude and longitude from the start of the flight
-    (from the log files)"""
-    # Reads from the xls document
+    (from the flight store or xlsx file, or the data frames of the flight if frame_list is given)"""
     print('Finding UAV position')
-    uav_log_file = load_workbook(file_path + file_name, read_only=True)
-    # Finds the GPS spreadsheet
-    sheet = uav_log_file['GPS']
-    # Finds the first entry for the latitude and longitude
-    # NOTE: this might be unreliable for different input formats.
-    uav_lat = float(sheet['F2'].value)
-    uav_long = float(sheet['G2'].value)
+    if frame_list is not None:
+        # Finds the GPS data frame from the data source in its headings, with the columns in the same place as in the
+        # xls document.
+        gps_frame = [frame for frame in frame_list if frame.columns[0].split("_")[-3] == "GPS"][0]
+        uav_lat = float(gps_frame.iloc[0, 5])
+        uav_long = float(gps_frame.iloc[0, 6])
+    elif file_name.endswith(STORE_EXTENSION):
+        # Reads the first latitude and longitude from the GPS columns of the flight store, which are in the same place
+        # as in the xls document.
+        uav_lat = float(store_column_reader(file_path + file_name, 'GPS', 5)[0])
+        uav_long = float(store_column_reader(file_path + file_name, 'GPS', 6)[0])
+    else:
+        # Reads from the xls document
+        uav_log_file = load_workbook(file_path + file_name, read_only=True)
+        # Finds the GPS spreadsheet
+        sheet = uav_log_file['GPS']
+        # Finds the first entry for the latitude and longitude
+        # NOTE: this might be unreliable for different input formats.
+        uav_lat = float(sheet['F2'].value)
+        uav_long = float(sheet['G2'].value)
     uav_position = np.array([[uav_lat], [uav_long]])
     print('UAV position = ' + str(uav_lat) + ', ' + str(uav_long))
     return uav_position
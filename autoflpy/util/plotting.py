@@ -6,6 +6,10 @@ import scipy.interpolate as interp
 from requests import HTTPError
 from mpl_toolkits.axes_grid1 import make_axes_locatable
 import autoflpy.util.analysis.take_off_detection as take_off_detection
+from autoflpy.util.flight_dataset import OffsetChannel, channel_index, channel_indexer
+# Used by the flight report notebooks, which import everything from this module.
+from autoflpy.util.flight_dataset import FlightDataset  # noqa: F401
+from autoflpy.util.values_store import values_list_reader  # noqa: F401
 
 try:
     import geopandas as gpd
@@ -38,6 +42,9 @@ def graph_plotter(plot_information, values_list, x_limits=("x_min", "x_max"),
     is has been recorded and is present in the Data_sources.txt document.
 
     title_text allows the user to give figures custom titles in the form of a string.
+
+    values_list can also be a FlightDataset (see flight_dataset.py), as loaded by the flight reports, whose channel
+    index is built once and used by every figure it is plotted in.
     """
     title = None
     x = []
@@ -50,18 +57,28 @@ def graph_plotter(plot_information, values_list, x_limits=("x_min", "x_max"),
 
     plt.rcParams["figure.figsize"] = (15, 3)
 
+    # The index of the channels, used for all the lookups of this figure. The index of a FlightDataset is the one built
+    # with it, and for a values_list only the data sources plotted (with the map_info and GPS data of a map, and the EV
+    # data of the arm data) are indexed.
+    figure_sources = [information[2] for information in plot_information] + [str(source) for source in map_info[1:2]]
+    figure_sources += ["gps", "ev"]
+    index = channel_index(values_list, figure_sources)
+
     # Changes the values list to only include the data
     values_list, flight_dates_list, single_flight, number_of_flights = single_flight_detection(values_list)
 
-    # Applies the user defined offset to the values list (NOTE: This currently works for all figures and only needs to
-    # be done once in the notebook.
-    values_list = manual_time_offset(values_list, time_x_offset, number_of_flights)
+    # Applies the user defined offset to the time data of this figure. The values list itself is not changed.
+    offset_values_list = manual_time_offset(values_list, time_x_offset, number_of_flights)
+    if offset_values_list is not values_list:
+        # The offset time data is used in place of the time data of the index, without building it again.
+        index = time_offset_index(index, time_x_offset)
+        values_list = offset_values_list
 
     # Formats the arm_data and checks that all the data is present
-    arm_data, arm_plot_data = arm_data_formatting(arm_data, values_list, number_of_flights, flight_dates_list)
+    arm_data, arm_plot_data = arm_data_formatting(arm_data, values_list, number_of_flights, flight_dates_list, index)
 
     # Selects the data to be plotted
-    plot_data = select_plot_data_single(values_list, plot_information, number_of_flights)
+    plot_data = select_plot_data_single(values_list, plot_information, number_of_flights, index)
 
     # Checks if the plot in question is a map plot
     if len(plot_data) != 0:
@@ -83,31 +100,14 @@ def graph_plotter(plot_information, values_list, x_limits=("x_min", "x_max"),
         # Adds data series to be called for the time of the map_info and GPS time (later used for interpolating
         # the data)
         map_info = [map_info, ["time", str(map_info[1])], ["time", "gps"]]
-        data_map = []
         plot_data_map = []
         for data_set in range(number_of_flights):
-            data_map_temp = []
             plot_data_map_temp = []
             try:
-                for index in map_info:
-                    values_list_index = 0
-                    # Checks to see if the 'data source' recorded in the graph list
-                    # matches the 'data sources' in the list structure values_list.
-                    for values_list_data in values_list[data_set]:
-                        # Finds data source.
-                        if index[1] == values_list_data[0].lower():
-                            data_map_temp.append([values_list_index, flight_dates_list[data_set]])
-                            # Finds corresponding time source.
-                            # Goes through each column searching for a match.
-                            for column in values_list[data_set][values_list_index][1:]:
-                                # Checks to see if they have the same title.
-                                if column[0].lower() == index[0]:
-                                    # if they do then the data is appended.
-                                    plot_data_map_temp.append([column, flight_dates_list[data_set]])
-                                    break
-
-                        values_list_index += 1
-                data_map.append(data_map_temp)
+                for name, data_source in map_info:
+                    # Finds the columns with the same data source and title.
+                    for column in index[data_set].get((data_source.lower(), name.lower()), []):
+                        plot_data_map_temp.append([column, flight_dates_list[data_set]])
                 plot_data_map.append(plot_data_map_temp)
             except IndexError:
                 print('map_info input variables not found. Check the input spelling and that the variable exists.')
@@ -430,6 +430,9 @@ def multiaxis_graph_plotter(plot_information_left, plot_information_right,
     is has been recorded and is present in the Data_sources.txt document.
 
     title_text allows the user to give figures custom titles in the form of a string.
+
+    values_list can also be a FlightDataset (see flight_dataset.py), as loaded by the flight reports, whose channel
+    index is built once and used by every figure it is plotted in.
     """
 
     text = None
@@ -442,16 +445,27 @@ def multiaxis_graph_plotter(plot_information_left, plot_information_right,
     plot_list = []
     plt.rcParams["figure.figsize"] = (15, 3)
 
+    # The index of the channels, used for all the lookups of this figure. The index of a FlightDataset is the one built
+    # with it, and for a values_list only the data sources plotted (with the EV data of the arm data) are indexed.
+    figure_sources = [information[2] for information in plot_information_left + plot_information_right] + ["ev"]
+    index = channel_index(values_list, figure_sources)
+
     # Changes the values list to only include the data
     values_list, flight_dates_list, single_flight, number_of_flights = single_flight_detection(values_list)
 
-    # Applies the user defined offset to the values list (NOTE: This currently works for all figures and only needs to
-    # be done once in the notebook.
-    values_list = manual_time_offset(values_list, time_x_offset, number_of_flights)
+    # Applies the user defined offset to the time data of this figure. The values list itself is not changed.
+    offset_values_list = manual_time_offset(values_list, time_x_offset, number_of_flights)
+    if offset_values_list is not values_list:
+        # The offset time data is used in place of the time data of the index, without building it again.
+        index = time_offset_index(index, time_x_offset)
+        values_list = offset_values_list
 
     # Formats the arm_data and checks that all the data is present
-    arm_data, arm_plot_data = arm_data_formatting(arm_data, values_list, number_of_flights, flight_dates_list)
+    arm_data, arm_plot_data = arm_data_formatting(arm_data, values_list, number_of_flights, flight_dates_list, index)
 
+    # Copies the lists given, so that the x values added below are not added to them.
+    plot_information_left = list(plot_information_left)
+    plot_information_right = list(plot_information_right)
     # Goes through all the elements in the left list
     for element in plot_information_left:
         # If the element contains an x value and is not already in the right
@@ -471,7 +485,7 @@ def multiaxis_graph_plotter(plot_information_left, plot_information_right,
 
     for information in plot_information:
         plot_data = []
-        plot_data.append(select_plot_data_single(values_list, information, number_of_flights))
+        plot_data.append(select_plot_data_single(values_list, information, number_of_flights, index))
         # Goes through the graph list and finds the matching values in the
         # values_list and then appends these values to a new list with x or y
         # stated. Returns plot data which has structure:
@@ -1300,34 +1314,23 @@ def single_flight_detection(values_list):
     return values_list, flight_data_list, single_flight, number_of_flights
 
 
-def arm_data_formatting(arm_data, values_list, number_of_flights, flight_data_list):
-    """Takes in arm data and formats it correctly"""
+def arm_data_formatting(arm_data, values_list, number_of_flights, flight_data_list, index=None):
+    """Takes in arm data and formats it correctly. index is the channel index of the values_list (see
+    flight_dataset.channel_indexer()), which is built from the values_list if it is not given."""
     arm_plot_data = None
     if arm_data is True:
+        if index is None:
+            index = channel_indexer(values_list)
         arm_plot_data = []
         # Imports data for the arming/disarming if it is present.
         arm_info = [["id", "ev"], ["time", "ev"]]
         for data_set in range(number_of_flights):
             arm_plot_data_temp = []
-            for index in arm_info:
-                values_list_index = 0
-                # Checks to see if the 'data source' recorded in the graph list
-                # matches the 'data sources' in the list structure values_list.
-                for values_list_data in values_list[data_set]:
-                    # Finds data source.
-                    if index[1] == values_list_data[0].lower():
-                        index.append(str(values_list_index))
-                        # Finds corresponding time source.
-                        # Goes through each column searching for a match.
-                        for column in values_list[data_set][int(values_list_index)][1:]:
-                            # Checks to see if they have the same title.
-                            if column[0].lower() == index[0]:
-                                # if they do then the data is appended.
-                                arm_label = flight_data_list[data_set]
-                                arm_plot_data_temp.append([arm_label, column])
-                                # exits for loop if data has been appended.
-                                break
-                    values_list_index += 1
+            for name, data_source in arm_info:
+                # Finds the columns with the same data source and title.
+                for column in index[data_set].get((data_source, name), []):
+                    arm_label = flight_data_list[data_set]
+                    arm_plot_data_temp.append([arm_label, column])
             arm_plot_data.append(arm_plot_data_temp)
 
     arm_data_list = []
@@ -1396,39 +1399,49 @@ def arm_data_plotting(arm_data, arm_plot_data, number_of_flights, axes_limits_ce
                 continue
 
 
-def select_plot_data_single(values_list, plot_information, number_of_flights):
+def select_plot_data_single(values_list, plot_information, number_of_flights, index=None):
     """
     List of data to plot returns values_list which has structure:
     [[[axis, [data_source, column], [axis, [data_source, column]],
-     [[axis, [data_source, column], [axis, [data_source, column]]]"""
+     [[axis, [data_source, column], [axis, [data_source, column]]]
+
+    index is the channel index of the values_list (see flight_dataset.channel_indexer()), which is built from the
+    values_list if it is not given."""
+    if index is None:
+        index = channel_indexer(values_list)
     plot_data = []
     for data_set in range(number_of_flights):
         plot_data_temp = []  # Will become a set of x and y data sets
         for data in plot_information:
-            values_list_index = 0
-            # Checks to see if the 'data source' recorded in the graph list
-            # matches the 'data sources' in the list structure values_list.
-            for values_list_data in values_list[data_set]:
-                # Finds data source.
-                if data[2].lower() == values_list_data[0].lower():
-                    data.append(values_list_index)
-                    # Goes through each column searching for a match.
-                    for column in values_list[data_set][values_list_index][1:]:
-                        # Checks to see if they have the same title.
-                        if column[0].lower() == data[1].lower():
-                            # if they do then the data is appended.
-                            plot_data_temp.append([data[0], column, data[2]])
-                            # exits for loop if data has been appended.
-                            break
-                values_list_index += 1
+            # Finds the columns with the same data source and title.
+            for column in index[data_set].get((data[2].lower(), data[1].lower()), []):
+                plot_data_temp.append([data[0], column, data[2]])
         plot_data.append(plot_data_temp)
 
     return plot_data
 
 
+def time_offset_index(index, time_x_offset):
+    """Returns a copy of a channel index (see flight_dataset.channel_indexer()) in which the "Time" channels of each
+    flight are views of the channels with the offset of the flight (see flight_dataset.OffsetChannel), as
+    manual_time_offset() gives for the values_list. The index given is not changed."""
+    offset_index = []
+    for flight_index, offset in zip(index, time_x_offset):
+        offset_flight_index = dict(flight_index)
+        for key, channels in flight_index.items():
+            if key[1] == "time":
+                offset_flight_index[key] = [OffsetChannel(channel, float(offset)) if channel[0] == "Time" else channel
+                                            for channel in channels]
+        offset_index.append(offset_flight_index)
+    return offset_index
+
+
 def manual_time_offset(values_list, time_x_offset, number_of_flights):
 
-    """Applies a manually defined time offset to the "Time" to all time columns in the values_list"""
+    """Applies a manually defined time offset to the "Time" to all time columns in the values_list. The values_list
+    given is not changed: a new values_list is returned, in which the time columns are views of the time columns of
+    the values_list with the offset of their flight (see flight_dataset.OffsetChannel), so only the time columns
+    plotted have the offset added to them."""
 
     # Checks that the time_x_offset is the same length as the number of flights and that it is present
     if not time_x_offset:
@@ -1440,14 +1453,13 @@ def manual_time_offset(values_list, time_x_offset, number_of_flights):
         pass
 
     # Adds the offset to the time data on the x axis
+    offset_values_list = []
     for flight in range(number_of_flights):
-        for sensor_index in range(len(values_list[flight])):
-            for data_set_index in range(len(values_list[flight][sensor_index])):
-                new_time_data = []
-                # Finds any x data with the tag of "Time"
-                if values_list[flight][sensor_index][data_set_index][0] == "Time":
-                    for data_point in values_list[flight][sensor_index][data_set_index][2]:
-                        new_time_data.append(float(data_point) + float(time_x_offset[flight]))
-                    values_list[flight][sensor_index][data_set_index][2] = new_time_data
-
-    return values_list
+        offset_sources = []
+        for source in values_list[flight]:
+            # Finds any x data with the tag of "Time"
+            offset_sources.append([source[0]] + [OffsetChannel(column, float(time_x_offset[flight]))
+                                                 if column[0] == "Time" else column for column in source[1:]])
+        offset_values_list.append(offset_sources)
+
+    return offset_values_list
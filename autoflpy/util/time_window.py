@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+Finds the part of a flight log recorded between two times of day (the
+start_time_hours and end_time_hours of the input file, in UTC), so that only
+that part of the log has to be read.
+
+The time stamps of a log (TimeUS) count from when the autopilot was turned on,
+so they are matched to the time of day using the GPS week (GWk) and time of
+week (GMS) of the first GPS message with a fix. The lines of a .log file are
+written in time order, so the part of the file containing the time window is
+looked up from the time checkpoints of its sidecar index (see log_index.py),
+or found by a binary search over the file if it has no index. The rows of each
+message type are then cut to the time window by a binary search of their
+TimeUS columns.
+
+@author: Adrian Weishaeupl
+aw6g15@soton.ac.uk 2019
+"""
+
+import calendar
+import time
+import numpy as np
+from autoflpy.util.log_ingestion import line_splitter, log_line_reader
+
+# Start of GPS time (6th January 1980) in seconds since 1970.
+GPS_EPOCH_S = 315964800
+# Seconds GPS time is ahead of UTC (since 2017).
+LEAP_SECONDS = 18
+SECONDS_PER_WEEK = 604800
+# Extra time read on either side of the time window, as the lines of different message types are not written in
+# exactly the order of their time stamps.
+MARGIN_US = 10 ** 6
+# Size of the part of the log below which the binary search stops.
+SEARCH_RESOLUTION = 2 ** 12
+
+
+def window_times(flight_date, start_time_hours, end_time_hours):
+    """Returns the start and end of the time window, in seconds since 1970, from the flight date (YYYYMMDD) and the
+    start and end hours (UTC). An end hour at or before the start hour is taken to be on the next day."""
+    midnight = calendar.timegm(time.strptime(str(flight_date), "%Y%m%d"))
+    start = midnight + float(start_time_hours) * 3600
+    end = midnight + float(end_time_hours) * 3600
+    if end <= start:
+        end += 24 * 3600
+    return start, end
+
+
+def gps_clock_offset(gps_fmt_line, rows):
+    """Returns the number of microseconds to add to TimeUS to give the time since 1970, from the first of rows (each a
+    list of the values of a GPS message, without its message type) with a GPS week, or None if there is none."""
+    columns = gps_fmt_line[-1].split(",")
+    try:
+        time_index = columns.index("TimeUS")
+        week_index = columns.index("GWk")
+        week_ms_index = columns.index("GMS")
+    except ValueError:
+        return None
+    for row in rows:
+        try:
+            week = int(float(row[week_index]))
+            week_ms = int(float(row[week_ms_index]))
+            time_us = int(float(row[time_index]))
+        except (IndexError, ValueError):
+            continue
+        if week > 0:
+            return (GPS_EPOCH_S + week * SECONDS_PER_WEEK - LEAP_SECONDS) * 10 ** 6 + week_ms * 1000 - time_us
+    return None
+
+
+def gps_line_rows(log_file_path, gps_fmt_line, end):
+    """Yields the values of each GPS line of a log up to the byte offset end."""
+    number_of_columns = len(gps_fmt_line[-1].split(","))
+    for line in log_line_reader(log_file_path, end=end):
+        if line.split(", ", 1)[0] == gps_fmt_line[3]:
+            yield line_splitter(line, number_of_columns)
+
+
+def window_time_us(fmt_lines, flight_date, time_window, log_file_path=None, end=None, gps_columns=None):
+    """Returns the time window as [start, end] in the TimeUS of the log, or None if the log has no GPS time.
+
+    The GPS time is read from the GPS lines of the log at log_file_path (reading only as far as the first GPS fix),
+    or from gps_columns, the columns of the GPS messages in the order of the FMT columns."""
+    gps_fmt_lines = [fmt_line for fmt_line in fmt_lines if fmt_line[3] == "GPS"]
+    if len(gps_fmt_lines) == 0:
+        return None
+    if gps_columns is not None:
+        rows = zip(*gps_columns)
+    else:
+        rows = gps_line_rows(log_file_path, gps_fmt_lines[0], end)
+    offset = gps_clock_offset(gps_fmt_lines[0], rows)
+    if offset is None:
+        return None
+    start_s, end_s = window_times(flight_date, time_window[0], time_window[1])
+    return [int(start_s * 10 ** 6) - offset, int(end_s * 10 ** 6) - offset]
+
+
+def timed_types(fmt_lines):
+    """Returns the set of message types whose first column is TimeUS."""
+    return set(fmt_line[3] for fmt_line in fmt_lines if fmt_line[-1].split(",")[0] == "TimeUS")
+
+
+def line_time(log_file, position, end, message_types):
+    """Returns [byte offset, TimeUS] of the first line starting at or after position with a time stamp, or None if
+    there is none before end."""
+    log_file.seek(max(0, position - 1))
+    if position > 0:
+        # Moves on to the start of the next line, unless position is already the start of a line.
+        log_file.readline()
+    while True:
+        line_start = log_file.tell()
+        if line_start >= end:
+            return None
+        values = log_file.readline().decode("utf-8", "replace").split(", ", 2)
+        if values[0] in message_types:
+            try:
+                return [line_start, int(values[1])]
+            except (IndexError, ValueError):
+                continue
+
+
+def time_offset_finder(log_file_path, time_us, start, end, message_types):
+    """Binary searches the lines of a log between the byte offsets start and end for the start of a line at or a
+    little before the first line with a time stamp of at least time_us."""
+    with open(log_file_path, "rb") as log_file:
+        low = start
+        high = end
+        while high - low > SEARCH_RESOLUTION:
+            middle = (low + high) // 2
+            found = line_time(log_file, middle, end, message_types)
+            if found is None or found[1] >= time_us:
+                high = middle
+            else:
+                low = middle
+        # Steps through the lines from low to the first with a time stamp of at least time_us.
+        position = low
+        while True:
+            found = line_time(log_file, position, end, message_types)
+            if found is None:
+                return end
+            if found[1] >= time_us:
+                return start if position == start else found[0]
+            position = found[0] + 1
+
+
+def window_byte_range(log_file_path, fmt_lines, window_us, start, end, time_checkpoints=None):
+    """Returns the byte offsets [start, end] of the lines of a log (between start and end) containing the time window
+    window_us, with a margin either side. If the time_checkpoints of the sidecar index of the log are given, the
+    offsets are looked up from them with checkpoint_byte_range(), and the log is only searched if there are none."""
+    if time_checkpoints:
+        return checkpoint_byte_range(time_checkpoints, window_us, start, end)
+    message_types = timed_types(fmt_lines)
+    window_start = time_offset_finder(log_file_path, window_us[0] - MARGIN_US, start, end, message_types)
+    window_end = time_offset_finder(log_file_path, window_us[1] + MARGIN_US, window_start, end, message_types)
+    return window_start, window_end
+
+
+def checkpoint_byte_range(time_checkpoints, window_us, start, end):
+    """Returns the byte offsets [start, end] of the part of a log (between start and end) containing the time window
+    window_us, with a margin either side, from the time_checkpoints of its sidecar index ([byte offset, TimeUS] of a
+    line at about every 1 MB of the log, in order). The part found runs from the last checkpoint before the window to
+    the first checkpoint after it, without reading the log."""
+    window_start = start
+    window_end = end
+    for offset, time_us in time_checkpoints:
+        if offset < start:
+            continue
+        if offset >= end:
+            break
+        if time_us < window_us[0] - MARGIN_US:
+            window_start = offset
+        elif time_us >= window_us[1] + MARGIN_US:
+            window_end = offset
+            break
+    return window_start, window_end
+
+
+def window_trimmer(fmt_line, columns, window_us):
+    """Returns the columns of a message type (in the order of the FMT columns) cut to the rows with a time stamp in the
+    time window window_us. The columns of message types without a time stamp are returned as they are."""
+    if fmt_line[-1].split(",")[0] != "TimeUS" or len(columns[0]) == 0:
+        return columns
+    time_us = columns[0]
+    if np.all(time_us[1:] >= time_us[:-1]):
+        # The time stamps are in order, so the ends of the window are found by a binary search.
+        rows = slice(np.searchsorted(time_us, window_us[0], "left"), np.searchsorted(time_us, window_us[1], "left"))
+    else:
+        rows = (time_us >= window_us[0]) & (time_us < window_us[1])
+    return [column[rows] for column in columns]
@@ -0,0 +1,413 @@
+# -*- coding: utf-8 -*-
+"""
+Saves the compiled flight data used by the flight report notebooks (the
+values_list made by flight_log_code.flight_data_and_axis()) as a folder with
+the .values extension, which is read back lazily.
+
+The folder contains a manifest.json, holding the flight identifiers, data
+sources, and the names and units of every channel, and one .npy file per
+channel. When the folder is read, the values_list is built from the manifest
+alone, and the data of each channel is only mapped in from its .npy file
+the first time it is used, as a read only array, so a report only holds the
+pages of the channels it plots in memory.
+
+A values store can be saved in a compact mode, in which float channels that
+keep the precision they were logged with as float32 are saved as float32,
+increasing channels such as time (whole numbers of microseconds) are saved as
+the differences between their values, and integer channels are saved with the
+smallest integer type that holds them. The values read back from a compact
+store are the values that were saved. The columns can also be compressed
+(losslessly) with zlib or lzma, although they are then no longer memory mapped.
+
+The values_list can also be saved as a single file, which is a pickle
+(protocol 5) of the values_list with the data of each channel as an array,
+whose buffers are saved out-of-band after the pickle. When the file is read,
+the arrays are made directly from the memory mapped file, without copying.
+
+@author: Adrian Weishaeupl
+aw6g15@soton.ac.uk 2019
+"""
+
+import functools
+import io
+import json
+import lzma
+import mmap
+import numbers
+import os
+import pickle as pk
+import shutil
+import struct
+import zlib
+import numpy as np
+
+# Out-of-band buffers need pickle protocol 5, which is part of Python 3.8 and is installed as pickle5 before it.
+if pk.HIGHEST_PROTOCOL >= 5:
+    pickle5 = pk
+    pickle5_available = True
+else:
+    try:
+        import pickle5
+
+        pickle5_available = True
+    except ImportError:
+        pickle5_available = False
+
+VALUES_EXTENSION = ".values"
+MANIFEST_NAME = "manifest.json"
+# Lossless compressions the columns of a values store can be saved with.
+COMPRESSIONS = {"zlib": zlib, "lzma": lzma}
+# Most decimal places looked for when finding the precision a float channel was logged with.
+MAX_DECIMALS = 9
+# Time channels are delta encoded as whole numbers of microseconds.
+TIME_SCALE = 10 ** 6
+# Start of a pickle saved with out-of-band buffers, followed by the pickle length and the number of buffers.
+PICKLE_MAGIC = b"AUTOFLPY-PICKLE5"
+PICKLE_HEADER = struct.Struct("<QQ")
+# Offset and length of each buffer, which start on multiples of BUFFER_ALIGNMENT bytes.
+BUFFER_ENTRY = struct.Struct("<QQ")
+BUFFER_ALIGNMENT = 64
+
+
+class LazyChannel(list):
+    """A channel of a values_list, [name, unit, data], whose data is read from its column (the path of a .npy file,
+    a memory mapped array or a function returning an array) the first time it is used. It behaves as the list it
+    replaces, and once its data has been read it is a read only array, memory mapped where the column is a .npy
+    file, so the data is not copied into a list of Python floats."""
+
+    def __init__(self, name, unit, column):
+        list.__init__(self, [name, unit, None])
+        self.column = column
+        self.loaded = False
+
+    def data_loader(self):
+        """Reads the data of the channel, if it has not been read already."""
+        if self.loaded is False:
+            # Only the pages of the file which are used are read from disk.
+            if isinstance(self.column, str):
+                data = np.load(self.column, mmap_mode="r", allow_pickle=False)
+            elif callable(self.column):
+                data = self.column()
+            else:
+                data = self.column
+            # A view, so that the column given is not made read only.
+            data = np.asarray(data).view()
+            data.flags.writeable = False
+            list.__setitem__(self, 2, data)
+            self.column = None
+            self.loaded = True
+
+    def __getitem__(self, index):
+        if self.loaded is False and (isinstance(index, slice) or index in [2, -1]):
+            self.data_loader()
+        return list.__getitem__(self, index)
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            self.data_loader()
+        elif index in [2, -1]:
+            # Data set by the notebook replaces the data saved.
+            self.loaded = True
+        list.__setitem__(self, index, value)
+
+    def __iter__(self):
+        self.data_loader()
+        return list.__iter__(self)
+
+    def __eq__(self, other):
+        self.data_loader()
+        data = list.__getitem__(self, 2)
+        if not isinstance(data, np.ndarray):
+            # Data set by the notebook.
+            return list.__eq__(self, other)
+        # The data read is an array, so it is compared value by value.
+        if not isinstance(other, (list, tuple)) or len(other) != 3:
+            return False
+        other_data = np.array(list(other[2]), dtype=object) if data.dtype == object else other[2]
+        return [self[0], self[1]] == [other[0], other[1]] and np.array_equal(data, other_data)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __repr__(self):
+        self.data_loader()
+        return list.__repr__(self)
+
+    def __reduce__(self):
+        # Pickled (and copied) as the list it stands in for.
+        self.data_loader()
+        return list, (list(list.__iter__(self)),)
+
+
+def column_converter(data):
+    """Returns the data of a channel as an array that can be saved without pickling, or None if its values are of
+    mixed types (such as numbers and "N/A"), in which case they are saved in the manifest."""
+    if isinstance(data, np.ndarray) and data.dtype.kind in "biufU":
+        return data
+    # Lists are checked value by value, as numpy would turn numbers mixed with text into text.
+    values = data.tolist() if isinstance(data, np.ndarray) else list(data)
+    if all(isinstance(value, str) for value in values):
+        return np.array(values, dtype=str)
+    if all(isinstance(value, numbers.Number) and not isinstance(value, bool) for value in values):
+        return np.array(values)
+    return None
+
+
+def logged_decimals(column):
+    """Returns the number of decimal places the finite values of a float column were logged with, or None if they have
+    more than MAX_DECIMALS."""
+    finite_values = column[np.isfinite(column)]
+    for decimals in range(MAX_DECIMALS + 1):
+        if np.array_equal(np.round(finite_values, decimals), finite_values):
+            return decimals
+    return None
+
+
+def time_delta_encoder(column):
+    """Returns the first value of a column (such as time) in microseconds and the differences between its values, or
+    None if the column is not increasing whole numbers of microseconds, which can be restored exactly."""
+    if column.size < 2 or not np.all(np.isfinite(column)):
+        return None
+    ticks = np.round(column * TIME_SCALE)
+    if not np.array_equal(ticks / TIME_SCALE, column):
+        return None
+    deltas = np.diff(ticks)
+    if deltas.min() < 0 or deltas.max() > np.iinfo(np.int32).max:
+        return None
+    return int(ticks[0]), deltas.astype(np.int32)
+
+
+def column_compactor(column):
+    """Returns the column to save for a channel in a compact values store, and the entries of the manifest needed to
+    restore it: an "encoding" of "delta" (increasing channels such as time), "float32" or "integer", and for float32
+    columns the number of decimals the channel was logged with and the largest error of a float32 value
+    ("error_bound"). Columns that can not be made smaller without losing their precision are returned as they are."""
+    if column.dtype.kind in "iu" and column.size > 0:
+        dtype = np.result_type(np.min_scalar_type(column.min()), np.min_scalar_type(column.max()))
+        return column.astype(dtype), {"encoding": "integer"}
+    if column.dtype.kind != "f" or column.dtype.itemsize <= 4:
+        return column, {}
+    column = np.asarray(column, dtype=np.float64)
+    delta_encoding = time_delta_encoder(column)
+    if delta_encoding is not None:
+        return delta_encoding[1], {"encoding": "delta", "start": delta_encoding[0]}
+    decimals = logged_decimals(column)
+    if decimals is None:
+        return column, {}
+    compact_column = column.astype(np.float32)
+    restored_column = compact_column.astype(np.float64)
+    finite = np.isfinite(column)
+    error_bound = float(np.max(np.abs(restored_column[finite] - column[finite]), initial=0))
+    # float32 is only used when rounding its values to the logged decimals gives the values saved.
+    if not np.array_equal(np.round(restored_column[finite], decimals), column[finite]):
+        return column, {"error_bound": error_bound}
+    return compact_column, {"encoding": "float32", "decimals": decimals, "error_bound": error_bound}
+
+
+def column_reader(store_path, channel, restore=True):
+    """Returns the column of a channel of a values store, memory mapped if it is not compressed. Delta encoded channels
+    are decoded, and if restore is True, float32 and integer channels are restored to the values saved."""
+    column_path = store_path + os.sep + channel["file"]
+    compression = channel.get("compression")
+    if compression is None:
+        column = np.load(column_path, mmap_mode="r", allow_pickle=False)
+    else:
+        with open(column_path, "rb") as column_file:
+            column_bytes = COMPRESSIONS[compression].decompress(column_file.read())
+        column = np.load(io.BytesIO(column_bytes), allow_pickle=False)
+    encoding = channel.get("encoding")
+    if encoding == "delta":
+        ticks = np.concatenate([[channel["start"]], channel["start"] + np.cumsum(column, dtype=np.int64)])
+        column = ticks / TIME_SCALE
+    elif encoding == "float32" and restore is True:
+        column = np.round(column.astype(np.float64), channel["decimals"])
+    elif encoding == "integer" and restore is True:
+        column = column.astype(np.int64)
+    return column
+
+
+def values_store_writer(store_path, values_list, compact=False, compression=None):
+    """Saves a values_list (a list of the output of flight_log_code.flight_data_and_axis() for each flight) to a
+    values store at store_path. The data of each channel can be a list or an array.
+
+    If compact is True, channels are saved in as little space as they can be without changing their values (see
+    column_compactor()), and compression ("zlib" or "lzma") compresses the column of each channel."""
+    if compression is not None and compression not in COMPRESSIONS:
+        raise ValueError("compression must be None or one of " + ", ".join(COMPRESSIONS) + ", not "
+                         + str(compression))
+    # The store is written here first and only replaces the previous one once it is complete.
+    partial_store_path = store_path + ".partial"
+    if os.path.isdir(partial_store_path):
+        shutil.rmtree(partial_store_path)
+    os.makedirs(partial_store_path)
+    flights = []
+    for flight_index, (flight_identifier, sources) in enumerate(values_list):
+        source_entries = []
+        for source_index, source in enumerate(sources):
+            channels = []
+            for channel_index, (name, unit, data) in enumerate(source[1:]):
+                column = column_converter(data)
+                if column is None:
+                    values = data.tolist() if isinstance(data, np.ndarray) else list(data)
+                    channels.append({"name": name, "unit": unit, "values": values})
+                    continue
+                channel = {"name": name, "unit": unit}
+                if compact is True:
+                    column, encoding = column_compactor(column)
+                    channel.update(encoding)
+                file_name = "{0}_{1}_{2}.npy".format(flight_index, source_index, channel_index)
+                if compression is None:
+                    np.save(partial_store_path + os.sep + file_name, column, allow_pickle=False)
+                else:
+                    column_bytes = io.BytesIO()
+                    np.save(column_bytes, column, allow_pickle=False)
+                    file_name += "." + compression
+                    with open(partial_store_path + os.sep + file_name, "wb") as column_file:
+                        column_file.write(COMPRESSIONS[compression].compress(column_bytes.getvalue()))
+                    channel["compression"] = compression
+                channel["file"] = file_name
+                channels.append(channel)
+            source_entries.append({"name": source[0], "channels": channels})
+        flights.append({"flight": flight_identifier, "sources": source_entries})
+    # The manifest is written last, so a store is only read once all of its channels have been saved.
+    with open(partial_store_path + os.sep + MANIFEST_NAME, "w") as manifest_file:
+        json.dump({"flights": flights}, manifest_file, indent=1)
+    if os.path.isdir(store_path):
+        shutil.rmtree(store_path)
+    os.rename(partial_store_path, store_path)
+    if compact is True:
+        encodings = [row[3].get("encoding") for row in compact_report(store_path)]
+        print("Compact values: {0} of {1} channels saved as float32, {2} increasing channels delta encoded and {3} "
+              "integer channels narrowed".format(encodings.count("float32"), len(encodings),
+                                                 encodings.count("delta"), encodings.count("integer")))
+
+
+def compact_report(store_path):
+    """Returns a row for each channel of a values store: [flight, data source, channel name, manifest entry], where
+    the manifest entry holds the "encoding" of a compact channel and, for float channels, the "error_bound", the
+    largest difference between a value and its float32 value. float32 is used for the channels where this is less
+    than half of the last decimal place logged."""
+    with open(store_path + os.sep + MANIFEST_NAME) as manifest_file:
+        manifest = json.load(manifest_file)
+    report = []
+    for flight in manifest["flights"]:
+        for source in flight["sources"]:
+            for channel in source["channels"]:
+                if "values" not in channel:
+                    report.append([flight["flight"], source["name"], channel["name"], channel])
+    return report
+
+
+def values_pickle_writer(file_path, values_list):
+    """Saves a values_list as a single file: a pickle (protocol 5) of the values_list, with the data of each channel
+    as an array, followed by the buffers of the arrays, which are saved out-of-band so they can be read without
+    copying them."""
+    if pickle5_available is False:
+        raise Exception("Pickle protocol 5 is not available. BASH command: $ pip install pickle5")
+    arrays_list = []
+    for flight_identifier, sources in values_list:
+        array_sources = []
+        for source in sources:
+            array_source = [source[0]]
+            for name, unit, data in source[1:]:
+                column = column_converter(data)
+                if column is None:
+                    # Mixed types are pickled in the pickle itself.
+                    column = np.array(data.tolist() if isinstance(data, np.ndarray) else list(data), dtype=object)
+                array_source.append([name, unit, column])
+            array_sources.append(array_source)
+        arrays_list.append([flight_identifier, array_sources])
+    buffers = []
+    pickle_data = pickle5.dumps(arrays_list, protocol=5, buffer_callback=buffers.append)
+    buffers = [buffer.raw() for buffer in buffers]
+    # Finds where each buffer starts after the header and the pickle.
+    offset = len(PICKLE_MAGIC) + PICKLE_HEADER.size + BUFFER_ENTRY.size * len(buffers) + len(pickle_data)
+    buffer_entries = []
+    for buffer in buffers:
+        offset += -offset % BUFFER_ALIGNMENT
+        buffer_entries.append([offset, buffer.nbytes])
+        offset += buffer.nbytes
+    partial_file_path = file_path + ".partial"
+    with open(partial_file_path, "wb") as pickle_file:
+        pickle_file.write(PICKLE_MAGIC + PICKLE_HEADER.pack(len(pickle_data), len(buffers)))
+        for buffer_entry in buffer_entries:
+            pickle_file.write(BUFFER_ENTRY.pack(*buffer_entry))
+        pickle_file.write(pickle_data)
+        for (buffer_offset, length), buffer in zip(buffer_entries, buffers):
+            pickle_file.write(bytes(buffer_offset - pickle_file.tell()))
+            pickle_file.write(buffer)
+    os.replace(partial_file_path, file_path)
+
+
+def values_pickle_reader(file_path):
+    """Returns the values_list saved by values_pickle_writer(), with the data of each channel as a read only array
+    made from the memory mapped file."""
+    with open(file_path, "rb") as pickle_file:
+        file_map = mmap.mmap(pickle_file.fileno(), 0, access=mmap.ACCESS_READ)
+    # The arrays keep the memory map open for as long as they are used.
+    file_view = memoryview(file_map)
+    position = len(PICKLE_MAGIC)
+    pickle_length, buffer_count = PICKLE_HEADER.unpack_from(file_map, position)
+    position += PICKLE_HEADER.size
+    buffers = []
+    for buffer_number in range(buffer_count):
+        buffer_offset, length = BUFFER_ENTRY.unpack_from(file_map, position)
+        buffers.append(file_view[buffer_offset:buffer_offset + length])
+        position += BUFFER_ENTRY.size
+    return pickle5.loads(file_view[position:position + pickle_length], buffers=buffers)
+
+
+def values_list_reader(data_file_path, as_arrays=False):
+    """Returns the values_list saved at data_file_path. A values store is read lazily (see LazyChannel), the data of
+    each channel being a read only array once it is used. The data of each channel of a pickle saved by
+    values_pickle_writer() is the read only array made from the memory mapped file (see values_pickle_reader()), and
+    any other file is read as a pickled values_list, as saved by older versions of AutoFLpy. Channels of mixed types
+    are read as lists. If as_arrays is True, the data of every channel is an array from the start (memory mapped where
+    possible), including channels of mixed types and those of older pickles, and the channels of a compact values
+    store keep the types they were saved with (such as float32)."""
+    if not os.path.isdir(data_file_path):
+        with open(data_file_path, "rb") as data_file:
+            buffered_pickle = data_file.read(len(PICKLE_MAGIC)) == PICKLE_MAGIC
+            if buffered_pickle is False:
+                data_file.seek(0)
+                values_list = pk.load(data_file)
+        if buffered_pickle is True:
+            values_list = values_pickle_reader(data_file_path)
+        for flight in values_list:
+            for source in flight[1]:
+                for channel_index in range(1, len(source)):
+                    name, unit, data = source[channel_index]
+                    if as_arrays is True and not isinstance(data, np.ndarray):
+                        column = column_converter(data)
+                        data = np.array(data, dtype=object) if column is None else column
+                        source[channel_index] = [name, unit, data]
+                    elif as_arrays is False and isinstance(data, np.ndarray) and data.dtype == object:
+                        # Mixed types are pickled in the pickle itself, and are read as the list they were saved from.
+                        source[channel_index] = [name, unit, data.tolist()]
+        return values_list
+    with open(data_file_path + os.sep + MANIFEST_NAME) as manifest_file:
+        manifest = json.load(manifest_file)
+    values_list = []
+    for flight in manifest["flights"]:
+        sources = []
+        for source in flight["sources"]:
+            channels = [source["name"]]
+            for channel in source["channels"]:
+                if "file" in channel:
+                    if as_arrays is True:
+                        # Compact channels are kept compact.
+                        channels.append([channel["name"], channel["unit"],
+                                         column_reader(data_file_path, channel, restore=False)])
+                    elif "encoding" in channel or "compression" in channel:
+                        channels.append(LazyChannel(channel["name"], channel["unit"],
+                                                    functools.partial(column_reader, data_file_path, channel)))
+                    else:
+                        channels.append(LazyChannel(channel["name"], channel["unit"],
+                                                    data_file_path + os.sep + channel["file"]))
+                elif as_arrays is True:
+                    channels.append([channel["name"], channel["unit"], np.array(channel["values"], dtype=object)])
+                else:
+                    channels.append([channel["name"], channel["unit"], channel["values"]])
+            sources.append(channels)
+        values_list.append([flight["flight"], sources])
+    return values_list
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Keeps the data frames read from xlsx files in a cache on disk, so that an xlsx
+file which has not changed is not read with pandas again.
+
+Each cache entry is a pickle of the list of data frames read from one xlsx
+file. Entries are found by the path of the xlsx file and checked against its
+size and modification time (and, if content_hash is True, a hash of its
+contents), so an entry is only used while the xlsx file is unchanged. The
+least recently used entries are removed once the cache is larger than its
+size limit.
+
+@author: Adrian Weishaeupl
+aw6g15@soton.ac.uk 2019
+"""
+
+import hashlib
+import os
+import pickle as pk
+
+# Folder the cache is kept in and the largest size of the cache in bytes.
+CACHE_PATH = os.path.join(os.path.expanduser("~"), ".autoflpy", "workbook_cache")
+CACHE_SIZE_LIMIT = 2 ** 30
+CACHE_EXTENSION = ".pkl"
+
+
+def content_hasher(file_path, buffer_size=2 ** 20):
+    """Returns the sha1 hash of the contents of a file."""
+    content_hash = hashlib.sha1()
+    with open(file_path, "rb") as file:
+        for block in iter(lambda: file.read(buffer_size), b""):
+            content_hash.update(block)
+    return content_hash.hexdigest()
+
+
+def cache_entry_name(file_path, content_hash=False):
+    """Returns the file name of the cache entry of an xlsx file in its current state. The name starts with a hash of
+    the path of the xlsx file, so the entries of previous states of the same file can be found."""
+    file_path = os.path.abspath(file_path)
+    stat = os.stat(file_path)
+    state = "{0}|{1}|{2}".format(file_path, stat.st_size, stat.st_mtime_ns)
+    if content_hash is True:
+        state += "|" + content_hasher(file_path)
+    path_hash = hashlib.sha1(file_path.encode("utf-8")).hexdigest()
+    return path_hash + "_" + hashlib.sha1(state.encode("utf-8")).hexdigest() + CACHE_EXTENSION
+
+
+def cache_reader(file_path, cache_path=None, content_hash=False):
+    """Returns the data frames cached for an xlsx file, or None if they have not been cached since it last changed."""
+    cache_path = CACHE_PATH if cache_path is None else cache_path
+    entry_path = cache_path + os.sep + cache_entry_name(file_path, content_hash)
+    try:
+        with open(entry_path, "rb") as entry_file:
+            frame_list = pk.load(entry_file)
+    except (OSError, EOFError, pk.UnpicklingError):
+        return None
+    # The modification time of an entry is the last time it was used, which decides which entries are removed first.
+    os.utime(entry_path)
+    return frame_list
+
+
+def cache_writer(file_path, frame_list, cache_path=None, size_limit=None, content_hash=False):
+    """Caches the data frames read from an xlsx file, replacing any entries of the file before it changed, and then
+    removes the least recently used entries until the cache is no larger than size_limit bytes."""
+    cache_path = CACHE_PATH if cache_path is None else cache_path
+    size_limit = CACHE_SIZE_LIMIT if size_limit is None else size_limit
+    os.makedirs(cache_path, exist_ok=True)
+    entry_name = cache_entry_name(file_path, content_hash)
+    for old_entry_name in os.listdir(cache_path):
+        if old_entry_name.split("_")[0] == entry_name.split("_")[0] and old_entry_name != entry_name:
+            os.remove(cache_path + os.sep + old_entry_name)
+    # The entry is written to a temporary file first so a cut off entry is never read.
+    partial_entry_path = cache_path + os.sep + entry_name + ".partial"
+    with open(partial_entry_path, "wb") as entry_file:
+        pk.dump(frame_list, entry_file, protocol=pk.HIGHEST_PROTOCOL)
+    os.replace(partial_entry_path, cache_path + os.sep + entry_name)
+    cache_evictor(cache_path, size_limit)
+
+
+def cache_evictor(cache_path, size_limit):
+    """Removes the least recently used entries of the cache until it is no larger than size_limit bytes."""
+    entries = []
+    for entry_name in os.listdir(cache_path):
+        if entry_name.endswith(CACHE_EXTENSION):
+            stat = os.stat(cache_path + os.sep + entry_name)
+            entries.append([stat.st_mtime_ns, stat.st_size, entry_name])
+    entries.sort()
+    cache_size = sum(entry[1] for entry in entries)
+    for last_used, size, entry_name in entries:
+        if cache_size <= size_limit:
+            break
+        os.remove(cache_path + os.sep + entry_name)
+        cache_size -= size
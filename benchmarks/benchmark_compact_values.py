@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks the compact mode of the values store (see values_store.py) on the
+compiled flight data of a synthetic log: the space taken on disk, the memory
+taken by the channels read as arrays, the time taken to write and read the
+store, and checks that the values read back are the values saved.
+
+Run from the repository root:
+    python benchmarks/benchmark_compact_values.py --duration 1800
+
+@author Adrian Weishaeupl (aw6g15@soton.ac.uk)
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+repository_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repository_path)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from autoflpy.util import flight_log_code, log_to_xlsx, values_store  # noqa: E402
+from synthetic_log import write_synthetic_log  # noqa: E402
+
+data_path = os.path.join(repository_path, "autoflpy", "data")
+name_converter_file_path = os.path.join(data_path, "Name_converter_list.txt")
+data_sources_path = os.path.join(data_path, "Data_sources.txt")
+
+
+def storage_size(path):
+    """Returns the size of all of the files in a folder in bytes."""
+    return sum(os.path.getsize(path + os.sep + file_name) for file_name in os.listdir(path))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=1800, help="Length of the synthetic flight in seconds")
+    arguments = parser.parse_args()
+
+    directory = tempfile.mkdtemp() + os.sep
+    try:
+        log_file_path = directory + "synthetic.log"
+        write_synthetic_log(log_file_path, arguments.duration)
+        log_to_xlsx.log_reader(log_file_path, name_converter_file_path, data_sources_path, directory, "synthetic",
+                               "20200114", "1", {}, {}, {}, export_xlsx=False)
+        print("Synthetic log: {0} s of flight, {1:.1f} MB".format(
+            arguments.duration, os.path.getsize(log_file_path) / 2 ** 20))
+        values_list = None
+        for label, compact, compression in [["values store", False, None], ["compact", True, None],
+                                            ["compact, zlib", True, "zlib"], ["compact, lzma", True, "lzma"]]:
+            store_path = directory + label.replace(", ", "_") + values_store.VALUES_EXTENSION
+            start = time.perf_counter()
+            flight_log_code.compile_and_compress(directory, ["synthetic.flightdata"], "", [""], store_path,
+                                                 compact=compact, compression=compression)
+            write_time = time.perf_counter() - start
+            start = time.perf_counter()
+            read_values_list = values_store.values_list_reader(store_path)
+            for flight in read_values_list:
+                for source in flight[1]:
+                    for channel in source[1:]:
+                        channel[2]
+            read_time = time.perf_counter() - start
+            array_list = values_store.values_list_reader(store_path, as_arrays=True)
+            array_bytes = sum(channel[2].nbytes for flight in array_list for source in flight[1]
+                              for channel in source[1:])
+            print("{0:<14} {1:6.1f} MB on disk, {2:6.1f} MB as arrays, written in {3:.2f} s, all channels read in "
+                  "{4:.2f} s".format(label, storage_size(store_path) / 2 ** 20, array_bytes / 2 ** 20, write_time,
+                                     read_time))
+            if values_list is None:
+                values_list = read_values_list
+            # Compared as text, as NaN is not equal to itself.
+            elif repr(read_values_list) != repr(values_list):
+                print("The values read from the {} store differ from those saved".format(label))
+        report = values_store.compact_report(directory + "compact" + values_store.VALUES_EXTENSION)
+        print("Largest float32 error of each float32 channel:")
+        for flight, source, name, channel in report:
+            if channel.get("encoding") == "float32":
+                print("    {0} {1}: {2:.3g} ({3} decimals logged)".format(source, name, channel["error_bound"],
+                                                                          channel["decimals"]))
+        kept = ["{0} {1}".format(source, name) for flight, source, name, channel in report
+                if "error_bound" in channel and channel.get("encoding") != "float32"]
+        print("Kept as float64 to keep their precision: " + (", ".join(kept) if kept else "none"))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks finding channels of a synthetic log with the index of a
+flight_dataset.FlightDataset against searching the values_list data source by
+data source and column by column, as the plotting and take-off detection code
+did.
+
+Run from the repository root:
+    python benchmarks/benchmark_flight_dataset.py --duration 1800 --flights 4
+
+@author Adrian Weishaeupl (aw6g15@soton.ac.uk)
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+repository_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repository_path)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from autoflpy.util import flight_dataset, flight_log_code, log_to_xlsx, values_store  # noqa: E402
+from synthetic_log import write_synthetic_log  # noqa: E402
+
+data_path = os.path.join(repository_path, "autoflpy", "data")
+name_converter_file_path = os.path.join(data_path, "Name_converter_list.txt")
+data_sources_path = os.path.join(data_path, "Data_sources.txt")
+
+
+def scanned_channel(values_list, flight, source, name):
+    """Returns the first channel of a flight with a data source and name, searching the values_list."""
+    for values_list_data in values_list[flight][1]:
+        if source.lower() == values_list_data[0].lower():
+            for column in values_list_data[1:]:
+                if column[0].lower() == name.lower():
+                    return column
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=1800, help="Length of the synthetic flight in seconds")
+    parser.add_argument("--flights", type=int, default=4, help="Number of copies of the flight in the values_list")
+    arguments = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        log_file_path = directory + os.sep + "synthetic.log"
+        write_synthetic_log(log_file_path, arguments.duration)
+        log_to_xlsx.log_reader(log_file_path, name_converter_file_path, data_sources_path, directory + os.sep,
+                               "synthetic", "20200114", "1", {}, {}, {}, export_xlsx=False)
+        flight_log_code.compile_and_compress(directory + os.sep, ["synthetic.flightdata"] * arguments.flights, "",
+                                             [""] * arguments.flights, directory + os.sep + "synthetic.values")
+        values_list = values_store.values_list_reader(directory + os.sep + "synthetic.values")
+
+        start = time.perf_counter()
+        dataset = flight_dataset.FlightDataset(values_list)
+        build_time = time.perf_counter() - start
+        # Every channel of every flight, looked up as a report would, in lower case.
+        lookups = [[flight, source[0].lower(), channel[0].lower()] for flight in range(len(values_list))
+                   for source in values_list[flight][1] for channel in source[1:]]
+        start = time.perf_counter()
+        scanned = [scanned_channel(values_list, *lookup) for lookup in lookups]
+        scan_time = time.perf_counter() - start
+        start = time.perf_counter()
+        indexed = [dataset.channel(source, name, flight) for flight, source, name in lookups]
+        index_time = time.perf_counter() - start
+        if [channel[:2] for channel in scanned] != [[channel.name, channel.unit] for channel in indexed]:
+            print("The channels found differ")
+        print("{0} lookups over {1} flights: index built in {2:.2f} ms, scanning {3:.1f} us and index {4:.2f} us "
+              "per lookup ({5:.0f}x)".format(len(lookups), len(values_list), build_time * 1000,
+                                             scan_time / len(lookups) * 10 ** 6, index_time / len(lookups) * 10 ** 6,
+                                             scan_time / index_time))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
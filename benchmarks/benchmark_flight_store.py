@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+Compares the time taken to save a synthetic flight with log_reader and read
+it back with flight_data, through the flight store and through an xlsx file.
+
+Run from the repository root:
+    python benchmarks/benchmark_flight_store.py --duration 900
+
+@author Adrian Weishaeupl (aw6g15@soton.ac.uk)
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from autoflpy.util import flight_log_code, flight_store, log_to_xlsx  # noqa: E402
+from synthetic_log import write_synthetic_log  # noqa: E402
+
+data_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "autoflpy", "data")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=60, help="length of the synthetic flight in seconds")
+    arguments = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    log_file_path = os.path.join(directory, "synthetic.log")
+    write_synthetic_log(log_file_path, arguments.duration)
+    print("Synthetic log: {0:.1f} s of flight, {1:.1f} MB".format(
+        arguments.duration, os.path.getsize(log_file_path) / 1e6))
+
+    for export_xlsx, file_name in [[False, "store" + flight_store.STORE_EXTENSION], [True, "xlsx.xlsx"]]:
+        start = time.perf_counter()
+        log_to_xlsx.log_reader(log_file_path, os.path.join(data_path, "Name_converter_list.txt"),
+                               os.path.join(data_path, "Data_sources.txt"), directory, os.path.splitext(file_name)[0],
+                               "20190110", "1", {}, {}, {}, export_xlsx=export_xlsx)
+        write_time = time.perf_counter() - start
+        start = time.perf_counter()
+        flight_log_code.flight_data(directory + os.sep, file_name)
+        read_time = time.perf_counter() - start
+        print("{0}: log_reader {1:.2f} s, flight_data {2:.2f} s".format(
+            "xlsx" if export_xlsx is True else "flight store", write_time, read_time))
+
+
+if __name__ == "__main__":
+    main()
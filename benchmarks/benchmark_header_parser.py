@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks flight_log_code.flight_data_and_axis() against the version it
+replaced (legacy_flight_data_and_axis.py, kept as a reference), which read the
+names and units from the column titles one letter at a time, and checks that
+both give the same values_list.
+
+The column titles of a synthetic log are given the date and flight number of
+each flight, and the data frames are cut to one row so that the time taken is
+the time taken to read the titles.
+
+Run from the repository root:
+    python benchmarks/benchmark_header_parser.py --flights 50
+
+@author Adrian Weishaeupl (aw6g15@soton.ac.uk)
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+repository_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repository_path)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from autoflpy.util import flight_log_code, log_to_xlsx  # noqa: E402
+import legacy_flight_data_and_axis  # noqa: E402
+from synthetic_log import write_synthetic_log  # noqa: E402
+
+data_path = os.path.join(repository_path, "autoflpy", "data")
+name_converter_file_path = os.path.join(data_path, "Name_converter_list.txt")
+data_sources_path = os.path.join(data_path, "Data_sources.txt")
+
+
+def flight_frames(sorted_frames, flights):
+    """Returns the one row data frames of each flight, with the date and flight number of the flight."""
+    frames_of_flights = []
+    for flight in range(flights):
+        frames = []
+        for frame in sorted_frames:
+            frame = frame.iloc[:1]
+            identifier = "2020{0:04d}_Flight{1}".format(flight % 1231, flight)
+            frames.append(frame.rename(columns={column: column.replace("20200114_Flight1", identifier)
+                                                for column in frame.columns}))
+        frames_of_flights.append(frames)
+    return frames_of_flights
+
+
+def timed_values(flight_data_and_axis, frames_of_flights):
+    """Returns the time taken to compile the values_list of every flight, and the values_lists."""
+    start = time.perf_counter()
+    values_lists = [flight_data_and_axis(frames) for frames in frames_of_flights]
+    return time.perf_counter() - start, values_lists
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--flights", type=int, default=50, help="Number of flights compiled")
+    arguments = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        log_file_path = directory + os.sep + "synthetic.log"
+        write_synthetic_log(log_file_path, 10)
+        frame_list = log_to_xlsx.log_reader(log_file_path, name_converter_file_path, data_sources_path, directory,
+                                            "synthetic", "20200114", "1", {}, {}, {}, in_memory=True)
+    finally:
+        shutil.rmtree(directory)
+    frames_of_flights = flight_frames(flight_log_code.flight_data_time_sorter(frame_list), arguments.flights)
+    columns = sum(len(frame.columns) for frame in frames_of_flights[0])
+
+    legacy_time, legacy_values_lists = timed_values(legacy_flight_data_and_axis.flight_data_and_axis,
+                                                    frames_of_flights)
+    flight_log_code.label_parser.cache_clear()
+    new_time, new_values_lists = timed_values(flight_log_code.flight_data_and_axis, frames_of_flights)
+    print("{0} flights of {1} columns: legacy {2:.1f} ms, header parser {3:.1f} ms ({4:.1f}x), {5} labels "
+          "cached".format(arguments.flights, columns, legacy_time * 1000, new_time * 1000, legacy_time / new_time,
+                          flight_log_code.label_parser.cache_info().currsize))
+    # repr() is compared as the data contains NaN.
+    if repr(legacy_values_lists) != repr(new_values_lists):
+        print("The values_lists differ")
+
+
+if __name__ == "__main__":
+    main()
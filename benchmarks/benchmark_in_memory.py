@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks compiling the flight data of a synthetic log for the flight reports
+(log_reader() followed by compile_and_compress()) when the data read from the
+log goes through an xlsx file, through the flight store, and straight from
+memory (log_reader(in_memory=True)), and checks that the values compiled are
+the same.
+
+Run from the repository root:
+    python benchmarks/benchmark_in_memory.py --duration 600
+
+@author Adrian Weishaeupl (aw6g15@soton.ac.uk)
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+repository_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repository_path)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from autoflpy.util import flight_log_code, log_to_xlsx, values_store  # noqa: E402
+from synthetic_log import write_synthetic_log  # noqa: E402
+
+data_path = os.path.join(repository_path, "autoflpy", "data")
+name_converter_file_path = os.path.join(data_path, "Name_converter_list.txt")
+data_sources_path = os.path.join(data_path, "Data_sources.txt")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=600, help="Length of the synthetic flight in seconds")
+    parser.add_argument("--no-xlsx", action="store_true", help="Skip the xlsx file, which is slow for long flights")
+    arguments = parser.parse_args()
+
+    directory = tempfile.mkdtemp() + os.sep
+    try:
+        log_file_path = directory + "synthetic.log"
+        write_synthetic_log(log_file_path, arguments.duration)
+        print("Synthetic log: {0} s of flight, {1:.1f} MB".format(
+            arguments.duration, os.path.getsize(log_file_path) / 2 ** 20))
+        modes = [["flight store", "store.flightdata"], ["in memory", "in_memory.flightdata"]]
+        if arguments.no_xlsx is False:
+            modes.insert(0, ["xlsx file", "xlsx.xlsx"])
+        results = []
+        for label, file_name in modes:
+            # Each mode saves its data under a different name, so no mode carries on from the checkpoint of another.
+            reader_arguments = [log_file_path, name_converter_file_path, data_sources_path, directory,
+                                os.path.splitext(file_name)[0], "20200114", "1", {}, {}, {}]
+            start = time.perf_counter()
+            frame_lists = None
+            if label == "in memory":
+                frame_lists = [log_to_xlsx.log_reader(*reader_arguments, in_memory=True)]
+            else:
+                log_to_xlsx.log_reader(*reader_arguments, export_xlsx=file_name.endswith(".xlsx"))
+            read_time = time.perf_counter() - start
+            values_path = directory + label.replace(" ", "_") + values_store.VALUES_EXTENSION
+            flight_log_code.compile_and_compress(directory, [file_name], "", [""], values_path,
+                                                 frame_lists=frame_lists)
+            results.append([label, read_time, time.perf_counter() - start - read_time, values_path])
+        values_lists = []
+        for label, read_time, compile_time, values_path in results:
+            print("{0:<13} log read in {1:.2f} s, compiled in {2:.2f} s, {3:.2f} s in total".format(
+                label, read_time, compile_time, read_time + compile_time))
+            # Compared as text, as NaN is not equal to itself.
+            values_lists.append(repr(values_store.values_list_reader(values_path)))
+        if values_lists[-1] != values_lists[-2]:
+            print("The values compiled in memory differ from those compiled from the flight store")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
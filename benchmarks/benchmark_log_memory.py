@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Measures the peak resident memory (RSS) of log_to_xlsx.log_reader for
+synthetic logs of increasing length. Each measurement is run in a separate
+process so that the peak of one run does not hide the next.
+
+Run from the repository root (Linux/macOS only, uses the resource module):
+    python benchmarks/benchmark_log_memory.py --durations 300 900 1800
+
+@author Adrian Weishaeupl (aw6g15@soton.ac.uk)
+"""
+
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_log import write_synthetic_log  # noqa: E402
+
+data_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "autoflpy", "data")
+modes = ["legacy", "buffered", "streaming"]
+
+
+def run_log_reader(log_file_path, mode):
+    """Runs log_reader in the mode given and prints the peak RSS of this process in MB."""
+    if mode == "legacy":
+        import legacy_log_to_xlsx as module
+        arguments = []
+    else:
+        from autoflpy.util import log_to_xlsx as module
+        # The xlsx file is written, as it is by the legacy log reader.
+        arguments = [mode == "streaming", True]
+    devnull = open(os.devnull, "w")
+    stdout = sys.stdout
+    sys.stdout = devnull
+    module.log_reader(log_file_path, os.path.join(data_path, "Name_converter_list.txt"),
+                      os.path.join(data_path, "Data_sources.txt"), os.path.dirname(log_file_path), mode,
+                      "20190110", "1", {}, {}, {}, *arguments)
+    sys.stdout = stdout
+    devnull.close()
+    # ru_maxrss is in kB on Linux and in bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        peak = peak / 1024
+    print(peak / 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--durations", type=float, nargs="+", default=[300, 900, 1800],
+                        help="lengths of the synthetic flights in seconds")
+    parser.add_argument("--modes", nargs="+", default=modes, choices=modes)
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    arguments = parser.parse_args()
+
+    if arguments.child is not None:
+        run_log_reader(*arguments.child)
+        return
+
+    directory = tempfile.mkdtemp()
+    heading = "{0:>10} {1:>8}".format("log (MB)", "lines")
+    print(heading + "".join("{0:>16}".format(mode + " (MB)") for mode in arguments.modes))
+    for duration in arguments.durations:
+        log_file_path = os.path.join(directory, "synthetic_{}.log".format(int(duration)))
+        write_synthetic_log(log_file_path, duration)
+        with open(log_file_path) as log_file:
+            number_of_lines = sum(1 for _ in log_file)
+        peaks = []
+        for mode in arguments.modes:
+            output = subprocess.check_output([sys.executable, os.path.abspath(__file__), "--child", log_file_path,
+                                              mode])
+            peaks.append(float(output.decode().strip().split("\n")[-1]))
+        print("{0:>10.1f} {1:>8}".format(os.path.getsize(log_file_path) / 1e6, number_of_lines) +
+              "".join("{0:>16.1f}".format(peak) for peak in peaks))
+        os.remove(log_file_path)
+
+
+if __name__ == "__main__":
+    main()
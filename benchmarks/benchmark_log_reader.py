@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks log_to_xlsx.log_reader against the original implementation
+(legacy_log_to_xlsx.py, kept as a reference) and checks that both produce the
+same workbook.
+
+Run from the repository root:
+    python benchmarks/benchmark_log_reader.py --duration 60
+
+@author Adrian Weishaeupl (aw6g15@soton.ac.uk)
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from openpyxl import load_workbook
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from autoflpy.util import log_to_xlsx  # noqa: E402
+import legacy_log_to_xlsx  # noqa: E402
+from synthetic_log import write_synthetic_bin, write_synthetic_log  # noqa: E402
+
+data_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "autoflpy", "data")
+name_converter_file_path = os.path.join(data_path, "Name_converter_list.txt")
+data_sources_path = os.path.join(data_path, "Data_sources.txt")
+weather_data = {"Temperature_C": "10.2"}
+runway_data = {"Runway_surface": "Grass"}
+aircraft_data = {"m_empty_kg": "15"}
+
+
+def workbook_contents(file_path):
+    """Returns the sheet names and values of every cell in a workbook."""
+    workbook = load_workbook(file_path, read_only=True)
+    contents = [[sheet, list(workbook[sheet].iter_rows(values_only=True))] for sheet in workbook.sheetnames]
+    workbook.close()
+    return contents
+
+
+def time_log_reader(module, log_file_path, excel_file_path, excel_file_name, *arguments):
+    """Runs log_reader from module and returns the time taken in seconds."""
+    start = time.perf_counter()
+    module.log_reader(log_file_path, name_converter_file_path, data_sources_path, excel_file_path, excel_file_name,
+                      "20190110", "1", weather_data, runway_data, aircraft_data, *arguments)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=60, help="length of the synthetic flight in seconds")
+    parser.add_argument("--skip-legacy", action="store_true", help="only time the current implementation")
+    arguments = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    log_file_path = os.path.join(directory, "synthetic.log")
+    write_synthetic_log(log_file_path, arguments.duration)
+    with open(log_file_path) as log_file:
+        number_of_lines = sum(1 for _ in log_file)
+    print("Synthetic log: {0:.1f} s of flight, {1} lines, {2:.1f} MB".format(
+        arguments.duration, number_of_lines, os.path.getsize(log_file_path) / 1e6))
+
+    current_time = time_log_reader(log_to_xlsx, log_file_path, directory, "current", False, True)
+    print("log_reader (current): {0:.2f} s".format(current_time))
+    streaming_time = time_log_reader(log_to_xlsx, log_file_path, directory, "streaming", True, True)
+    print("log_reader (current, streaming): {0:.2f} s".format(streaming_time))
+    print("Streaming workbook identical: {}".format(
+        workbook_contents(os.path.join(directory, "current.xlsx")) ==
+        workbook_contents(os.path.join(directory, "streaming.xlsx"))))
+    bin_file_path = os.path.join(directory, "synthetic.bin")
+    write_synthetic_bin(bin_file_path, arguments.duration)
+    bin_time = time_log_reader(log_to_xlsx, bin_file_path, directory, "bin", False, True)
+    print("log_reader (current, .bin of {0:.1f} MB): {1:.2f} s".format(
+        os.path.getsize(bin_file_path) / 1e6, bin_time))
+    if arguments.skip_legacy is False:
+        legacy_time = time_log_reader(legacy_log_to_xlsx, log_file_path, directory, "legacy")
+        print("log_reader (legacy):  {0:.2f} s".format(legacy_time))
+        print("Speed up: {0:.1f}x".format(legacy_time / current_time))
+        identical = workbook_contents(os.path.join(directory, "current.xlsx")) == \
+            workbook_contents(os.path.join(directory, "legacy.xlsx"))
+        print("Workbooks identical: {}".format(identical))
+
+
+if __name__ == "__main__":
+    main()
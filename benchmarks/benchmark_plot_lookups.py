@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks the lookups of plotting.select_plot_data_single() for the figures
+of a report, with the channel index of a FlightDataset built once for every
+figure (as the flight reports load their data) and with the index each figure
+builds for a values_list, against the version it replaced
+(legacy_plot_lookups.py, kept as a reference), which searched every data
+source of every flight for each series, and checks that they find the same
+channels.
+
+Each figure plots every channel of a data source against its time, as the
+report template does, for a values_list with several copies of a synthetic
+flight.
+
+Run from the repository root:
+    python benchmarks/benchmark_plot_lookups.py --flights 4 --figures 40
+
+@author Adrian Weishaeupl (aw6g15@soton.ac.uk)
+"""
+
+import argparse
+import copy
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+repository_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repository_path)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from autoflpy.util import flight_dataset, flight_log_code, log_to_xlsx, plotting, values_store  # noqa: E402
+import legacy_plot_lookups  # noqa: E402
+from synthetic_log import write_synthetic_log  # noqa: E402
+
+data_path = os.path.join(repository_path, "autoflpy", "data")
+name_converter_file_path = os.path.join(data_path, "Name_converter_list.txt")
+data_sources_path = os.path.join(data_path, "Data_sources.txt")
+
+
+def figure_lookups(values_list, figures):
+    """Returns the plot_information of each figure."""
+    sources = [source for source in values_list[0][1] if len(source) > 2]
+    plot_informations = []
+    for figure in range(figures):
+        source = sources[figure % len(sources)]
+        plot_informations.append([["x", "time", source[0].lower()]] +
+                                 [["y", channel[0].lower(), source[0].lower()] for channel in source[1:]
+                                  if channel[0] != "Time"])
+    return plot_informations
+
+
+def timed_lookups(select_plot_data_single, values_list, plot_informations, indexed):
+    """Returns the time taken to select the data of every figure, and the data selected. indexed is None (no index),
+    "figure" (an index of each figure) or "dataset" (the index of a FlightDataset, included in the time)."""
+    start = time.perf_counter()
+    if indexed == "dataset":
+        values_list = flight_dataset.FlightDataset(values_list)
+    flight_values_list, flight_dates_list, single_flight, number_of_flights = \
+        plotting.single_flight_detection(values_list)
+    plot_data = []
+    for plot_information in plot_informations:
+        if indexed == "dataset":
+            plot_data.append(select_plot_data_single(flight_values_list, plot_information, number_of_flights,
+                                                     values_list.index))
+        elif indexed == "figure":
+            # Built for the data sources of each figure, as graph_plotter() does.
+            index = flight_dataset.channel_index(values_list, [information[2] for information in plot_information])
+            plot_data.append(select_plot_data_single(flight_values_list, plot_information, number_of_flights, index))
+        else:
+            plot_data.append(select_plot_data_single(flight_values_list, plot_information, number_of_flights))
+    return time.perf_counter() - start, plot_data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--flights", type=int, default=4, help="Number of copies of the flight in the values_list")
+    parser.add_argument("--figures", type=int, default=40, help="Number of figures in the report")
+    arguments = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        log_file_path = directory + os.sep + "synthetic.log"
+        write_synthetic_log(log_file_path, 60)
+        log_to_xlsx.log_reader(log_file_path, name_converter_file_path, data_sources_path, directory + os.sep,
+                               "synthetic", "20200114", "1", {}, {}, {}, export_xlsx=False)
+        flight_log_code.compile_and_compress(directory + os.sep, ["synthetic.flightdata"] * arguments.flights, "",
+                                             [""] * arguments.flights, directory + os.sep + "synthetic.values")
+        values_list = values_store.values_list_reader(directory + os.sep + "synthetic.values")
+    finally:
+        shutil.rmtree(directory)
+    plot_informations = figure_lookups(values_list, arguments.figures)
+    series = sum(len(plot_information) for plot_information in plot_informations) * arguments.flights
+
+    # The legacy version adds to the plot_information it is given.
+    legacy_time, legacy_plot_data = timed_lookups(legacy_plot_lookups.select_plot_data_single, values_list,
+                                                  copy.deepcopy(plot_informations), None)
+    figure_time, figure_plot_data = timed_lookups(plotting.select_plot_data_single, values_list, plot_informations,
+                                                  "figure")
+    dataset_time, dataset_plot_data = timed_lookups(plotting.select_plot_data_single, values_list, plot_informations,
+                                                    "dataset")
+    print("{0} figures, {1} series over {2} flights: legacy {3:.2f} ms, index per figure {4:.2f} ms ({5:.0f}x), "
+          "FlightDataset index {6:.2f} ms ({7:.0f}x)".format(
+              arguments.figures, series, arguments.flights, legacy_time * 1000, figure_time * 1000,
+              legacy_time / figure_time, dataset_time * 1000, legacy_time / dataset_time))
+    # The channels found by the index of each figure are the channels of the values_list, so they are compared by
+    # identity, and those of the FlightDataset by name and unit.
+    if [[[[series[0], id(series[1]), series[2]] for series in flight] for flight in figure]
+            for figure in legacy_plot_data] != [[[[series[0], id(series[1]), series[2]] for series in flight]
+                                                 for flight in figure] for figure in figure_plot_data]:
+        print("The channels found differ")
+    if [[[[series[0], series[1][0], series[1][1], series[2]] for series in flight] for flight in figure]
+            for figure in legacy_plot_data] != [[[[series[0], series[1][0], series[1][1], series[2]]
+                                                  for series in flight] for flight in figure]
+                                                for figure in dataset_plot_data]:
+        print("The channels found in the FlightDataset differ")
+
+
+if __name__ == "__main__":
+    main()
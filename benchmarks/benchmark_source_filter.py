@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks sorting the lines of a log with and without the message types from
+Data_sources.txt passed to the tokenizer, on a log where most lines are of
+message types that are not selected.
+
+Run from the repository root:
+    python benchmarks/benchmark_source_filter.py --duration 300
+
+@author Adrian Weishaeupl (aw6g15@soton.ac.uk)
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from autoflpy.util import log_to_xlsx  # noqa: E402
+from autoflpy.util.log_ingestion import log_ingestor, log_line_reader, log_line_sorter  # noqa: E402
+from synthetic_log import write_synthetic_log  # noqa: E402
+
+data_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "autoflpy", "data")
+name_converter_file_path = os.path.join(data_path, "Name_converter_list.txt")
+# Low rate message types only, so the high rate IMU and VIBE lines are all filtered out.
+selected_types = ["GPS", "BARO", "ARSP", "CTUN", "EV"]
+
+
+def timed(function, *arguments):
+    """Returns the time taken to call function and its result."""
+    start = time.perf_counter()
+    result = function(*arguments)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=300, help="Length of the synthetic flight in seconds")
+    arguments = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        log_file_path = directory + os.sep + "filter.log"
+        write_synthetic_log(log_file_path, arguments.duration)
+        data_sources_path = directory + os.sep + "Data_sources.txt"
+        with open(data_sources_path, "w") as data_sources_file:
+            data_sources_file.write("Data Sources specified here will be placed in the excel document\n" +
+                                    "\n".join(selected_types))
+
+        all_time, (fmt_lines, message_data) = timed(log_ingestor, log_line_reader(log_file_path))
+        total = sum(len(lines) for lines in message_data.values())
+        kept = sum(len(lines) for message_type, lines in message_data.items() if message_type in selected_types)
+        del message_data
+        print("Synthetic log: {0} s of flight, {1} lines, {2:.1f}% of them selected".format(
+            arguments.duration, total, 100 * kept / total))
+        filtered_time, _ = timed(log_ingestor, log_line_reader(log_file_path), set(selected_types))
+        print("log_ingestor: {0:.2f} s unfiltered, {1:.2f} s filtered ({2:.1f}x)".format(
+            all_time, filtered_time, all_time / filtered_time))
+
+        for message_types in [None, set(selected_types)]:
+            line_directory = tempfile.mkdtemp(dir=directory)
+            sort_time, _ = timed(log_line_sorter, log_line_reader(log_file_path), line_directory, message_types)
+            print("log_line_sorter ({0}): {1:.2f} s".format(
+                "unfiltered" if message_types is None else "filtered", sort_time))
+
+        for streaming in [False, True]:
+            read_time, _ = timed(log_to_xlsx.log_reader, log_file_path, name_converter_file_path,
+                                 data_sources_path, directory, "filter", "20190101", "1", {}, {}, {},
+                                 streaming, False)
+            print("log_reader (streaming={0}, no xlsx): {1:.2f} s".format(streaming, read_time))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks plotting.manual_time_offset() against the version it replaced
+(legacy_time_offset.py, kept as a reference), which added the offset to every
+time value of the values_list one at a time and changed the values_list, and
+checks that both give the same offset times.
+
+The time taken to add the offset to the time column of one figure (once it is
+plotted) is measured separately.
+
+Run from the repository root:
+    python benchmarks/benchmark_time_offset.py --duration 1800 --flights 2
+
+@author Adrian Weishaeupl (aw6g15@soton.ac.uk)
+"""
+
+import argparse
+import copy
+import os
+import shutil
+import sys
+import tempfile
+import time
+import numpy as np
+
+repository_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repository_path)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from autoflpy.util import flight_log_code, log_to_xlsx, plotting, values_store  # noqa: E402
+import legacy_time_offset  # noqa: E402
+from synthetic_log import write_synthetic_log  # noqa: E402
+
+data_path = os.path.join(repository_path, "autoflpy", "data")
+name_converter_file_path = os.path.join(data_path, "Name_converter_list.txt")
+data_sources_path = os.path.join(data_path, "Data_sources.txt")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=1800, help="Length of the synthetic flight in seconds")
+    parser.add_argument("--flights", type=int, default=2, help="Number of copies of the flight in the values_list")
+    arguments = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        log_file_path = directory + os.sep + "synthetic.log"
+        write_synthetic_log(log_file_path, arguments.duration)
+        log_to_xlsx.log_reader(log_file_path, name_converter_file_path, data_sources_path, directory + os.sep,
+                               "synthetic", "20200114", "1", {}, {}, {}, export_xlsx=False)
+        flight_log_code.compile_and_compress(directory + os.sep, ["synthetic.flightdata"] * arguments.flights, "",
+                                             [""] * arguments.flights, directory + os.sep + "synthetic.values")
+        values_list = values_store.values_list_reader(directory + os.sep + "synthetic.values")
+        flight_values_list, flight_dates_list, single_flight, number_of_flights = \
+            plotting.single_flight_detection(values_list)
+        # The data is read before the offsets are timed.
+        legacy_values_list = copy.deepcopy(flight_values_list)
+        time_x_offset = [12.5 * flight for flight in range(number_of_flights)]
+
+        start = time.perf_counter()
+        legacy_time_offset.manual_time_offset(legacy_values_list, time_x_offset, number_of_flights)
+        legacy_time = time.perf_counter() - start
+        start = time.perf_counter()
+        offset_values_list = plotting.manual_time_offset(flight_values_list, time_x_offset, number_of_flights)
+        view_time = time.perf_counter() - start
+        # The time column of the GPS data of each flight, as plotted by one figure.
+        start = time.perf_counter()
+        for flight in range(number_of_flights):
+            offset_values_list[flight][0][-1][2]
+        figure_time = time.perf_counter() - start
+
+        time_columns = sum(1 for flight in legacy_values_list for source in flight for column in source[1:]
+                           if column[0] == "Time")
+        time_values = sum(len(column[2]) for flight in legacy_values_list for source in flight
+                          for column in source[1:] if column[0] == "Time")
+        print("{0} time columns, {1} values: legacy {2:.1f} ms, views {3:.3f} ms, offset GPS time of each flight "
+              "{4:.2f} ms".format(time_columns, time_values, legacy_time * 1000, view_time * 1000,
+                                  figure_time * 1000))
+        for legacy_flight, offset_flight in zip(legacy_values_list, offset_values_list):
+            for legacy_source, offset_source in zip(legacy_flight, offset_flight):
+                for legacy_column, offset_column in zip(legacy_source[1:], offset_source[1:]):
+                    if legacy_column[0] == "Time" and not np.array_equal(legacy_column[2], offset_column[2]):
+                        print("The offset times differ")
+        if offset_values_list[-1][0][-1][2][0] != flight_values_list[-1][0][-1][2][0] + time_x_offset[-1]:
+            print("The values_list was changed")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks flight_log_code.flight_data_time_sorter() against the version it
+replaced (legacy_time_sorter.py, kept as a reference) on the data frames of a
+synthetic log and on wide data frames like those of RCIN and RCOU, and checks
+that both split the data frames in the same way.
+
+Run from the repository root:
+    python benchmarks/benchmark_time_sorter.py --duration 1800 --columns 32
+
+@author Adrian Weishaeupl (aw6g15@soton.ac.uk)
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+repository_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repository_path)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from autoflpy.util import flight_log_code, log_to_xlsx  # noqa: E402
+import legacy_time_sorter  # noqa: E402
+from synthetic_log import write_synthetic_log  # noqa: E402
+
+data_path = os.path.join(repository_path, "autoflpy", "data")
+name_converter_file_path = os.path.join(data_path, "Name_converter_list.txt")
+data_sources_path = os.path.join(data_path, "Data_sources.txt")
+
+
+def wide_frame(message_type, channels, rows):
+    """Returns a data frame of a message type with a number of channels and a time column, as read from a log."""
+    frame = pd.DataFrame({"C{0}_us_{1}_20200114_Flight1".format(channel, message_type):
+                          np.arange(rows, dtype=np.int64) % 2000 for channel in range(channels)})
+    frame["Time_US_{}_20200114_Flight1".format(message_type)] = np.arange(rows, dtype=np.int64) * 20000
+    return frame
+
+
+def timed_sort(sorter, frame_list, repeats):
+    """Returns the shortest time taken to sort copies of the data frames, and the data frames sorted."""
+    best_time = None
+    for repeat in range(repeats):
+        # The legacy sorter changes the data frames it is given.
+        frames = [frame.copy() for frame in frame_list]
+        start = time.perf_counter()
+        sorted_frames = sorter(frames)
+        sort_time = time.perf_counter() - start
+        best_time = sort_time if best_time is None else min(best_time, sort_time)
+    return best_time, sorted_frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=1800, help="Length of the synthetic flight in seconds")
+    parser.add_argument("--columns", type=int, default=32, help="Number of channels of the wide data frames")
+    parser.add_argument("--repeats", type=int, default=3, help="Number of times each sort is timed")
+    arguments = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        log_file_path = directory + os.sep + "synthetic.log"
+        write_synthetic_log(log_file_path, arguments.duration)
+        frame_list = log_to_xlsx.log_reader(log_file_path, name_converter_file_path, data_sources_path, directory,
+                                            "synthetic", "20200114", "1", {}, {}, {}, in_memory=True)
+    finally:
+        shutil.rmtree(directory)
+    # RC inputs and outputs logged at 50 Hz.
+    rows = int(arguments.duration * 50)
+    wide_frames = [wide_frame("RCIN", arguments.columns, rows), wide_frame("RCOU", arguments.columns, rows)]
+    for label, frames in [["synthetic log", frame_list],
+                          ["{} channel RCIN and RCOU".format(arguments.columns), wide_frames]]:
+        legacy_time, legacy_frames = timed_sort(legacy_time_sorter.flight_data_time_sorter, frames,
+                                                arguments.repeats)
+        new_time, new_frames = timed_sort(flight_log_code.flight_data_time_sorter, frames, arguments.repeats)
+        print("{0}: {1} data frames, legacy {2:.3f} s, single pass {3:.3f} s ({4:.1f}x)".format(
+            label, len(new_frames), legacy_time, new_time, legacy_time / new_time))
+        if len(legacy_frames) != len(new_frames):
+            print("The number of data frames differs")
+        for legacy_frame, new_frame in zip(legacy_frames, new_frames):
+            pd.testing.assert_frame_equal(legacy_frame, new_frame)
+
+
+if __name__ == "__main__":
+    main()
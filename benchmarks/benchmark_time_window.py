@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks reading a synthetic log in full against reading only a time window
+in the middle of it with log_reader(time_window=...), and checks that the rows
+saved for the time window are the same as those of the full read.
+
+Run from the repository root:
+    python benchmarks/benchmark_time_window.py --duration 3600 --window 300
+
+@author Adrian Weishaeupl (aw6g15@soton.ac.uk)
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from autoflpy.util import log_to_xlsx  # noqa: E402
+from autoflpy.util.flight_store import store_reader  # noqa: E402
+from synthetic_log import write_synthetic_log  # noqa: E402
+
+data_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "autoflpy", "data")
+name_converter_file_path = os.path.join(data_path, "Name_converter_list.txt")
+data_sources_path = os.path.join(data_path, "Data_sources.txt")
+# The synthetic log is recorded on the 14th January 2020, with a TimeUS of 0 at 13:18:14 UTC.
+flight_date = "20200114"
+log_start_hours = 13 + (18 * 60 + 14) / 3600
+
+
+def timed_read(log_file_path, directory, name, time_window):
+    """Reads the log and returns the time taken, the peak memory traced and the flight store read back."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    log_to_xlsx.log_reader(log_file_path, name_converter_file_path, data_sources_path, directory, name, flight_date,
+                           "1", {}, {}, {}, export_xlsx=False, time_window=time_window)
+    read_time = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return read_time, peak, store_reader(directory + os.sep + name + ".flightdata")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=3600, help="Length of the synthetic flight in seconds")
+    parser.add_argument("--window", type=float, default=300, help="Length of the time window in seconds")
+    arguments = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        log_file_path = directory + os.sep + "window.log"
+        write_synthetic_log(log_file_path, arguments.duration)
+        # The time window is in the middle of the log.
+        window_start_s = 3.4 + (arguments.duration - arguments.window) / 2
+        time_window = [log_start_hours + window_start_s / 3600,
+                       log_start_hours + (window_start_s + arguments.window) / 3600]
+        full_time, full_peak, full_frames = timed_read(log_file_path, directory, "full", None)
+        window_time, window_peak, window_frames = timed_read(log_file_path, directory, "window", time_window)
+        print("Synthetic log: {0} s of flight, {1:.1f} MB".format(
+            arguments.duration, os.path.getsize(log_file_path) / 2 ** 20))
+        print("Full read:        {0:.2f} s, peak traced memory {1:.1f} MB".format(full_time, full_peak / 2 ** 20))
+        print("{0:.0f} s window:     {1:.2f} s, peak traced memory {2:.1f} MB".format(
+            arguments.window, window_time, window_peak / 2 ** 20))
+
+        # Rows of the full read inside the time window. Message types without rows in the window are not saved.
+        window_us = [int(window_start_s * 1e6), int((window_start_s + arguments.window) * 1e6)]
+        window_frames = {frame.columns[-1]: frame for frame in window_frames}
+        for full_frame in full_frames:
+            if full_frame.columns[-1].startswith("Time_US"):
+                time_us = full_frame.iloc[:, -1]
+                full_frame = full_frame[(time_us >= window_us[0]) & (time_us < window_us[1])]
+            window_frame = window_frames.get(full_frame.columns[-1])
+            if (window_frame is None and len(full_frame) > 0) or \
+                    (window_frame is not None and not full_frame.reset_index(drop=True).equals(window_frame)):
+                print("Rows differ for {}".format(full_frame.columns[-1]))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
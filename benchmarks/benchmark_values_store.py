@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks loading the compiled flight data of a synthetic log in a report,
+saved as a pickle of lists (as saved by older versions of AutoFLpy), a pickle
+with out-of-band array buffers and a values store (see values_store.py). Each
+load runs in a new process, which reads the values_list and uses a few
+channels, as a report plotting a few graphs does, and its peak memory (VmHWM,
+the peak resident set size, so Linux only) is measured.
+
+Run from the repository root:
+    python benchmarks/benchmark_values_store.py --duration 1800
+
+@author Adrian Weishaeupl (aw6g15@soton.ac.uk)
+"""
+
+import argparse
+import json
+import os
+import pickle as pk
+import shutil
+import subprocess
+import sys
+import tempfile
+import numpy as np
+
+repository_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repository_path)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from autoflpy.util import flight_log_code, log_to_xlsx, values_store  # noqa: E402
+from synthetic_log import write_synthetic_log  # noqa: E402
+
+data_path = os.path.join(repository_path, "autoflpy", "data")
+name_converter_file_path = os.path.join(data_path, "Name_converter_list.txt")
+data_sources_path = os.path.join(data_path, "Data_sources.txt")
+
+# Loads the values_list and sums the data of the first channels of the first data sources, in a new process.
+load_script = """
+import json, math, sys, time
+sys.path.insert(0, {repository_path!r})
+from autoflpy.util.values_store import values_list_reader
+start = time.perf_counter()
+values_list = values_list_reader({data_file_path!r}, as_arrays={as_arrays})
+load_time = time.perf_counter() - start
+total = 0
+for source in values_list[0][1][:{channels}]:
+    total += math.fsum(source[1][2])
+use_time = time.perf_counter() - start
+peak_kb = [int(line.split()[1]) for line in open("/proc/self/status") if line.startswith("VmHWM")][0]
+print(json.dumps([load_time, use_time, peak_kb, total]))
+"""
+
+
+def timed_load(data_file_path, channels, as_arrays):
+    """Returns the load time, the time to use the channels, the peak memory in kB and the sum of the channels."""
+    script = load_script.format(repository_path=repository_path, data_file_path=data_file_path, channels=channels,
+                                as_arrays=as_arrays)
+    output = subprocess.run([sys.executable, "-c", script], check=True, stdout=subprocess.PIPE).stdout
+    return json.loads(output.decode().splitlines()[-1])
+
+
+def list_values(values_list):
+    """Returns the values_list with the data of each channel as a list, as it was pickled by older versions."""
+    return [[flight, [[source[0]] + [[name, unit, np.asarray(data).tolist()] for name, unit, data in source[1:]]
+                      for source in sources]] for flight, sources in values_list]
+
+
+def storage_size(path):
+    """Returns the size of a file, or of all of the files in a folder, in bytes."""
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(path + os.sep + file_name) for file_name in os.listdir(path))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=1800, help="Length of the synthetic flight in seconds")
+    parser.add_argument("--channels", type=int, default=3, help="Number of channels used after loading")
+    arguments = parser.parse_args()
+
+    directory = tempfile.mkdtemp() + os.sep
+    try:
+        log_file_path = directory + "synthetic.log"
+        write_synthetic_log(log_file_path, arguments.duration)
+        log_to_xlsx.log_reader(log_file_path, name_converter_file_path, data_sources_path, directory, "synthetic",
+                               "20200114", "1", {}, {}, {}, export_xlsx=False)
+        print("Synthetic log: {0} s of flight, {1:.1f} MB".format(
+            arguments.duration, os.path.getsize(log_file_path) / 2 ** 20))
+        for file_name in ["synthetic.pkl", "synthetic.values"]:
+            flight_log_code.compile_and_compress(directory, ["synthetic.flightdata"], "", [""], directory + file_name)
+        # The pickle of lists saved by older versions.
+        with open(directory + "lists.pkl", "wb") as pickle_file:
+            pk.dump(list_values(values_store.values_list_reader(directory + "synthetic.pkl")), pickle_file)
+        totals = []
+        for label, file_name, as_arrays in [["pickle of lists", "lists.pkl", False],
+                                            ["pickle 5", "synthetic.pkl", False],
+                                            ["values store", "synthetic.values", False],
+                                            ["values, arrays", "synthetic.values", True]]:
+            load_time, use_time, peak_kb, total = timed_load(directory + file_name, arguments.channels, as_arrays)
+            totals.append(total)
+            print("{0:<16} {1:6.1f} MB on disk, loaded in {2:.1f} ms, {3} channels used after {4:.1f} ms, "
+                  "peak memory {5:.1f} MB".format(label, storage_size(directory + file_name) / 2 ** 20,
+                                                  load_time * 1000, arguments.channels, use_time * 1000,
+                                                  peak_kb / 1024))
+        if len(set(totals)) > 1:
+            print("The channels used differ: {}".format(totals))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
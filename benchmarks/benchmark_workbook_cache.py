@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks reading an xlsx file with flight_log_code.flight_data() with and
+without the workbook cache (see workbook_cache.py).
+
+Run from the repository root:
+    python benchmarks/benchmark_workbook_cache.py tests/test_files/test_xlsx.xlsx
+
+@author Adrian Weishaeupl (aw6g15@soton.ac.uk)
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from autoflpy.util import flight_log_code  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("xlsx_file_path", help="xlsx file to read")
+    arguments = parser.parse_args()
+
+    cache_path = tempfile.mkdtemp()
+    try:
+        file_path, file_name = os.path.split(os.path.abspath(arguments.xlsx_file_path))
+        for label, use_cache, content_hash in [["without cache", False, False],
+                                               ["first read (cache miss)", True, False],
+                                               ["cache hit", True, False],
+                                               ["cache hit, content hash", True, True]]:
+            start = time.perf_counter()
+            frame_list = flight_log_code.flight_data(file_path + os.sep, file_name, use_cache=use_cache,
+                                                     cache_path=cache_path, content_hash=content_hash)
+            print("{0:<26} {1:.3f} s ({2} sheets)".format(label, time.perf_counter() - start, len(frame_list)))
+            if label == "cache hit":
+                # The entry with the content hash is a separate entry, so it is written first.
+                flight_log_code.flight_data(file_path + os.sep, file_name, use_cache=True, cache_path=cache_path,
+                                            content_hash=True)
+    finally:
+        shutil.rmtree(cache_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks how long the flight reports have to wait for the log reader when
+an xlsx file is wanted: writing the xlsx file inside log_reader() against
+saving only the flight store and writing the xlsx file from it in the
+background with xlsx_export_starter().
+
+Run from the repository root:
+    python benchmarks/benchmark_xlsx_export.py --duration 600
+
+@author Adrian Weishaeupl (aw6g15@soton.ac.uk)
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from autoflpy.util import log_to_xlsx  # noqa: E402
+from synthetic_log import write_synthetic_log  # noqa: E402
+
+data_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "autoflpy", "data")
+name_converter_file_path = os.path.join(data_path, "Name_converter_list.txt")
+data_sources_path = os.path.join(data_path, "Data_sources.txt")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=600, help="Length of the synthetic flight in seconds")
+    arguments = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        log_file_path = directory + os.sep + "export.log"
+        write_synthetic_log(log_file_path, arguments.duration)
+
+        start = time.perf_counter()
+        log_to_xlsx.log_reader(log_file_path, name_converter_file_path, data_sources_path, directory, "inline",
+                               "20200114", "1", {}, {}, {}, export_xlsx=True)
+        inline_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        log_to_xlsx.log_reader(log_file_path, name_converter_file_path, data_sources_path, directory, "background",
+                               "20200114", "1", {}, {}, {}, export_xlsx=False)
+        store_time = time.perf_counter() - start
+        exports = log_to_xlsx.xlsx_export_starter(directory, ["background"])
+        log_to_xlsx.xlsx_export_finisher(exports)
+        export_time = time.perf_counter() - start - store_time
+
+        print("Synthetic log: {0} s of flight, {1:.1f} MB".format(
+            arguments.duration, os.path.getsize(log_file_path) / 2 ** 20))
+        print("xlsx written by log_reader:   reports wait {0:.2f} s".format(inline_time))
+        print("xlsx written in background:   reports wait {0:.2f} s, xlsx finished {1:.2f} s later".format(
+            store_time, export_time))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+The flight_data_and_axis() of flight_log_code.py before the column titles were
+parsed by header_parser(), kept as a reference for
+benchmark_header_parser.py.
+@author: Adrian Weishaeupl
+aw6g15@soton.ac.uk 2019
+"""
+
+
+def flight_data_and_axis(new_frames, as_arrays=False):
+    """Returns list of lists with the following structure:
+    [[flight, [data source, [name, unit, data],[name, unit, data]]], [flight, [data source, [name, unit, data],
+    [name, unit, data]]]].
+
+    The data of each column is a list, or an array if as_arrays is True."""
+    # TODO: try rewriting this code in a more legible way.
+    # Creates an empty list for all the data.
+    values_list = []
+    # Finds the flight date and number from the data
+    flight_identifier = new_frames[0].columns[0][-16:]
+    # Checks through all the data frames
+    for frame in new_frames:
+        # Goes through all the columns
+        data_lists = []
+        data_lists.append(frame.columns[0].split("_")[-3])
+        unit_present = True
+        for column in frame.columns:
+            # Converts values from data frame into a list.
+            y = frame[column].to_numpy() if as_arrays is True else frame[column].tolist()
+            # This code creates the y-axis label.
+            # Creates a name
+            name = ""
+            unit = ""
+            # b is used to place a capital letter for the first letter.
+            b = 0
+            # This checks the length of the columns to check if units need to
+            # be included.
+            if len(column.split("_")) == 5:
+                # a is used to check if the underscore has been reached.
+                a = 0
+                # unit_present is used to indicate that there is a unit.
+                unit_present = True
+            else:
+                if len(column.split("_")) == 4:
+                    # This indicates that there are no units for that
+                    # particular value.
+                    unit_present = False
+                    a = 0
+                else:
+                    a = 5 - len(column.split("_"))
+
+            # This for loop creates the name and unit data.
+            for letter in column:
+                if b == 0:
+                    # Adds an uppercase letter to the start of the name
+                    name = letter.upper()
+                    # Sets b to 1 to indicate that a capital letter has been
+                    # inserted.
+                    b = 1
+                else:
+                    if a <= 0:
+                        # Replaces underscore with a space.
+                        if letter != "_":
+                            # Adds letters to build up name.
+                            name = name + letter
+                        else:
+                            # Increment a
+                            a += 1
+                            # If the name has more than one word in it, use
+                            # a space as a separator
+                            if a <= 0:
+                                name += " "
+                    else:
+                        # TODO: unit_present is only set when a is 0 but only accessed when a is > 0. This is a problem.
+                        if letter != "_" and unit_present is True:
+                            unit = unit + letter
+                        elif unit_present is False:
+                            unit = "no unit"
+                            break
+                        else:
+                            break
+            # Replaces per with the superscript notation.
+            if "per" in unit:
+                # splits unit into list about per.
+                unit_split = unit.split("per")
+                # Creates a blank list for counting the number of occurrences.
+                # of a particular denominator.
+                denominators = []
+                # a is used to check if the value is a numerator or a
+                # denominator.
+                a = 0
+                for count in range(1, len(unit_split)):
+                    # Checks through denominator list
+                    for item in denominators:
+                        # Checks if there is already a denominator with that
+                        # unit.
+                        if unit_split[count] in item[0]:
+                            # If there is then it increases the power of that
+                            # unit.
+                            item[1] = item[1] + 1
+                            # Sets the check to 1 to show that this unit has
+                            # appeared before.
+                            a = 1
+                    # Checks if the denominator has appeared before.
+                    if a == 1:
+                        a = 0
+                    else:
+                        # If not it creates a new entry.
+                        denominators.append([unit_split[count], 1])
+                # recreates unit.
+                unit = unit_split[0]
+                # Goes through each denominators and formats adds it to the
+                # unit list.
+                for denominator in denominators:
+                    # Puts units in format with powers
+                    unit = unit + denominator[0] + "$^{-" + \
+                           str(denominator[1]) + "}$"
+            data_lists.append([name, unit, y])
+        values_list.append(data_lists)
+    return [flight_identifier, values_list]
@@ -0,0 +1,37 @@
+"""
+The select_plot_data_single() of plotting.py before it used the shared channel
+index of the values_list, kept as a reference for
+benchmark_plot_lookups.py.
+@author: Adrian Weishaeupl
+aw6g15@soton.ac.uk 2019
+"""
+
+
+def select_plot_data_single(values_list, plot_information, number_of_flights):
+    """
+    List of data to plot returns values_list which has structure:
+    [[[axis, [data_source, column], [axis, [data_source, column]],
+     [[axis, [data_source, column], [axis, [data_source, column]]]"""
+    plot_data = []
+    for data_set in range(number_of_flights):
+        plot_data_temp = []  # Will become a set of x and y data sets
+        for data in plot_information:
+            values_list_index = 0
+            # Checks to see if the 'data source' recorded in the graph list
+            # matches the 'data sources' in the list structure values_list.
+            for values_list_data in values_list[data_set]:
+                # Finds data source.
+                if data[2].lower() == values_list_data[0].lower():
+                    data.append(values_list_index)
+                    # Goes through each column searching for a match.
+                    for column in values_list[data_set][values_list_index][1:]:
+                        # Checks to see if they have the same title.
+                        if column[0].lower() == data[1].lower():
+                            # if they do then the data is appended.
+                            plot_data_temp.append([data[0], column, data[2]])
+                            # exits for loop if data has been appended.
+                            break
+                values_list_index += 1
+        plot_data.append(plot_data_temp)
+
+    return plot_data
@@ -0,0 +1,98 @@
+"""
+The flight_data_time_sorter() of flight_log_code.py before it split each data
+frame in a single pass, kept as a reference for benchmark_time_sorter.py.
+@author: Adrian Weishaeupl
+aw6g15@soton.ac.uk 2019
+"""
+
+
+def flight_data_time_sorter(frame_list):
+    """Splits the data by the title containing time."""
+    a = 0
+    # Creates a blank dictionary for the time columns.
+    renamed_time_columns = {}
+    # Empty list to be populated by columns that contain time.
+    time_columns = []
+    # Empty list for new frames to fill.
+    new_frames = []
+    # Edits one frame at a time.
+    for frame_data in frame_list:
+        # Empty list to be populated by columns that contain time more than
+        # once.
+        frame_columns_list = []
+        # Columns is a list of columns.
+        columns = frame_list[a].columns
+        # Increments a
+        a = a + 1
+        # Loops through each column to see if it contains the word time.
+        for column_data in columns:
+            # Checks to see if the word time appears in the column.
+            try:
+                if "action_time" in column_data.lower():
+                    # Exceptons are passed here.
+                    pass
+                elif "time" in column_data.lower():
+                    # If time appears then it is appended to the list time_columns.
+                    time_columns.append(column_data)
+                    # Divides column by 1*10^6 to return it to seconds.
+                    frame_data[column_data] = frame_data[column_data].div(10 ** 6)
+                    # Adds columns in this data frame that contain the word time to
+                    # a list.
+                    frame_columns_list.append(column_data)
+                    # appends replacement column to dictionary.
+                    renamed_time_columns[column_data] = (column_data.replace("_US_", "_s_"))
+            except TypeError:  # This exception is for the user collected environmental data time
+                if "dummy_time" in column_data.lower():
+                    frame_columns_list.append(column_data)
+                else:
+                    pass
+
+        # Creates a copy of the columns to delete parts from.
+        frame_copy = frame_data.copy()
+        # The variable b will be used to divide the list.
+        b = 0
+        # This variable is used to trigger the appending of the data frames to
+        # the list data frames.
+        d = 0
+        # Checks through each of the columns.
+        frame_duplicate = None
+        for column_data in columns:
+            if b == 0:
+                frame_duplicate = frame_copy.copy()
+                b = 1
+                # Checks to see if column is a time column.
+                for time_column in time_columns:
+                    if column_data == time_column:
+                        d = 1
+                # Removes frames
+                frame_copy = frame_copy.drop(labels=column_data, axis=1)
+                if d == 1:
+                    # Removes columns from the frame_duplicate list
+                    for column_drop in frame_copy.columns:
+                        frame_duplicate = frame_duplicate.drop(labels=column_drop, axis=1)
+                    # Checks if time appears in column being checked.
+                    new_frames.append(frame_duplicate)
+                    b = d = 0
+            else:
+                # Checks to see if column is a time column.
+                for time_column in time_columns:
+                    if column_data == time_column:
+                        d = 1
+                # Removes frames
+                frame_copy = frame_copy.drop(labels=column_data, axis=1)
+                if d == 1:
+                    # Removes columns from the frame_duplicate list
+                    for column_drop in frame_copy.columns:
+                        frame_duplicate = frame_duplicate.drop(labels=column_drop, axis=1)
+                    # Checks if time appears in column being checked.
+                    new_frames.append(frame_duplicate)
+                    b = d = 0
+    # Creates a blank list for the frames with the seconds unit fixed.
+    arranged_frames = []
+    # Renames columns and changes the units of time from US (microseconds) to s
+    for frame_data in new_frames:
+        # Replaces the unit
+        frame_data.rename(columns=renamed_time_columns, inplace=True)
+        # Appends the frame.
+        arranged_frames.append(frame_data)
+    return arranged_frames
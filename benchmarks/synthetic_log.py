@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+Generates synthetic ArduPilot .log files (in the Mission Planner text format)
+for benchmarking the log ingestion code.
+
+The message types, formats and column names follow those written by
+ArduPlane so that the Name_converter_list.txt and Data_sources.txt files can
+be used unchanged.
+
+@author Adrian Weishaeupl (aw6g15@soton.ac.uk)
+"""
+
+import math
+import random
+import struct
+
+# [name, format, columns, rate in Hz]
+MESSAGE_FORMATS = [
+    ["PARM", "QNf", "TimeUS,Name,Value", 0],
+    ["GPS", "QBIHBcLLefffB", "TimeUS,Status,GMS,GWk,NSats,HDop,Lat,Lng,Alt,Spd,GCrs,VZ,U", 5],
+    ["IMU", "QffffffIIfBBHH", "TimeUS,GyrX,GyrY,GyrZ,AccX,AccY,AccZ,EG,EA,T,GH,AH,GHz,AHz", 50],
+    ["MSG", "QZ", "TimeUS,Message", 0],
+    ["RCOU", "QHHHHHHHHHHHHHH", "TimeUS,C1,C2,C3,C4,C5,C6,C7,C8,C9,C10,C11,C12,C13,C14", 25],
+    ["BARO", "QffcfIffB", "TimeUS,Alt,Press,Temp,CRt,SMS,Offset,GndTemp,Health", 10],
+    ["ATT", "QccccCCCC", "TimeUS,DesRoll,Roll,DesPitch,Pitch,DesYaw,Yaw,ErrRP,ErrYaw", 25],
+    ["MODE", "QMBB", "TimeUS,Mode,ModeNum,Rsn", 0],
+    ["VIBE", "QfffIII", "TimeUS,VibeX,VibeY,VibeZ,Clip0,Clip1,Clip2", 50],
+    ["EV", "QB", "TimeUS,Id", 0],
+    ["AOA", "Qff", "TimeUS,AOA,SSA", 0],
+]
+
+# Message types which are declared in the FMT block of a real log but for which
+# no data is written (ArduPlane declares well over a hundred of these).
+UNUSED_MESSAGE_NAMES = [
+    "TECS", "CTUN", "NTUN", "ARSP", "ASP2", "BAT", "BAT2", "POWR", "RCIN", "RCI2", "MAG", "MAG2", "MAG3", "AHR2",
+    "POS", "SIM", "NKF1", "NKF2", "NKF3", "NKF4", "NKF5", "NKF6", "NKF7", "NKF8", "NKF9", "NKQ1", "NKQ2", "XKF1",
+    "XKF2", "XKF3", "XKF4", "XKF5", "XKF6", "XKF7", "XKF8", "XKF9", "XKFS", "XKQ1", "XKQ2", "XKQ3", "XKFD",
+    "XKV1", "XKV2", "IMU2", "IMU3", "ACC1", "ACC2", "ACC3", "GYR1", "GYR2", "GYR3", "GPA", "GPA2", "GPS2", "GPSB",
+    "GRAW", "GRXH", "GRXS", "SBPH", "SBRH", "SBPR", "UBX1", "UBX2", "UBX3", "BAR2", "BAR3", "RFND", "PIDR", "PIDP",
+    "PIDY", "PIDA", "PIDS", "PIDG", "PM", "RAD", "RSSI", "CMD", "CAM", "TRIG", "MNT", "ARM", "ERR", "STAT", "QTUN",
+    "AETR", "OF", "ORGN", "RALY", "SOAR", "SORC", "TERR", "DSTL", "VISP", "VISO", "BCN", "PRTN", "PRX", "RPM",
+    "ADSB", "CESC", "CSRV", "LGR", "MAV", "DMS", "SRTL", "IOMC", "EKF", "ESC1", "ESC2", "ESC3", "ESC4", "SUSP",
+]
+
+
+# struct codes for each of the DataFlash format characters, with the factor the value is multiplied by in a .bin.
+FORMAT_STRUCTS = {
+    "b": ["b", 1], "B": ["B", 1], "h": ["h", 1], "H": ["H", 1], "i": ["i", 1], "I": ["I", 1], "f": ["f", 1],
+    "d": ["d", 1], "n": ["4s", 1], "N": ["16s", 1], "Z": ["64s", 1], "c": ["h", 100], "C": ["H", 100],
+    "e": ["i", 100], "E": ["I", 100], "L": ["i", 10 ** 7], "M": ["B", 1], "q": ["q", 1], "Q": ["Q", 1],
+}
+# Flight mode numbers used for the M format character in .bin logs.
+MODE_NUMBERS = {"MANUAL": 0}
+
+
+def message_formats():
+    """Returns [type number, name, format, columns] for every message type in the FMT block."""
+    formats = [[128, "FMT", "BBnNZ", "Type,Length,Name,Format,Columns"]]
+    for index in range(len(MESSAGE_FORMATS)):
+        name, message_format, columns, rate = MESSAGE_FORMATS[index]
+        formats.append([129 + index, name, message_format, columns])
+    for index in range(len(UNUSED_MESSAGE_NAMES)):
+        formats.append([129 + len(MESSAGE_FORMATS) + index, UNUSED_MESSAGE_NAMES[index], "Qff", "TimeUS,A,B"])
+    return formats
+
+
+def message_struct(message_format):
+    """Returns the struct used to pack the payload of a message with the given format."""
+    return struct.Struct("<" + "".join(FORMAT_STRUCTS[character][0] for character in message_format))
+
+
+def fmt_lines():
+    """Returns the FMT block written at the start of every log."""
+    return ["FMT, {0}, {1}, {2}, {3}, {4}".format(message_type, message_struct(message_format).size + 3, name,
+                                                  message_format, columns)
+            for message_type, name, message_format, columns in message_formats()]
+
+
+def message_values(name, time_us, generator):
+    """Returns the values of a single message of type name at time_us, starting with the time."""
+    t = time_us / 1e6
+    if name == "GPS":
+        values = [6, 220712000 + time_us // 1000, 2088, 10, 1.21, round(49.9543952 + t * 1e-5, 7),
+                  round(-6.3688301 + t * 1e-5, 7), round(8.4 + 20 * math.sin(t / 50), 2),
+                  round(abs(15 * math.sin(t / 40)), 3), round(t % 360, 2), 0, 1]
+    elif name == "IMU":
+        values = [round(generator.gauss(0, 0.01), 6) for _ in range(3)] + \
+                 [round(generator.gauss(0, 0.3), 6), round(generator.gauss(0, 0.3), 6),
+                  round(-9.81 + generator.gauss(0, 0.3), 6), 0, 0, 32.1, 1, 1, 1000, 1000]
+    elif name == "RCOU":
+        values = [1500 + int(100 * math.sin(t + channel)) for channel in range(14)]
+    elif name == "BARO":
+        values = [round(8.4 + 20 * math.sin(t / 50), 2), round(101325 - 12 * t % 50, 2), 21.3, 0.0,
+                  time_us // 1000, 0, 21.3, 1]
+    elif name == "ATT":
+        values = [round(10 * math.sin(t / 3), 2), round(10 * math.sin(t / 3) + generator.gauss(0, 0.2), 2),
+                  round(5 * math.cos(t / 4), 2), round(5 * math.cos(t / 4) + generator.gauss(0, 0.2), 2),
+                  round(t % 360, 2), round(t % 360, 2), 0.01, 0.02]
+    elif name == "VIBE":
+        values = [round(abs(generator.gauss(2, 0.5)), 4), round(abs(generator.gauss(2, 0.5)), 4),
+                  round(abs(generator.gauss(4, 0.5)), 4), 0, 0, 0]
+    else:
+        raise KeyError("No synthetic data defined for {}".format(name))
+    return [time_us] + values
+
+
+def synthetic_messages(duration_s, seed=0):
+    """Yields [name, values] for every message (after the FMT block) of a synthetic log lasting duration_s
+    seconds."""
+    generator = random.Random(seed)
+    yield ["PARM", [3106000, "SYSID_THISMAV", 1]]
+    yield ["PARM", [3106000, "ARSPD_TYPE", 1]]
+    yield ["MSG", [3200000, "ArduPlane V3.9.8 (b6cb2b5c), ChibiOS: 42a1b1ac"]]
+    yield ["MODE", [3300000, "MANUAL", 0, 0]]
+    # Interleaves the periodic messages in time order, as they are in a real log.
+    periodic = [[name, int(1e6 / rate)] for name, message_format, columns, rate in MESSAGE_FORMATS if rate > 0]
+    start_us = 3400000
+    end_us = start_us + int(duration_s * 1e6)
+    step_us = min(period for name, period in periodic)
+    for time_us in range(start_us, end_us, step_us):
+        if time_us == start_us + step_us:
+            yield ["EV", [time_us, 10]]
+        for name, period in periodic:
+            if (time_us - start_us) % period == 0:
+                yield [name, message_values(name, time_us, generator)]
+    yield ["EV", [end_us, 11]]
+
+
+def synthetic_log_lines(duration_s, seed=0):
+    """Yields the lines of a synthetic log lasting duration_s seconds."""
+    for line in fmt_lines():
+        yield line
+    for name, values in synthetic_messages(duration_s, seed):
+        yield name + ", " + ", ".join(str(value) for value in values)
+
+
+def write_synthetic_log(file_path, duration_s, seed=0):
+    """Writes a synthetic log lasting duration_s seconds to file_path."""
+    with open(file_path, "w") as log_file:
+        for line in synthetic_log_lines(duration_s, seed):
+            log_file.write(line + "\n")
+
+
+def pack_message(message_type, message_format, values):
+    """Returns the bytes of a single .bin message."""
+    if len(values) != len(message_format):
+        raise ValueError("{0} values given for the format {1}".format(len(values), message_format))
+    packed_values = []
+    for index in range(len(message_format)):
+        code, factor = FORMAT_STRUCTS[message_format[index]]
+        value = values[index]
+        if message_format[index] == "M":
+            value = MODE_NUMBERS.get(value, value)
+        if code.endswith("s"):
+            value = str(value).encode("ascii")
+        elif factor != 1:
+            value = int(round(value * factor))
+        packed_values.append(value)
+    return bytes([0xA3, 0x95, message_type]) + message_struct(message_format).pack(*packed_values)
+
+
+def write_synthetic_bin(file_path, duration_s, seed=0):
+    """Writes the DataFlash .bin equivalent of the synthetic log lasting duration_s seconds to file_path."""
+    formats = {}
+    with open(file_path, "wb") as bin_file:
+        for message_type, name, message_format, columns in message_formats():
+            formats[name] = [message_type, message_format]
+            length = message_struct(message_format).size + 3
+            bin_file.write(pack_message(128, "BBnNZ", [message_type, length, name, message_format, columns]))
+        for name, values in synthetic_messages(duration_s, seed):
+            bin_file.write(pack_message(formats[name][0], formats[name][1], values))
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the bin_reader.py code.
+
+@author Adrian Weishaeupl (aw6g15@soton.ac.uk)
+"""
+
+from autoflpy.util import bin_reader
+from autoflpy.util import log_ingestion
+import unittest
+import os
+import shutil
+import tempfile
+import numpy as np
+
+
+class TestBinReader(unittest.TestCase):
+
+    def setUp(self):
+        # Create variables and assign directories before any test.
+        base_path = os.path.join(os.path.dirname(__file__),
+                                 "test_files") + os.sep
+        # Tidies up the base path for python.
+        self.base_path = base_path.replace(os.sep, "/")
+        # The .log file was created from the same flight as the .bin file.
+        self.bin_file_path = self.base_path + "test_short_log.bin"
+        self.log_file_path = self.base_path + "test_short_log.log"
+        self.output_path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.output_path)
+
+    def test_format_dtype(self):
+        """Tests for format_dtype()"""
+        dtype = bin_reader.format_dtype("QBIHBcLLefffB")
+        # The GPS message has a 43 byte payload after its 3 byte header.
+        self.assertEqual(43, dtype.itemsize)
+        self.assertEqual(np.dtype("<u8"), dtype["f0"])
+        self.assertEqual(np.dtype("<i4"), dtype["f6"])
+        self.assertEqual(13, len(dtype.names))
+
+    def test_column_converter(self):
+        """Tests that unsigned 64 bit values are read as they are from a .log file"""
+        self.assertEqual(np.int64, bin_reader.column_converter(np.array([5], dtype="<u8"), "Q").dtype)
+        column = bin_reader.column_converter(np.array([18446744073709551615, 5], dtype="<u8"), "Q")
+        self.assertEqual(np.uint64, column.dtype)
+        self.assertEqual([18446744073709551615, 5], column.tolist())
+
+    def test_bin_log_reader(self):
+        """Tests that bin_log_reader() reads the same FMT lines and data as in the .log file"""
+        fmt_lines, message_columns = bin_reader.bin_log_reader(self.bin_file_path)
+        log_fmt_lines, message_data = log_ingestion.log_ingestor(log_ingestion.log_line_reader(self.log_file_path))
+
+        self.assertEqual(log_fmt_lines, fmt_lines)
+        # Every message type with data has been read
+        self.assertEqual(sorted(message_type for message_type in message_data if message_type not in ["FMT", ""]),
+                         sorted(message_columns))
+        for message_type in message_columns:
+            columns = message_columns[message_type]
+            # Text messages can contain ", " themselves.
+            log_lines = [line.split(", ", len(columns))[1:] for line in message_data[message_type]]
+            self.assertEqual(len(log_lines), len(columns[0]))
+            for index in range(len(columns)):
+                log_column = [line[index] for line in log_lines]
+                if columns[index].dtype.kind == "U":
+                    self.assertEqual(log_column, columns[index].tolist())
+                elif message_type != "MODE":
+                    np.testing.assert_allclose(np.array(log_column, dtype=float), columns[index], rtol=1e-6)
+
+    def test_bin_log_reader_message_types(self):
+        """Tests that only the message types given are decoded, with the same values and all of the FMT lines"""
+        fmt_lines, message_columns = bin_reader.bin_log_reader(self.bin_file_path)
+        filtered_fmt_lines, filtered_columns = bin_reader.bin_log_reader(self.bin_file_path, {"GPS", "AOA"})
+        self.assertEqual(fmt_lines, filtered_fmt_lines)
+        self.assertEqual(["GPS"], list(filtered_columns))
+        for column, filtered_column in zip(message_columns["GPS"], filtered_columns["GPS"]):
+            self.assertEqual(column.tolist(), filtered_column.tolist())
+
+    def test_bin_log_reader_values(self):
+        """Tests the types and scaling of the values read by bin_log_reader()"""
+        fmt_lines, message_columns = bin_reader.bin_log_reader(self.bin_file_path)
+        gps = message_columns["GPS"]
+        # TimeUS is kept as integer microseconds
+        self.assertEqual(np.int64, gps[0].dtype)
+        self.assertEqual(3400000, gps[0][0])
+        # Lat (L) and HDop (c) are scaled down
+        self.assertEqual(49.9544292, gps[6][0])
+        self.assertEqual(1.21, gps[5][0])
+        # Floats keep the value written rather than the nearest float32
+        self.assertEqual(1.273, gps[9][0])
+        self.assertEqual("ArduPlane V3.9.8 (b6cb2b5c), ChibiOS: 42a1b1ac", message_columns["MSG"][1][0])
+
+    def test_bin_log_reader_corrupt(self):
+        """Tests that corrupt bytes are skipped and a cut off message at the end is ignored"""
+        with open(self.bin_file_path, "rb") as bin_file:
+            data = bin_file.read()
+        # Finds the start of the first GPS message
+        gps_start = data.find(bytes([bin_reader.HEAD_1, bin_reader.HEAD_2, 130]))
+        corrupt_file_path = self.output_path + os.sep + "corrupt.bin"
+        with open(corrupt_file_path, "wb") as corrupt_file:
+            # Adds rubbish before the first GPS message and cuts the last message short.
+            corrupt_file.write(data[:gps_start] + b"\x00\x01\xa3" + data[gps_start:-2])
+        fmt_lines, message_columns = bin_reader.bin_log_reader(corrupt_file_path)
+        self.assertEqual(10, len(message_columns["GPS"][0]))
+        # The last EV message was cut off
+        self.assertEqual([3420000], message_columns["EV"][0].tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the flight_dataset.py code.
+
+@author Adrian Weishaeupl (aw6g15@soton.ac.uk)
+"""
+
+from autoflpy.util import flight_dataset, flight_log_code, log_to_xlsx, values_store
+import unittest
+import os
+import pickle as pk
+import shutil
+import tempfile
+import numpy as np
+
+
+class TestFlightDataset(unittest.TestCase):
+
+    def setUp(self):
+        # Create variables and assign directories before any test.
+        base_path = os.path.join(os.path.dirname(__file__),
+                                 "test_files") + os.sep
+        # Tidies up the base path for python.
+        self.base_path = base_path.replace(os.sep, "/")
+        with open(self.base_path + "test_pickled_data.pkl", "rb") as pickle_file:
+            self.values_list = pk.load(pickle_file)
+        self.directory = tempfile.mkdtemp() + os.sep
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_channel_lookup(self):
+        """Tests that channels are found by data source and name in any case"""
+        dataset = flight_dataset.FlightDataset(self.values_list)
+        self.assertEqual(["20190110_Flight1"], dataset.flights)
+        self.assertEqual(1, len(dataset))
+        altitude = dataset.channel("gps", "ALTITUDE")
+        self.assertEqual(["GPS", "Altitude", "m"], [altitude.source, altitude.name, altitude.unit])
+        self.assertIsInstance(altitude.data, np.ndarray)
+        self.assertEqual(self.values_list[0][1][0][8][2], altitude.data.tolist())
+        self.assertIs(altitude, dataset.channel("GPS", "Altitude", flight=0))
+        self.assertEqual("Altitude", dataset.channel("BARO", "altitude").name)
+        self.assertIsNone(dataset.channel("gps", "airspeed"))
+        self.assertEqual([], dataset.channels("ekf", "time"))
+        # Channels have no instance dictionary.
+        self.assertFalse(hasattr(altitude, "__dict__"))
+
+    def test_values_list_view(self):
+        """Tests that the values_list view has the structure and values of the values_list"""
+        dataset = flight_dataset.FlightDataset(self.values_list)
+        self.assertEqual(self.values_list[0][0], dataset.values_list[0][0])
+        for source, view_source in zip(self.values_list[0][1], dataset[0][1]):
+            self.assertEqual(source[0], view_source[0])
+            for channel, view_channel in zip(source[1:], view_source[1:]):
+                name, unit, data = view_channel
+                self.assertEqual(channel[:2], [name, unit])
+                np.testing.assert_equal(np.array(channel[2]), data)
+        # The view shares the channels of the index.
+        self.assertIs(dataset.channel("gps", "altitude"), dataset.values_list[0][1][0][8])
+
+    def test_split_data_source(self):
+        """Tests that a data source with more than one group of channels gives a channel for each group"""
+        values_list = [["20190123_Flight2", [["ATT", ["Roll", "deg", [1.5, 2.5]], ["Time", "s", [0.5, 1.0]]],
+                                             ["ATT", ["Time", "s", [2.0, 3.0]], ["time", "s", [4.0]]],
+                                             ["WEATHER", ["Wind", "mps", [1.5, "N/A"]]]]]]
+        dataset = flight_dataset.FlightDataset(values_list)
+        time_channels = dataset.channels("att", "time")
+        self.assertEqual([[0.5, 1.0], [2.0, 3.0]], [channel.data.tolist() for channel in time_channels])
+        # Values of mixed types are kept as they are.
+        self.assertEqual([1.5, "N/A"], dataset.channel("weather", "wind").data.tolist())
+        with self.assertRaises(IndexError):
+            dataset.channel("att", "roll")[3] = []
+
+    def test_channel_index(self):
+        """Tests that the index of a values_list has the channels it has when it is built"""
+        index = flight_dataset.channel_index(self.values_list)
+        self.assertIs(self.values_list[0][1][0][8], index[0][("gps", "altitude")][0])
+        # Channels added to the values_list are in the next index built.
+        self.values_list[0][1][0].append(["Derived", "m", [1, 2, 3]])
+        self.assertNotIn(("gps", "derived"), index[0])
+        new_index = flight_dataset.channel_index(self.values_list)
+        self.assertEqual([["Derived", "m", [1, 2, 3]]], new_index[0][("gps", "derived")])
+        # Only the data sources asked for are indexed.
+        source_index = flight_dataset.channel_index(self.values_list, ["GPS", "baro"])
+        self.assertEqual({"gps", "baro"}, set(key[0] for key in source_index[0]))
+        # A FlightDataset has its own index.
+        dataset = flight_dataset.FlightDataset(self.values_list)
+        self.assertIs(dataset.index, flight_dataset.channel_index(dataset))
+
+    def test_offset_channel(self):
+        """Tests that an offset channel adds the offset to the data of the channel without changing it"""
+        channel = ["Time", "s", [0, 0.5, 1.5]]
+        offset_channel = flight_dataset.OffsetChannel(channel, 10.0)
+        self.assertEqual(["Time", "s"], [offset_channel[0], offset_channel[1]])
+        name, unit, data = offset_channel
+        self.assertEqual([10.0, 10.5, 11.5], data.tolist())
+        self.assertIs(data, offset_channel[2])
+        self.assertEqual(["Time", "s", [0, 0.5, 1.5]], channel)
+
+    def test_from_file(self):
+        """Tests that the data of a FlightDataset read from a values store is read when it is used"""
+        log_to_xlsx.log_reader(self.base_path + "test_short_log.log",
+                               self.base_path + "test_name_converter_list.txt",
+                               self.base_path + "test_data_sources.txt", self.directory, "short_log", "20190123", "2",
+                               {}, {}, {}, export_xlsx=False)
+        flight_log_code.compile_and_compress(self.directory, ["short_log.flightdata"], "", [""],
+                                             self.directory + "short_log.values")
+        dataset = flight_dataset.FlightDataset.from_file(self.directory + "short_log.values")
+        roll = dataset.channel("att", "roll")
+        self.assertIsNotNone(roll.column)
+        values_list = values_store.values_list_reader(self.directory + "short_log.values")
+        np.testing.assert_equal(values_list[0][1][2][2][2], roll.data)
+        self.assertIsNone(roll.column)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -9,6 +9,7 @@ import unittest
 import os
 import json
 import sys
+import pandas as pd
 from autoflpy.util import flight_log_code
 from datetime import datetime
 from autoflpy.util import nearest_ICAO_finder
@@ -272,6 +273,28 @@ class TestFlightLogCode(unittest.TestCase):
         # Checks that all titles are correct
         self.assertEqual(correct_titles, 12)
 
+    def test_flight_data_time_sorter_columns(self):
+        """Checks how the columns of a data frame are split between the data frames of its time columns"""
+        frame = pd.DataFrame({"Roll_deg_ATT_20190123_Flight2": [1.5, 2.5],
+                              "Time_US_ATT_20190123_Flight2": [3400000, 3500000],
+                              "Action_time_hh:mm_ATT_20190123_Flight2": ["12:00", "12:01"],
+                              "Pitch_deg_ATT_20190123_Flight2": [0.5, 0.25],
+                              "dummy_time_WEATHER_20190123_Flight2": ["N/A", "N/A"],
+                              "Yaw_deg_ATT_20190123_Flight2": [10.0, 20.0]}, index=[5, 6])
+        frame_copy = frame.copy()
+        sorted_frames = flight_log_code.flight_data_time_sorter([frame])
+        # The columns after the last time column are left out.
+        self.assertEqual([["Roll_deg_ATT_20190123_Flight2", "Time_s_ATT_20190123_Flight2"],
+                          ["Action_time_hh:mm_ATT_20190123_Flight2", "Pitch_deg_ATT_20190123_Flight2",
+                           "dummy_time_WEATHER_20190123_Flight2"]],
+                         [list(sorted_frame.columns) for sorted_frame in sorted_frames])
+        # Times are changed to seconds, and text is kept as it is.
+        self.assertEqual([3.4, 3.5], list(sorted_frames[0]["Time_s_ATT_20190123_Flight2"]))
+        self.assertEqual(["N/A", "N/A"], list(sorted_frames[1]["dummy_time_WEATHER_20190123_Flight2"]))
+        self.assertEqual([5, 6], list(sorted_frames[1].index))
+        # The data frame given is not changed.
+        pd.testing.assert_frame_equal(frame_copy, frame)
+
     def test_flight_data_and_axis(self):
         # Gets run in the Jupyter Notebook.
         # Loads the data generated previously
@@ -283,6 +306,31 @@ class TestFlightLogCode(unittest.TestCase):
         for item in range(len(expected_titles)):
             self.assertEqual(expected_titles[item], flight_data_and_axis[1][item][0])
 
+    def test_header_parser(self):
+        """Checks the names and units read from column titles"""
+        test_cases = [["Altitude_m_GPS_20190123_2", True, "Altitude", "m"],
+                      ["Groundspeed_mpers_GPS_20190123_2", True, "Groundspeed", "ms$^{-1}$"],
+                      ["Acceleration_mperspers_IMU_20190123_2", True, "Acceleration", "ms$^{-2}$"],
+                      ["Throttle_percent_RCIN_20190123_2", True, "Throttle", "cent$^{-1}$"],
+                      ["Status_GPS_20190123_2", True, "Status", "no unit"],
+                      ["Ground_course_deg_GPS_20190123_2", True, "Ground course", "deg"],
+                      ["Ground_course_deg_GPS_20190123_2", False, "Ground course", "no unit"],
+                      ["Number_of_satellites_GPS_20190123_2", True, "Number of", "satellites"],
+                      ["Time_s_20190123_2", False, "Time", "no unit"],
+                      ["Time", True, "T", "ime"],
+                      ["", True, "", ""]]
+        for column, unit_present, name, unit in test_cases:
+            header = flight_log_code.header_parser(column, unit_present)
+            self.assertEqual([name, unit], [header.name, header.unit])
+        self.assertEqual(("Altitude", "m", "GPS", "20190123", "2"),
+                         flight_log_code.header_parser("Altitude_m_GPS_20190123_2"))
+        self.assertEqual([None, None, None], list(flight_log_code.header_parser("Time")[2:]))
+        # Titles with more than five parts follow the title before them.
+        frame = pd.DataFrame([[1, 2, 3]], columns=["Status_GPS_20190123_2", "Ground_course_deg_GPS_20190123_2",
+                                                   "Time_s_GPS_20190123_2"])
+        self.assertEqual([["Status", "no unit"], ["Ground course", "no unit"], ["Time", "s"]],
+                         [channel[:2] for channel in flight_log_code.flight_data_and_axis([frame])[1][0][1:]])
+
     def test_file_type_finder(self):
         # Detects xlsx files from the test_files folder
         detected_files = flight_log_code.file_type_finder(self.base_path, ".xlsx")
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the flight_store.py code.
+
+@author Adrian Weishaeupl (aw6g15@soton.ac.uk)
+"""
+
+from autoflpy.util import flight_store
+from autoflpy.util import flight_log_code
+from autoflpy.util import log_to_xlsx
+from autoflpy.util import nearest_ICAO_finder
+import unittest
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+
+class TestFlightStore(unittest.TestCase):
+
+    def setUp(self):
+        # Create variables and assign directories before any test.
+        base_path = os.path.join(os.path.dirname(__file__),
+                                 "test_files") + os.sep
+        # Tidies up the base path for python.
+        self.base_path = base_path.replace(os.sep, "/")
+        self.output_path = tempfile.mkdtemp()
+        self.store_path = self.output_path + os.sep + "test" + flight_store.STORE_EXTENSION
+
+    def tearDown(self):
+        shutil.rmtree(self.output_path)
+
+    def short_log_reader(self, excel_file_name, streaming=False, export_xlsx=False):
+        """Runs the log reader on the short test log."""
+        log_to_xlsx.log_reader(self.base_path + "test_short_log.log", self.base_path + "test_name_converter_list.txt",
+                               self.base_path + "test_data_sources.txt", self.output_path, excel_file_name,
+                               "20190123", "2", {"Temperature_C": 10.2}, {"Runway_surface": "Grass"}, {},
+                               streaming=streaming, export_xlsx=export_xlsx)
+
+    def test_store_format_selector(self):
+        """Tests for store_format_selector()"""
+        self.assertEqual("npy", flight_store.store_format_selector("npy"))
+        if flight_store.parquet_available is False:
+            # Falls back to .npy files when pyarrow is missing
+            self.assertEqual("npy", flight_store.store_format_selector())
+            self.assertEqual("npy", flight_store.store_format_selector("parquet"))
+        with self.assertRaises(ValueError):
+            flight_store.store_format_selector("xlsx")
+
+    def test_store_writer_and_reader(self):
+        """Tests that the sheets saved to a flight store are read back as data frames"""
+        columns = [np.array([1.5, np.nan]), np.array(["a", "b"]), np.array([100, 200], dtype=np.int64)]
+        # Headings do not need to be unique
+        headings = ["Value_m_TEST_20190123_Flight2", "Value_m_TEST_20190123_Flight2", "Time_US_TEST_20190123_Flight2"]
+        sheets = [flight_store.sheet_writer(self.store_path, 0, "TEST", headings, columns, "npy"),
+                  flight_store.metadata_sheet("WEATHER_DATA", ["Temperature_C_WEATHER", "dummy_time_WEATHER"],
+                                              [10.2, "N/A"])]
+        flight_store.manifest_writer(self.store_path, sheets, "npy")
+
+        frame_list = flight_store.store_reader(self.store_path)
+        self.assertEqual(2, len(frame_list))
+        self.assertEqual(headings, list(frame_list[0].columns))
+        self.assertEqual(np.int64, frame_list[0].iloc[:, 2].dtype)
+        self.assertEqual([100, 200], frame_list[0].iloc[:, 2].tolist())
+        self.assertEqual(["a", "b"], frame_list[0].iloc[:, 1].tolist())
+        self.assertTrue(np.isnan(frame_list[0].iloc[1, 0]))
+        # "N/A" is read as NaN, as it is from an xlsx file
+        self.assertEqual(10.2, frame_list[1].iloc[0, 0])
+        self.assertTrue(np.isnan(frame_list[1].iloc[0, 1]))
+        self.assertEqual([100, 200], flight_store.store_column_reader(self.store_path, "TEST", 2).tolist())
+        with self.assertRaises(KeyError):
+            flight_store.store_column_reader(self.store_path, "GPS", 0)
+
+    def test_sheet_appender(self):
+        """Tests that rows added to a saved sheet are read back after the rows saved before"""
+        columns = [np.array([1, 2], dtype=np.int64), np.array(["a", "b"])]
+        sheet = flight_store.sheet_writer(self.store_path, 0, "TEST", ["Value", "Text"], columns, "npy")
+        flight_store.sheet_appender(self.store_path, sheet, [np.array([3], dtype=np.int64), np.array(["c"])], "npy")
+        self.assertEqual(3, sheet["rows"])
+        self.assertEqual([1, 2, 3], flight_store.sheet_reader(self.store_path, sheet, "npy")[0].tolist())
+        # The types change as they would if the columns were joined with np.concatenate().
+        flight_store.sheet_appender(self.store_path, sheet, [np.array([4.5]), np.array(["longer text"])], "npy")
+        columns = flight_store.sheet_reader(self.store_path, sheet, "npy", memory_map=True)
+        self.assertEqual(np.float64, columns[0].dtype)
+        self.assertEqual([1.0, 2.0, 3.0, 4.5], columns[0].tolist())
+        self.assertEqual(["a", "b", "c", "longer text"], columns[1].tolist())
+        # Only the rows in the manifest entry are read.
+        sheet["rows"] = 2
+        self.assertEqual(["a", "b"], flight_store.sheet_reader(self.store_path, sheet, "npy")[1].tolist())
+
+    def test_log_reader_store(self):
+        """Tests that the flight store saved by the log reader holds the same data as the xlsx file"""
+        self.short_log_reader("short_log", export_xlsx=True)
+        store_frames = flight_log_code.flight_data(self.output_path + os.sep,
+                                                   "short_log" + flight_store.STORE_EXTENSION)
+        xlsx_frames = flight_log_code.flight_data(self.output_path + os.sep, "short_log.xlsx")
+        self.assertEqual(len(xlsx_frames), len(store_frames))
+        for store_frame, xlsx_frame in zip(store_frames, xlsx_frames):
+            pd.testing.assert_frame_equal(xlsx_frame, store_frame, check_dtype=False)
+        # Time stamps stay as integer microseconds
+        self.assertEqual(np.int64, store_frames[0]["Time_US_GPS_20190123_Flight2"].dtype)
+
+    def test_log_reader_xlsx_overflow(self):
+        """Tests that message types with too many rows for an xlsx sheet are split across sheets, which are read back
+        as one data frame, or decimated"""
+        xlsx_max_rows = log_to_xlsx.XLSX_MAX_ROWS
+        # 20 rows and the heading line per sheet, so the 100 rows of VIBE need 5 sheets.
+        log_to_xlsx.XLSX_MAX_ROWS = 21
+        try:
+            for xlsx_overflow in ["split", "decimate"]:
+                log_to_xlsx.log_reader(self.base_path + "test_short_log.log",
+                                       self.base_path + "test_name_converter_list.txt",
+                                       self.base_path + "test_data_sources.txt", self.output_path, xlsx_overflow,
+                                       "20190123", "2", {}, {}, {}, export_xlsx=True, xlsx_overflow=xlsx_overflow)
+        finally:
+            log_to_xlsx.XLSX_MAX_ROWS = xlsx_max_rows
+        workbook = load_workbook(self.output_path + os.sep + "split.xlsx", read_only=True)
+        self.assertEqual(["GPS", "BARO", "ATT", "ATT.2", "ATT.3", "VIBE", "VIBE.2", "VIBE.3", "VIBE.4", "VIBE.5",
+                          "WEATHER_DATA", "RUNWAY_DATA", "AIRCRAFT_DATA"], workbook.sheetnames)
+        workbook.close()
+        store_frames = flight_log_code.flight_data(self.output_path + os.sep, "split" + flight_store.STORE_EXTENSION)
+        xlsx_frames = flight_log_code.flight_data(self.output_path + os.sep, "split.xlsx")
+        self.assertEqual(len(store_frames), len(xlsx_frames))
+        for store_frame, xlsx_frame in zip(store_frames, xlsx_frames):
+            pd.testing.assert_frame_equal(xlsx_frame, store_frame, check_dtype=False)
+        # Every 5th row of VIBE and every 3rd row of ATT are written when decimating.
+        xlsx_frames = flight_log_code.flight_data(self.output_path + os.sep, "decimate.xlsx")
+        self.assertEqual(len(store_frames), len(xlsx_frames))
+        for store_frame, xlsx_frame, step in zip(store_frames, xlsx_frames, [1, 1, 3, 5, 1, 1, 1]):
+            pd.testing.assert_frame_equal(xlsx_frame, store_frame.iloc[::step].reset_index(drop=True),
+                                          check_dtype=False)
+        with self.assertRaises(ValueError):
+            log_to_xlsx.log_reader(self.base_path + "test_short_log.log", "", "", self.output_path, "truncate",
+                                   "20190123", "2", {}, {}, {}, xlsx_overflow="truncate")
+
+    def test_log_reader_without_xlsx(self):
+        """Tests that the xlsx file is only written when asked for"""
+        self.short_log_reader("short_log")
+        self.assertFalse(os.path.exists(self.output_path + os.sep + "short_log.xlsx"))
+        self.assertTrue(os.path.exists(self.output_path + os.sep + "short_log" + flight_store.STORE_EXTENSION + os.sep
+                                       + flight_store.MANIFEST_NAME))
+        # The UAV position is read from the store
+        uav_position = nearest_ICAO_finder.uav_lat_long(self.output_path + os.sep,
+                                                        "short_log" + flight_store.STORE_EXTENSION)
+        self.assertEqual(49.9544292, uav_position[0][0])
+        self.assertEqual(-6.3687961, uav_position[1][0])
+
+    def test_log_reader_streaming_store(self):
+        """Tests that streaming saves the same flight store"""
+        frame_lists = []
+        for streaming in [False, True]:
+            self.short_log_reader("short_log_" + str(streaming), streaming=streaming)
+            frame_lists.append(flight_log_code.flight_data(self.output_path + os.sep, "short_log_" + str(streaming) +
+                                                           flight_store.STORE_EXTENSION))
+        for frame, streaming_frame in zip(frame_lists[0], frame_lists[1]):
+            pd.testing.assert_frame_equal(frame, streaming_frame)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the log_index.py code.
+
+@author Adrian Weishaeupl (aw6g15@soton.ac.uk)
+"""
+
+from autoflpy.util import log_index, log_ingestion
+import unittest
+import os
+import shutil
+import tempfile
+import numpy as np
+
+
+class TestLogIndex(unittest.TestCase):
+
+    def setUp(self):
+        # Create variables and assign directories before any test.
+        base_path = os.path.join(os.path.dirname(__file__),
+                                 "test_files") + os.sep
+        # Tidies up the base path for python.
+        self.base_path = base_path.replace(os.sep, "/")
+        # The index is saved next to the log, so a copy of the log is used.
+        self.directory = tempfile.mkdtemp()
+        self.log_file_path = self.directory + os.sep + "test_short_log.log"
+        shutil.copy(self.base_path + "test_short_log.log", self.log_file_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_index_builder(self):
+        """Tests that the lines read using the index are the same as those sorted by log_ingestor()"""
+        fmt_lines, message_data = log_ingestion.log_ingestor(log_ingestion.log_line_reader(self.log_file_path))
+        # The empty line after the last new line character is not indexed
+        message_data.pop("")
+        index = log_index.index_builder(self.log_file_path)
+        self.assertEqual(fmt_lines, index["fmt_lines"])
+        self.assertEqual(sorted(message_data), sorted(index["message_types"]))
+        for message_type in message_data:
+            self.assertEqual(len(message_data[message_type]), index["message_types"][message_type]["rows"])
+            self.assertEqual(message_data[message_type],
+                             log_index.index_line_reader(self.log_file_path, index, message_type))
+        self.assertEqual([], log_index.index_line_reader(self.log_file_path, index, "AOA"))
+
+    def test_line_start_finder(self):
+        """Tests that the lines are found in the same place whichever size of block the log is searched in"""
+        raw = np.memmap(self.log_file_path, dtype=np.uint8, mode="r")
+        starts = log_index.line_start_finder(raw)
+        self.assertEqual(np.int64, starts.dtype)
+        self.assertEqual([0] + [index + 1 for index in range(len(raw)) if raw[index] == ord("\n")], starts.tolist())
+        for block_size in [1, 7, 64, 4096]:
+            np.testing.assert_array_equal(starts, log_index.line_start_finder(raw, block_size))
+        # The message types of the lines are also found the same way in blocks of lines.
+        starts = starts[:-1]
+        lengths = np.diff(np.append(starts, len(raw)))
+        message_types, line_types = log_index.line_type_finder(raw, starts, lengths)
+        for block_lines in [1, 10]:
+            block_types, block_line_types = log_index.line_type_finder(raw, starts, lengths, block_lines)
+            self.assertEqual(message_types, block_types)
+            np.testing.assert_array_equal(line_types, block_line_types)
+        del raw
+
+    def test_index_builder_windows_line_endings(self):
+        """Tests that logs with "\\r\\n" line endings are indexed in the same way"""
+        with open(self.log_file_path) as log_file:
+            log_text = log_file.read()
+        with open(self.log_file_path, "w", newline="\r\n") as log_file:
+            log_file.write(log_text)
+        fmt_lines, message_data = log_ingestion.log_ingestor(log_ingestion.log_line_reader(self.log_file_path))
+        index = log_index.index_builder(self.log_file_path)
+        self.assertEqual(fmt_lines, index["fmt_lines"])
+        self.assertEqual(message_data["MSG"], log_index.index_line_reader(self.log_file_path, index, "MSG"))
+
+    def test_time_checkpoints(self):
+        """Tests that the time checkpoints point to the start of lines with the time stamp given"""
+        index = log_index.index_builder(self.log_file_path, checkpoint_spacing=2 ** 10)
+        self.assertLess(10, len(index["time_checkpoints"]))
+        with open(self.log_file_path, "rb") as log_file:
+            log_data = log_file.read()
+        previous_offset = -1
+        for offset, time_us in index["time_checkpoints"]:
+            self.assertLess(previous_offset, offset)
+            previous_offset = offset
+            self.assertEqual(b"\n", log_data[offset - 1:offset])
+            self.assertEqual(str(time_us), log_data[offset:].split(b"\n")[0].decode().split(", ")[1])
+
+    def test_index_reader(self):
+        """Tests that the index is only returned while the log is unchanged"""
+        self.assertIsNone(log_index.index_reader(self.log_file_path))
+        index = log_index.index_builder(self.log_file_path)
+        self.assertEqual(index, log_index.index_reader(self.log_file_path))
+        # A change in the modification time
+        stat = os.stat(self.log_file_path)
+        os.utime(self.log_file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertIsNone(log_index.index_reader(self.log_file_path))
+        index = log_index.index_builder(self.log_file_path)
+        # A change in the size, with the same modification time
+        with open(self.log_file_path, "a") as log_file:
+            log_file.write("EV, 6000000, 10\n")
+        os.utime(self.log_file_path, ns=(stat.st_atime_ns, index["mtime_ns"]))
+        self.assertIsNone(log_index.index_reader(self.log_file_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the log_ingestion.py code.
+
+@author Adrian Weishaeupl (aw6g15@soton.ac.uk)
+"""
+
+from autoflpy.util import log_ingestion
+import unittest
+import os
+import shutil
+import tempfile
+import numpy as np
+
+
+class TestLogIngestion(unittest.TestCase):
+
+    def setUp(self):
+        # Create variables and assign directories before any test.
+        base_path = os.path.join(os.path.dirname(__file__),
+                                 "test_files") + os.sep
+        # Tidies up the base path for python.
+        self.base_path = base_path.replace(os.sep, "/")
+        self.log_file_path = self.base_path + "test_short_log.log"
+        with open(self.log_file_path) as log_file:
+            self.log_contents = log_file.read().split("\n")
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_log_line_reader(self):
+        """Tests for log_line_reader()"""
+        # Small buffers split most lines across chunks.
+        for buffer_size in [1, 7, 100, 2 ** 20]:
+            log_lines = list(log_ingestion.log_line_reader(self.log_file_path, buffer_size))
+            self.assertEqual(self.log_contents, log_lines)
+
+    def test_log_line_reader_offsets(self):
+        """Tests that reading a log from and up to byte offsets gives the lines between them"""
+        with open(self.log_file_path, "rb") as log_file:
+            log_data = log_file.read()
+        end = log_ingestion.complete_line_offset(self.log_file_path)
+        self.assertEqual(len(log_data), end)
+        middle = log_data.find(b"\n", len(log_data) // 2) + 1
+        for buffer_size in [7, 2 ** 20]:
+            first_lines = list(log_ingestion.log_line_reader(self.log_file_path, buffer_size, end=middle))
+            last_lines = list(log_ingestion.log_line_reader(self.log_file_path, buffer_size, start=middle))
+            # Each part ends with an empty line after its last "\n"
+            self.assertEqual(self.log_contents, first_lines[:-1] + last_lines)
+
+        # A line still being written is not counted as complete
+        with open(self.directory + os.sep + "cut_off.log", "wb") as log_file:
+            log_file.write(log_data[:middle + 5])
+        self.assertEqual(middle, log_ingestion.complete_line_offset(self.directory + os.sep + "cut_off.log", 3))
+
+    def test_line_boundaries(self):
+        """Tests that a log is split into ranges starting at the beginning of lines"""
+        with open(self.log_file_path, "rb") as log_file:
+            log_data = log_file.read()
+        for parts in [1, 2, 7, 1000]:
+            boundaries = log_ingestion.line_boundaries(self.log_file_path, 0, len(log_data), parts)
+            self.assertEqual(0, boundaries[0])
+            self.assertEqual(len(log_data), boundaries[-1])
+            self.assertLessEqual(len(boundaries), parts + 1)
+            self.assertEqual(sorted(set(boundaries)), boundaries)
+            for boundary in boundaries[1:-1]:
+                self.assertEqual(b"\n", log_data[boundary - 1:boundary])
+        # Ranges can start part way through a log
+        start = log_data.find(b"\n", 1000) + 1
+        boundaries = log_ingestion.line_boundaries(self.log_file_path, start, len(log_data), 3)
+        self.assertEqual([start, len(log_data)], [boundaries[0], boundaries[-1]])
+
+    def test_range_parser(self):
+        """Tests that parsing a log in parts gives the same columns as parsing it all at once"""
+        fmt_lines, message_data = log_ingestion.log_ingestor(self.log_contents)
+        self.assertEqual(fmt_lines, log_ingestion.fmt_block_reader(self.log_file_path))
+        selected_fmt_lines = [fmt_line for fmt_line in fmt_lines if fmt_line[3] in ["GPS", "IMU", "MSG", "EV"]]
+        with open(self.log_file_path, "rb") as log_file:
+            boundaries = log_ingestion.line_boundaries(self.log_file_path, 0, len(log_file.read()), 7)
+        part_columns = [log_ingestion.range_parser(self.log_file_path, boundaries[part], boundaries[part + 1],
+                                                   selected_fmt_lines) for part in range(len(boundaries) - 1)]
+        for fmt_line in selected_fmt_lines:
+            chunks = [columns[fmt_line[3]] for columns in part_columns if fmt_line[3] in columns]
+            joined_columns = log_ingestion.column_concatenator(chunks, len(chunks[0]))
+            columns = log_ingestion.message_column_parser(fmt_line, message_data[fmt_line[3]])
+            for joined_column, column in zip(joined_columns, columns):
+                self.assertEqual(column.dtype, joined_column.dtype)
+                self.assertEqual(column.tolist(), joined_column.tolist())
+
+    def test_log_ingestor(self):
+        """Tests for log_ingestor()"""
+        fmt_lines, message_data = log_ingestion.log_ingestor(self.log_contents)
+
+        # Checks that the FMT block is complete and in order
+        self.assertEqual(124, len(fmt_lines))
+        self.assertEqual("FMT", fmt_lines[0][3])
+        self.assertEqual("GPS", fmt_lines[2][3])
+        self.assertEqual("TimeUS,Status,GMS,GWk,NSats,HDop,Lat,Lng,Alt,Spd,GCrs,VZ,U", fmt_lines[2][-1])
+
+        # Checks that every line has been sorted by its message type
+        self.assertEqual(10, len(message_data["GPS"]))
+        self.assertEqual(100, len(message_data["IMU"]))
+        self.assertEqual("EV, 3420000, 10", message_data["EV"][0])
+        self.assertEqual("EV, 5400000, 11", message_data["EV"][1])
+        # Checks that the lines keep the order they were written in
+        self.assertEqual("3400000", message_data["GPS"][0].split(", ")[1])
+        self.assertEqual("5200000", message_data["GPS"][-1].split(", ")[1])
+        # Message types without data are not present
+        self.assertNotIn("AOA", message_data)
+
+    def test_log_ingestor_fmt_block(self):
+        """Tests that only the FMT lines before the first line of data are used as the FMT block"""
+        log_contents = ["FMT, 128, 89, FMT, BBnNZ, Type,Length,Name,Format,Columns",
+                        "FMT, 129, 23, EV, QB, TimeUS,Id",
+                        "EV, 100, 10",
+                        "FMT, 130, 23, AOA, Qff, TimeUS,AOA,SSA",
+                        "EV, 200, 11"]
+        fmt_lines, message_data = log_ingestion.log_ingestor(log_contents)
+
+        self.assertEqual(["FMT", "EV"], [fmt_line[3] for fmt_line in fmt_lines])
+        self.assertEqual(["EV, 100, 10", "EV, 200, 11"], message_data["EV"])
+
+    def test_message_column_parser(self):
+        """Tests for message_column_parser()"""
+        fmt_lines, message_data = log_ingestion.log_ingestor(self.log_contents)
+        gps_fmt_line = [fmt_line for fmt_line in fmt_lines if fmt_line[3] == "GPS"][0]
+        columns = log_ingestion.message_column_parser(gps_fmt_line, message_data["GPS"])
+        # One column per heading in the FMT line
+        self.assertEqual(13, len(columns))
+        # TimeUS is kept as integer microseconds
+        self.assertEqual(np.int64, columns[0].dtype)
+        self.assertEqual(3400000, columns[0][0])
+        self.assertEqual(np.float64, columns[6].dtype)
+        self.assertEqual(49.9544292, columns[6][0])
+
+        # Text containing ", " is kept in one column
+        msg_fmt_line = [fmt_line for fmt_line in fmt_lines if fmt_line[3] == "MSG"][0]
+        columns = log_ingestion.message_column_parser(msg_fmt_line, message_data["MSG"])
+        self.assertEqual(["ArduPlane V3.9.8 (b6cb2b5c), ChibiOS: 42a1b1ac"], columns[1].tolist())
+
+    def test_message_column_parser_missing_values(self):
+        """Tests that values missing from a cut off line are read as NaN"""
+        fmt_line = ["FMT", "129", "23", "EV", "QB", "TimeUS,Id"]
+        columns = log_ingestion.message_column_parser(fmt_line, ["EV, 100, 10", "EV, 200"])
+        self.assertEqual([100, 200], columns[0].tolist())
+        self.assertEqual(np.float64, columns[1].dtype)
+        self.assertEqual(10, columns[1][0])
+        self.assertTrue(np.isnan(columns[1][1]))
+
+    def test_message_column_parser_unsigned(self):
+        """Tests that unsigned 64 bit values above the range of int64 are read as uint64"""
+        fmt_line = ["FMT", "129", "23", "TEST", "QQ", "TimeUS,Value"]
+        lines = ["TEST, 100, 18446744073709551615", "TEST, 200, 5"]
+        number_of_columns = 2
+        for columns in [log_ingestion.message_column_parser(fmt_line, lines),
+                        log_ingestion.row_parser(fmt_line, lines, number_of_columns)]:
+            self.assertEqual(np.int64, columns[0].dtype)
+            self.assertEqual(np.uint64, columns[1].dtype)
+            self.assertEqual([18446744073709551615, 5], columns[1].tolist())
+        # Values too large even for uint64 are read as decimals.
+        columns = log_ingestion.message_column_parser(fmt_line, ["TEST, 100, 99999999999999999999999"])
+        self.assertEqual(np.float64, columns[1].dtype)
+
+    def test_table_parser(self):
+        """Tests that table_parser() reads the same columns as row_parser() for every message type made up of
+        numbers"""
+        fmt_lines, message_data = log_ingestion.log_ingestor(self.log_contents)
+        for fmt_line in fmt_lines:
+            if fmt_line[3] not in message_data or any(character in "nNZMa" for character in fmt_line[4]):
+                continue
+            number_of_columns = len(fmt_line[-1].split(","))
+            columns = log_ingestion.table_parser(fmt_line, message_data[fmt_line[3]], number_of_columns)
+            rows = log_ingestion.row_parser(fmt_line, message_data[fmt_line[3]], number_of_columns)
+            for column, row_column in zip(columns, rows):
+                self.assertEqual(row_column.dtype, column.dtype)
+                self.assertEqual(row_column.tolist(), column.tolist())
+
+    def test_table_parser_extra_values(self):
+        """Tests that lines with more values than columns are left to row_parser()"""
+        fmt_line = ["FMT", "129", "23", "EV", "QB", "TimeUS,Id"]
+        self.assertIsNone(log_ingestion.table_parser(fmt_line, ["EV, 100, 10", "EV, 200, 11, 12"], 2))
+        self.assertIsNone(log_ingestion.table_parser(fmt_line, ["EV, 100, 10, 12, 13", "EV, 200, 11"], 2))
+        columns = log_ingestion.message_column_parser(fmt_line, ["EV, 100, 10", "EV, 200, 11, 12"])
+        self.assertEqual(["10", "11, 12"], columns[1].tolist())
+
+    def test_log_line_sorter(self):
+        """Tests that log_line_sorter() sorts the lines into files in the same way as log_ingestor()"""
+        fmt_lines, message_data = log_ingestion.log_ingestor(self.log_contents)
+        sorted_fmt_lines, message_files = log_ingestion.log_line_sorter(self.log_contents, self.directory)
+        self.assertEqual(fmt_lines, sorted_fmt_lines)
+        self.assertEqual(sorted(message_data), sorted(message_files))
+        gps_fmt_line = [fmt_line for fmt_line in fmt_lines if fmt_line[3] == "GPS"][0]
+        # Reading the file in small chunks gives the same columns as parsing the lines in memory
+        file_columns = log_ingestion.message_file_parser(gps_fmt_line, message_files["GPS"], chunk_size=3)
+        columns = log_ingestion.message_column_parser(gps_fmt_line, message_data["GPS"])
+        for file_column, column in zip(file_columns, columns):
+            self.assertEqual(column.dtype, file_column.dtype)
+            self.assertEqual(column.tolist(), file_column.tolist())
+
+    def test_log_ingestor_message_types(self):
+        """Tests that only the lines of the message types given are kept, without changing the FMT block"""
+        fmt_lines, message_data = log_ingestion.log_ingestor(self.log_contents)
+        filtered_fmt_lines, filtered_message_data = log_ingestion.log_ingestor(self.log_contents, {"GPS", "EV"})
+        self.assertEqual(fmt_lines, filtered_fmt_lines)
+        self.assertEqual(["EV", "GPS"], sorted(filtered_message_data))
+        self.assertEqual(message_data["GPS"], filtered_message_data["GPS"])
+        self.assertEqual(message_data["EV"], filtered_message_data["EV"])
+
+        # The FMT block still ends at the first line of data, even if that line is not kept
+        log_contents = ["FMT, 128, 89, FMT, BBnNZ, Type,Length,Name,Format,Columns",
+                        "EV, 100, 10",
+                        "FMT, 130, 23, AOA, Qff, TimeUS,AOA,SSA"]
+        fmt_lines, message_data = log_ingestion.log_ingestor(log_contents, {"AOA"})
+        self.assertEqual(["FMT"], [fmt_line[3] for fmt_line in fmt_lines])
+        self.assertEqual({}, message_data)
+
+    def test_log_line_sorter_message_types(self):
+        """Tests that log_line_sorter() only writes files for the message types given"""
+        fmt_lines, message_files = log_ingestion.log_line_sorter(self.log_contents, self.directory, {"GPS", "AOA"})
+        self.assertEqual(["GPS"], list(message_files))
+        self.assertEqual(1, len(os.listdir(self.directory)))
+        with open(message_files["GPS"]) as message_file:
+            self.assertEqual(10, len(message_file.readlines()))
+
+
+if __name__ == '__main__':
+    unittest.main()
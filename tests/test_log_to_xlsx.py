@@ -6,10 +6,16 @@ code.
 @author Adrian Weishaeupl (aw6g15@soton.ac.uk)
 """
 
-from autoflpy.util import log_to_xlsx
+from autoflpy.util import flight_store, log_ingestion, log_to_xlsx, time_window
 import unittest
 import os
 import json
+import shutil
+import tempfile
+import tracemalloc
+from functools import partial
+from unittest import mock
+import pandas as pd
 from openpyxl import load_workbook
 from openpyxl.utils import get_column_letter
 
@@ -38,6 +44,24 @@ class TestLogToXlsx(unittest.TestCase):
         self.weather_data = self.data["weather_data"]
         self.runway_data = self.data["runway_data"]
         self.aircraft_data = self.data["aircraft_data"]
+        self.output_path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.output_path)
+
+    def short_log_reader(self, excel_file_name, log_file_path=None, flight_date=None, **options):
+        """Runs the log reader on the short test log, or the log at log_file_path, saving to the output path."""
+        log_to_xlsx.log_reader(self.base_path + "test_short_log.log" if log_file_path is None else log_file_path,
+                               self.name_converter_file_path, self.data_sources_path, self.output_path,
+                               excel_file_name, self.flight_date if flight_date is None else flight_date,
+                               self.flight_number, self.weather_data, self.runway_data, self.aircraft_data, **options)
+
+    def workbook_contents(self, excel_file_name):
+        """Returns the name and rows of each sheet of an xlsx file in the output path."""
+        workbook = load_workbook(self.output_path + os.sep + excel_file_name + ".xlsx", read_only=True)
+        contents = [[sheet, list(workbook[sheet].iter_rows(values_only=True))] for sheet in workbook.sheetnames]
+        workbook.close()
+        return contents
 
     def test_log_reader(self):
         # Make sure the test workbook is closed.
@@ -50,7 +74,8 @@ class TestLogToXlsx(unittest.TestCase):
                                self.flight_number,
                                self.weather_data,
                                self.runway_data,
-                               self.aircraft_data)
+                               self.aircraft_data,
+                               export_xlsx=True)
 
         def worksheet_tester(sheet, cell, expected_answer):
             """
@@ -103,11 +128,268 @@ class TestLogToXlsx(unittest.TestCase):
         # Runs the multi-xlsx generator
         log_to_xlsx.log_reader_multi(log_file_paths, name_converter_file_path, data_sources_path,
                                      excel_file_path, excel_file_names, flight_dates, flight_numbers,
-                                     weather_data_multi, runway_data_multi, aircraft_data_multi)
+                                     weather_data_multi, runway_data_multi, aircraft_data_multi, export_xlsx=True)
 
         # Checks that the second file has been made.
         self.assertTrue(os.path.exists(self.base_path + "test_xlsx_multi.xlsx"))
 
+    def test_log_reader_short_log(self):
+        """Checks the workbook generated from the short test log."""
+        self.short_log_reader("short_log", export_xlsx=True)
+        contents = self.workbook_contents("short_log")
+        # Only the data sources with data in the log are written, in the order of the FMT block.
+        self.assertEqual(["GPS", "BARO", "ATT", "VIBE", "WEATHER_DATA", "RUNWAY_DATA", "AIRCRAFT_DATA"],
+                         [sheet[0] for sheet in contents])
+        rows = contents[0][1]
+        # Checks the headings, with the time column moved to the end.
+        self.assertEqual("Status_unavailable_GPS_20190123_Flight2", rows[0][0])
+        self.assertEqual("Number_of_Satellites_no unit_GPS_20190123_Flight2", rows[0][3])
+        self.assertEqual("Time_US_GPS_20190123_Flight2", rows[0][-1])
+        # Checks the first and last rows of data, which are written as numbers.
+        self.assertEqual(11, len(rows))
+        self.assertEqual(49.9544292, rows[1][5])
+        self.assertEqual(3400000, rows[1][-1])
+        self.assertEqual(5200000, rows[-1][-1])
+        self.assertIsInstance(rows[1][-1], int)
+
+    def test_log_reader_streaming(self):
+        """Checks that the streaming log reader creates the same workbook as the default log reader."""
+        for streaming in [False, True]:
+            self.short_log_reader("streaming_" + str(streaming), streaming=streaming, export_xlsx=True)
+        self.assertEqual(self.workbook_contents("streaming_False"), self.workbook_contents("streaming_True"))
+
+    def test_log_reader_streaming_memory(self):
+        """Checks that the streaming log reader saves each chunk of lines as it is parsed, so that the memory used does
+        not grow with the number of rows saved."""
+        with open(self.base_path + "test_short_log.log") as log_file:
+            fmt_lines = [line for line in log_file if line.startswith("FMT")]
+        log_file_path = self.output_path + os.sep + "long_log.log"
+        with open(log_file_path, "w") as log_file:
+            log_file.writelines(fmt_lines)
+            log_file.writelines("GPS, {}, 3, 1, 2, 10, 1, 5, 5, 1, 2, 3, 4, 1\n".format(3400000 + 10000 * row)
+                                for row in range(100000))
+        # Smaller chunks than usual, so that the log has many more rows than a chunk.
+        with mock.patch.object(log_to_xlsx, "message_file_reader",
+                               partial(log_ingestion.message_file_reader, chunk_size=4096)):
+            tracemalloc.start()
+            try:
+                self.short_log_reader("long_log", log_file_path, streaming=True)
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+        store_path = self.output_path + os.sep + "long_log" + flight_store.STORE_EXTENSION
+        gps_sheet = flight_store.manifest_reader(store_path)["sheets"][0]
+        self.assertEqual(["GPS", 100000], [gps_sheet["name"], gps_sheet["rows"]])
+        # Joining the chunks into whole columns before saving them would hold at least twice as much.
+        saved_size = sum(os.path.getsize(store_path + os.sep + file_name) for file_name in gps_sheet["files"])
+        self.assertLess(peak, saved_size)
+
+    def test_log_reader_resume(self):
+        """Checks that reading a log on from a checkpoint as it grows creates the same workbook as reading the whole
+        log at once, and that the whole log is read again if its start has changed."""
+        with open(self.base_path + "test_short_log.log", "rb") as log_file:
+            log_data = log_file.read()
+        self.short_log_reader("short_log", export_xlsx=True)
+        growing_log_path = self.output_path + os.sep + "growing_log.log"
+        store_path = self.output_path + os.sep + "growing_log" + flight_store.STORE_EXTENSION
+        for streaming in [False, True]:
+            # The log is cut off part way through a line each time it is read.
+            for end in [len(log_data) // 3, 2 * len(log_data) // 3, len(log_data)]:
+                with open(growing_log_path, "wb") as log_file:
+                    log_file.write(log_data[:end])
+                self.short_log_reader("growing_log", growing_log_path, streaming=streaming, export_xlsx=True)
+                self.assertEqual(log_data[:end].rfind(b"\n") + 1, flight_store.checkpoint_reader(store_path)["offset"])
+            self.assertEqual(self.workbook_contents("short_log"), self.workbook_contents("growing_log"))
+            os.remove(growing_log_path)
+            shutil.rmtree(store_path)
+
+        # Changing the start of the log means the whole log is read again.
+        changed_log_data = log_data.replace(b"GPS, 3400000,", b"GPS, 3400001,", 1)
+        with open(growing_log_path, "wb") as log_file:
+            log_file.write(log_data[:len(log_data) // 2])
+        self.short_log_reader("growing_log", growing_log_path, export_xlsx=True)
+        with open(growing_log_path, "wb") as log_file:
+            log_file.write(changed_log_data)
+        self.short_log_reader("changed_log", growing_log_path, export_xlsx=True, resume=False)
+        self.short_log_reader("growing_log", growing_log_path, export_xlsx=True)
+        self.assertEqual(self.workbook_contents("changed_log"), self.workbook_contents("growing_log"))
+
+    def test_log_reader_resume_in_place(self):
+        """Checks that the rows read on from a checkpoint are added onto the columns already saved, without the flight
+        store being written again"""
+        with open(self.base_path + "test_short_log.log", "rb") as log_file:
+            log_data = log_file.read()
+        growing_log_path = self.output_path + os.sep + "growing_log.log"
+        store_path = self.output_path + os.sep + "growing_log" + flight_store.STORE_EXTENSION
+        manifests = []
+        # The log is first read up to the first BARO line, before which the only data source saved is GPS.
+        for end in [log_data.index(b"\nBARO, ") + 1, len(log_data)]:
+            with open(growing_log_path, "wb") as log_file:
+                log_file.write(log_data[:end])
+            self.short_log_reader("growing_log", growing_log_path)
+            manifests.append(flight_store.manifest_reader(store_path))
+            if len(manifests) == 1:
+                first_sheet = manifests[0]["sheets"][0]
+                first_file = os.stat(store_path + os.sep + first_sheet["files"][0])
+        self.short_log_reader("whole_log", growing_log_path, resume=False)
+        # The file of the first column has been added to rather than written again.
+        self.assertEqual(first_file.st_ino, os.stat(store_path + os.sep + first_sheet["files"][0]).st_ino)
+        self.assertEqual(first_sheet["files"], manifests[1]["sheets"][0]["files"])
+        self.assertGreater(manifests[1]["sheets"][0]["rows"], first_sheet["rows"])
+        # Sheets only found in the rest of the log are saved to files of their own.
+        self.assertGreater(len(manifests[1]["sheets"]), len(manifests[0]["sheets"]))
+        file_names = [file_name for sheet in manifests[1]["sheets"] for file_name in sheet.get("files", [])]
+        self.assertEqual(len(file_names), len(set(file_names)))
+        whole_store_path = self.output_path + os.sep + "whole_log" + flight_store.STORE_EXTENSION
+        self.assertEqual([sheet["name"] for sheet in flight_store.manifest_reader(whole_store_path)["sheets"]],
+                         [sheet["name"] for sheet in manifests[1]["sheets"]])
+        for frame, whole_frame in zip(flight_store.store_reader(store_path),
+                                      flight_store.store_reader(whole_store_path)):
+            pd.testing.assert_frame_equal(whole_frame, frame)
+
+    def test_log_reader_index(self):
+        """Checks that reading a log using its sidecar index creates the same workbook as reading it in full."""
+        # The index is saved next to the log, so a copy of the log is used.
+        log_file_path = self.output_path + os.sep + "short_log.log"
+        shutil.copy(self.base_path + "test_short_log.log", log_file_path)
+        # The second read with index=True uses the index saved by the first.
+        for excel_file_name, index in [["full", False], ["index", True], ["saved_index", True]]:
+            self.short_log_reader(excel_file_name, log_file_path, export_xlsx=True, index=index)
+            self.assertEqual(index, os.path.isdir(log_file_path + ".index"))
+        self.assertEqual(self.workbook_contents("full"), self.workbook_contents("index"))
+        self.assertEqual(self.workbook_contents("full"), self.workbook_contents("saved_index"))
+
+    def test_xlsx_exporter(self):
+        """Checks that the xlsx file written from a flight store is the same as the one written by the log reader, and
+        that the xlsx files written in the background are all tried before any failures are raised."""
+        self.short_log_reader("short_log", export_xlsx=True)
+        log_to_xlsx.xlsx_exporter(self.output_path + os.sep + "short_log.flightdata",
+                                  self.output_path + os.sep + "exported.xlsx")
+        self.assertEqual(self.workbook_contents("short_log"), self.workbook_contents("exported"))
+
+        os.remove(self.output_path + os.sep + "short_log.xlsx")
+        exports = log_to_xlsx.xlsx_export_starter(self.output_path, ["missing", "short_log"])
+        with self.assertRaises(Exception) as context:
+            log_to_xlsx.xlsx_export_finisher(exports)
+        self.assertIn("1 of 2 flights: missing", str(context.exception))
+        self.assertTrue(os.path.isfile(self.output_path + os.sep + "short_log.xlsx"))
+        # The failures are only printed if they are not to be raised.
+        os.remove(self.output_path + os.sep + "short_log.xlsx")
+        exports = log_to_xlsx.xlsx_export_starter(self.output_path, ["missing", "short_log"])
+        log_to_xlsx.xlsx_export_finisher(exports, raise_failures=False)
+        self.assertTrue(os.path.isfile(self.output_path + os.sep + "short_log.xlsx"))
+
+    def test_log_reader_time_window(self):
+        """Checks that reading a time window of a log saves the same rows as reading it in full and keeping only
+        those inside the time window."""
+        # The log starts just after 13:18 UTC on the 14th January 2020, so this is 3.5 s to 4.5 s into it.
+        window = [13 + 1097.5 / 3600, 13 + 1098.5 / 3600]
+        log_file_path = self.output_path + os.sep + "short_log.log"
+        shutil.copy(self.base_path + "test_short_log.log", log_file_path)
+        fmt_lines = log_ingestion.fmt_block_reader(log_file_path)
+        window_us = time_window.window_time_us(fmt_lines, "20200114", window, log_file_path)
+        for log_file_path, index in [[log_file_path, False], [log_file_path, True],
+                                     [self.base_path + "test_short_log.bin", False]]:
+            stores = []
+            for excel_file_name, flight_window in [["full", None], ["window", window]]:
+                self.short_log_reader(excel_file_name, log_file_path, "20200114", index=index,
+                                      time_window=flight_window)
+                stores.append(flight_store.store_reader(self.output_path + os.sep + excel_file_name + ".flightdata"))
+            self.assertEqual(len(stores[0]), len(stores[1]))
+            for full_frame, window_frame in zip(*stores):
+                if full_frame.columns[-1].startswith("Time_US"):
+                    time_us = full_frame.iloc[:, -1]
+                    full_frame = full_frame[(time_us >= window_us[0]) & (time_us < window_us[1])]
+                    self.assertLess(0, len(full_frame))
+                    self.assertLess(len(full_frame), len(time_us))
+                pd.testing.assert_frame_equal(full_frame.reset_index(drop=True), window_frame)
+
+    def test_log_reader_parse_workers(self):
+        """Checks that parsing a log in several processes creates the same workbook as parsing it in one."""
+        for parse_workers in [1, 3]:
+            self.short_log_reader("parse_workers_" + str(parse_workers), export_xlsx=True, parse_workers=parse_workers)
+        self.assertEqual(self.workbook_contents("parse_workers_1"), self.workbook_contents("parse_workers_3"))
+
+    def test_log_reader_in_memory(self):
+        """Checks that reading a log in memory returns the data frames read from the flight store, and saves nothing."""
+        for log_file_name in ["test_short_log.log", "test_short_log.bin"]:
+            self.short_log_reader("short_log", self.base_path + log_file_name)
+            store_frames = flight_store.store_reader(self.output_path + os.sep + "short_log" +
+                                                     flight_store.STORE_EXTENSION)
+            frame_lists = log_to_xlsx.log_reader_multi(
+                [self.base_path + log_file_name], self.name_converter_file_path, self.data_sources_path,
+                self.output_path, ["in_memory"], [self.flight_date], [self.flight_number], [self.weather_data],
+                [self.runway_data], [self.aircraft_data], in_memory=True)
+            self.assertEqual(len(store_frames), len(frame_lists[0]))
+            for store_frame, frame in zip(store_frames, frame_lists[0]):
+                pd.testing.assert_frame_equal(store_frame, frame)
+            self.assertEqual(["short_log.flightdata"], sorted(os.listdir(self.output_path)))
+
+    def test_log_reader_bin(self):
+        """Checks that a .bin file creates the same workbook as the .log file converted from it."""
+        for extension in [".log", ".bin"]:
+            self.short_log_reader("short_log_" + extension[1:], self.base_path + "test_short_log" + extension,
+                                  export_xlsx=True)
+        log_contents = self.workbook_contents("short_log_log")
+        bin_contents = self.workbook_contents("short_log_bin")
+        # Checks the sheets and headings
+        self.assertEqual([sheet[0] for sheet in log_contents], [sheet[0] for sheet in bin_contents])
+        for log_sheet, bin_sheet in zip(log_contents, bin_contents):
+            self.assertEqual(log_sheet[1][0], bin_sheet[1][0])
+            self.assertEqual(len(log_sheet[1]), len(bin_sheet[1]))
+        # The .bin values are rounded from float32, so may differ in the last significant figure
+        gps_log_rows = log_contents[0][1][1:]
+        gps_bin_rows = bin_contents[0][1][1:]
+        for log_row, bin_row in zip(gps_log_rows, gps_bin_rows):
+            for log_value, bin_value in zip(log_row, bin_row):
+                self.assertAlmostEqual(log_value, bin_value, places=5)
+        self.assertEqual(49.9544292, gps_bin_rows[0][5])
+        self.assertEqual(3400000, gps_bin_rows[0][-1])
+
+    def test_name_converter_table(self):
+        """Tests for name_converter_table()"""
+        name_table = log_to_xlsx.name_converter_table(self.name_converter_file_path)
+        self.assertEqual(["Latitude", "degrees latitude"], name_table[("GPS", "Lat")])
+        self.assertNotIn(("GPS", "Not_a_heading"), name_table)
+        # The table is reused while the file has not changed
+        self.assertIs(name_table, log_to_xlsx.name_converter_table(self.name_converter_file_path))
+
+        name_converter_file_path = self.output_path + os.sep + "name_converter_list.txt"
+        with open(name_converter_file_path, "w") as name_converter_file:
+            name_converter_file.write("Data Source, Old Variable name, New Variable Name, Unit\n"
+                                      "GPS, Lat, Latitude, deg\nGPS, Lat, Latitude_2, deg\n")
+        # The first entry for a heading is used
+        self.assertEqual({("GPS", "Lat"): ["Latitude", "deg"]},
+                         log_to_xlsx.name_converter_table(name_converter_file_path))
+        with open(name_converter_file_path, "w") as name_converter_file:
+            name_converter_file.write("Data Source, Old Variable name, New Variable Name, Unit\n"
+                                      "GPS, Lng, Longitude, deg\n")
+        # Makes sure the modified time has changed, as some file systems only store it to the second
+        modified_time = os.stat(name_converter_file_path).st_mtime
+        os.utime(name_converter_file_path, (modified_time + 10, modified_time + 10))
+        # Edits to the file are picked up
+        self.assertEqual({("GPS", "Lng"): ["Longitude", "deg"]},
+                         log_to_xlsx.name_converter_table(name_converter_file_path))
+
+    def test_log_reader_multi_workers(self):
+        """Checks that flights are read in parallel and that a flight which fails does not stop the others"""
+        for workers in [1, 2]:
+            excel_file_names = ["short_log_1_" + str(workers), "missing_log_" + str(workers),
+                                "short_log_2_" + str(workers)]
+            log_file_paths = [self.base_path + "test_short_log.log", self.base_path + "missing_log.log",
+                              self.base_path + "test_short_log.bin"]
+            with self.assertRaises(Exception) as context:
+                log_to_xlsx.log_reader_multi(log_file_paths, self.name_converter_file_path, self.data_sources_path,
+                                             self.output_path, excel_file_names, [self.flight_date] * 3,
+                                             ["1", "2", "3"], [self.weather_data] * 3, [self.runway_data] * 3,
+                                             [self.aircraft_data] * 3, export_xlsx=True, workers=workers)
+            # Only the flight which failed is reported, with its error kept as the cause
+            self.assertIn("1 of 3 flights: missing_log_" + str(workers), str(context.exception))
+            self.assertIsInstance(context.exception.__cause__, FileNotFoundError)
+            # The other flights have still been read
+            for excel_file_name in [excel_file_names[0], excel_file_names[2]]:
+                self.assertTrue(os.path.exists(self.output_path + os.sep + excel_file_name + ".xlsx"))
+
 
 if __name__ == '__main__':
     unittest.main()
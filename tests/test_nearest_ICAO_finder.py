@@ -6,10 +6,12 @@ Unittests for the nearest_ICAO_finder code.
 aw6g15@soton.ac.uk 2019
 """
 
-from autoflpy.util import nearest_ICAO_finder
+from autoflpy.util import log_to_xlsx, nearest_ICAO_finder
 import unittest
 import numpy as np
 import os
+import shutil
+import tempfile
 
 
 class TestNearestICAOFinder(unittest.TestCase):
@@ -24,6 +26,10 @@ class TestNearestICAOFinder(unittest.TestCase):
         # Define the variables
         self.excel_file_path = self.base_path
         self.excel_file_name = "test_xlsx.xlsx"
+        self.output_path = tempfile.mkdtemp() + os.sep
+
+    def tearDown(self):
+        shutil.rmtree(self.output_path)
 
     def test_icao_finder(self):
         # Runs icao_finder function
@@ -75,6 +81,16 @@ class TestNearestICAOFinder(unittest.TestCase):
         self.assertEqual(expected_lat_long[0], uav_lat_long[0])
         self.assertEqual(expected_lat_long[1], uav_lat_long[1])
 
+    def test_uav_lat_long_in_memory(self):
+        """Tests that the position found from the data frames read in memory is the one found from the flight store"""
+        arguments = [self.base_path + "test_short_log.log", self.base_path + "test_name_converter_list.txt",
+                     self.base_path + "test_data_sources.txt", self.output_path, "short_log", "20190123", "1", {}, {},
+                     {}]
+        log_to_xlsx.log_reader(*arguments, export_xlsx=False)
+        frame_list = log_to_xlsx.log_reader(*arguments, in_memory=True)
+        np.testing.assert_array_equal(nearest_ICAO_finder.uav_lat_long(self.output_path, "short_log.flightdata"),
+                                      nearest_ICAO_finder.uav_lat_long(None, None, frame_list))
+
     def test_multi_icao_finder(self):
         """Tests the multi_icao_finder()"""
         # Assigns variables
@@ -6,8 +6,9 @@ No tests are currently written for the main plotting methods.
 @author Adrian Weishaeupl (aw6g15@soton.ac.uk)
 """
 
-from autoflpy.util import plotting
+from autoflpy.util import flight_dataset, plotting
 import unittest
+from unittest import mock
 import os
 import pickle as pk
 
@@ -22,7 +23,11 @@ class TestPlotting(unittest.TestCase):
         self.base_path = base_path.replace(os.sep, "/")
 
         self.values_list = pk.load(open(base_path + "test_pickled_data.pkl", "rb"))
-        self.values_list_multi = pk.load(open(base_path + "test_pickled_data_multi.pkl", "rb"))
+        # The data of two flights is only used by test_single_flight_detection.
+        if os.path.exists(base_path + "test_pickled_data_multi.pkl"):
+            self.values_list_multi = pk.load(open(base_path + "test_pickled_data_multi.pkl", "rb"))
+        else:
+            self.values_list_multi = None
 
     def test_manual_time_offset(self):
         """Test for manual_time_offset()"""
@@ -36,8 +41,7 @@ class TestPlotting(unittest.TestCase):
         # Running the method
         values_list_offset = plotting.manual_time_offset(plot_data, time_x_offset, number_of_flights)
 
-        # Loads "clean" values_list data - plotting.manual_time_offset() seems to add the offset to all time data
-        # - no matter what variable it is in. Known to affect self.values_list, plot_data and values_list_offset
+        # Loads "clean" values_list data to compare with.
         values_list = pk.load(open(self.base_path + "test_pickled_data.pkl", "rb"))
 
         # Testing the result
@@ -54,6 +58,13 @@ class TestPlotting(unittest.TestCase):
             self.assertEqual((values_list[0][1][6][7][2][data_point] + time_x_offset[0]),
                              values_list_offset[0][6][7][2][data_point])
 
+        # The values_list given is not changed, so the offset is not added again when it is applied again.
+        self.assertEqual(values_list, self.values_list)
+        values_list_offset = plotting.manual_time_offset(plot_data, time_x_offset, number_of_flights)
+        self.assertEqual(values_list[0][1][0][14][2][-1] + time_x_offset[0], values_list_offset[0][0][14][2][-1])
+        # Columns other than time are the columns of the values_list.
+        self.assertIs(plot_data[0][0][8], values_list_offset[0][0][8])
+
     def test_select_plot_data_single(self):
         """Tests for select_plot_data_single()"""
         # Assign variables
@@ -72,6 +83,44 @@ class TestPlotting(unittest.TestCase):
             self.assertEqual(values_list[0][0][14][2][data_index], plot_data[0][0][1][2][data_index])
             # altitude_data_gps = values_list[0][0][8][2]
             self.assertEqual(values_list[0][0][8][2][data_index], plot_data[0][1][1][2][data_index])
+        # The plot information given is not changed.
+        self.assertEqual([["x", "time", "gps"], ["y", "altitude", "gps"]], plot_information)
+        # The channels found with an index of the values_list given are the same, in any case.
+        index = flight_dataset.channel_index(self.values_list)
+        plot_information = [["x", "Time", "GPS"], ["y", "altitude", "Gps"]]
+        indexed_plot_data = plotting.select_plot_data_single(values_list, plot_information, number_of_flights, index)
+        self.assertIs(plot_data[0][0][1], indexed_plot_data[0][0][1])
+        self.assertIs(plot_data[0][1][1], indexed_plot_data[0][1][1])
+
+    def test_graph_plotter_time_offset(self):
+        """Tests that plotting with a time offset does not change the values_list"""
+        values_list = pk.load(open(self.base_path + "test_pickled_data.pkl", "rb"))
+        for repeat in range(2):
+            plotting.graph_plotter([["y", "altitude", "gps"], ["x", "time", "gps"]], self.values_list,
+                                   time_x_offset=[10])
+            lines = plotting.plt.gca().get_lines()
+            plotting.plt.close("all")
+            self.assertEqual(values_list[0][1][0][14][2][0] + 10, lines[0].get_xdata()[0])
+        self.assertEqual(values_list, self.values_list)
+
+    def test_shared_channel_index(self):
+        """Tests that the channel index of a FlightDataset is built once for all the figures plotted from it"""
+        with mock.patch.object(flight_dataset, "channel_indexer", wraps=flight_dataset.channel_indexer) as indexer, \
+                mock.patch.object(plotting, "channel_indexer", new=indexer):
+            dataset = flight_dataset.FlightDataset(self.values_list)
+            plotting.graph_plotter([["y", "altitude", "gps"], ["x", "time", "gps"]], dataset)
+            lines = plotting.plt.gca().get_lines()
+            plotting.graph_plotter([["y", "roll", "att"], ["x", "time", "att"]], dataset, arm_data=True)
+            plotting.graph_plotter([["y", "altitude", "gps"], ["x", "time", "gps"]], dataset, time_x_offset=[10])
+            plotting.multiaxis_graph_plotter([["y", "altitude", "gps"], ["x", "time", "gps"]],
+                                             [["y", "groundspeed", "gps"], ["x", "time", "gps"]], dataset)
+            plotting.plt.close("all")
+            self.assertEqual(1, indexer.call_count)
+            # A values_list is indexed for each figure.
+            plotting.graph_plotter([["y", "altitude", "gps"], ["x", "time", "gps"]], self.values_list)
+            plotting.plt.close("all")
+            self.assertEqual(2, indexer.call_count)
+        self.assertEqual(self.values_list[0][1][0][8][2], lines[0].get_ydata().tolist())
 
     def test_arm_data_formatting(self):
         """Test for arm_data_plotting()"""
@@ -97,6 +146,8 @@ class TestPlotting(unittest.TestCase):
     def test_single_flight_detection(self):
         """Tests for single_flight_detection()"""
         # TODO: Test that the values lists are formatted correctly as well
+        if self.values_list_multi is None:
+            self.skipTest("test_pickled_data_multi.pkl is not present")
 
         # Runs the method
         values_list1, flight_data_list1, single_flight1, number_of_flights1 = \
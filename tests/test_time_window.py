@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the time_window.py code.
+
+@author Adrian Weishaeupl (aw6g15@soton.ac.uk)
+"""
+
+from autoflpy.util import log_index, log_ingestion, time_window
+import calendar
+import unittest
+import os
+import shutil
+import tempfile
+import numpy as np
+
+
+class TestTimeWindow(unittest.TestCase):
+
+    def setUp(self):
+        # Create variables and assign directories before any test.
+        base_path = os.path.join(os.path.dirname(__file__),
+                                 "test_files") + os.sep
+        # Tidies up the base path for python.
+        self.base_path = base_path.replace(os.sep, "/")
+        self.log_file_path = self.base_path + "test_short_log.log"
+        self.fmt_lines, self.message_data = log_ingestion.log_ingestor(
+            log_ingestion.log_line_reader(self.log_file_path))
+        # The first GPS message of the log is at 13:18:17.4 UTC on the 14th January 2020.
+        self.first_gps_us = calendar.timegm((2020, 1, 14, 13, 18, 17)) * 10 ** 6 + 400000
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_window_times(self):
+        """Tests the start and end of the time window in seconds since 1970"""
+        midnight = calendar.timegm((2020, 1, 14, 0, 0, 0))
+        self.assertEqual((midnight + 9 * 3600, midnight + 10.5 * 3600),
+                         time_window.window_times("20200114", "9", "10.5"))
+        # A window over midnight ends on the next day.
+        self.assertEqual((midnight + 23 * 3600, midnight + 25 * 3600), time_window.window_times(20200114, 23, 1))
+
+    def test_gps_clock_offset(self):
+        """Tests that the GPS time of the log is converted to the time since 1970"""
+        gps_fmt_line = [data for data in self.fmt_lines if data[3] == "GPS"][0]
+        number_of_columns = len(gps_fmt_line[-1].split(","))
+        rows = [log_ingestion.line_splitter(line, number_of_columns) for line in self.message_data["GPS"]]
+        offset = time_window.gps_clock_offset(gps_fmt_line, rows)
+        self.assertEqual(self.first_gps_us, offset + 3400000)
+        # Messages without a GPS fix are skipped.
+        no_fix = [row[:] for row in rows[:3]]
+        for row in no_fix:
+            row[3] = "0"
+        self.assertEqual(offset, time_window.gps_clock_offset(gps_fmt_line, no_fix + rows))
+        self.assertIsNone(time_window.gps_clock_offset(gps_fmt_line, no_fix))
+        self.assertIsNone(time_window.gps_clock_offset(["FMT", "128", "89", "FMT", "BBnNZ", "Type,Length"], rows))
+
+    def test_window_time_us(self):
+        """Tests the time window in the time stamps of the log"""
+        window_us = time_window.window_time_us(self.fmt_lines, "20200114", [13 + 1097.5 / 3600, 13 + 1098.5 / 3600],
+                                               self.log_file_path)
+        self.assertEqual([3500000, 4500000], [round(time_us, -3) for time_us in window_us])
+        # A log without GPS messages
+        self.assertIsNone(time_window.window_time_us(
+            [data for data in self.fmt_lines if data[3] != "GPS"], "20200114", [13, 14], self.log_file_path))
+
+    def test_window_byte_range(self):
+        """Tests that the part of the log found holds every line inside the time window"""
+        with open(self.log_file_path, "rb") as log_file:
+            log_data = log_file.read()
+        message_types = time_window.timed_types(self.fmt_lines)
+        # Makes the binary search go down to single lines.
+        search_resolution = time_window.SEARCH_RESOLUTION
+        time_window.SEARCH_RESOLUTION = 1
+        try:
+            for window_us in [[4000000, 4500000], [0, 4000000], [5000000, 9000000], [8000000, 9000000]]:
+                start, end = time_window.window_byte_range(self.log_file_path, self.fmt_lines, [
+                    window_us[0] + time_window.MARGIN_US, window_us[1] - time_window.MARGIN_US], 0, len(log_data))
+                self.assertTrue(start == 0 or log_data[start - 1:start] == b"\n")
+                self.assertTrue(end == len(log_data) or log_data[end - 1:end] == b"\n")
+                for line in log_data.decode().split("\n"):
+                    values = line.split(", ")
+                    if values[0] in message_types and window_us[0] <= int(values[1]) < window_us[1]:
+                        self.assertIn(line + "\n", log_data[start:end].decode())
+        finally:
+            time_window.SEARCH_RESOLUTION = search_resolution
+
+    def test_checkpoint_byte_range(self):
+        """Tests that the part of the log looked up from the time checkpoints of its index holds every line inside the
+        time window, without the log being read"""
+        log_file_path = self.directory + os.sep + "test_short_log.log"
+        shutil.copy(self.log_file_path, log_file_path)
+        time_checkpoints = log_index.index_builder(log_file_path, checkpoint_spacing=2 ** 10)["time_checkpoints"]
+        with open(self.log_file_path, "rb") as log_file:
+            log_data = log_file.read()
+        message_types = time_window.timed_types(self.fmt_lines)
+        offsets = [offset for offset, time_us in time_checkpoints]
+        for window_us in [[4000000, 4500000], [0, 4000000], [5000000, 9000000], [8000000, 9000000]]:
+            # The log has been removed, so it cannot be searched.
+            start, end = time_window.window_byte_range(log_file_path, self.fmt_lines, [
+                window_us[0] + time_window.MARGIN_US, window_us[1] - time_window.MARGIN_US], 0, len(log_data),
+                time_checkpoints)
+            self.assertTrue(start == 0 or start in offsets)
+            self.assertTrue(end == len(log_data) or end in offsets)
+            for line in log_data.decode().split("\n"):
+                values = line.split(", ")
+                if values[0] in message_types and window_us[0] <= int(values[1]) < window_us[1]:
+                    self.assertIn(line + "\n", log_data[start:end].decode())
+        # The window is looked up within the part of the log given.
+        self.assertEqual((offsets[2], offsets[3]), time_window.checkpoint_byte_range(
+            time_checkpoints, [0, 10 ** 12], offsets[2], offsets[3]))
+        # Only part of the log is read for a window at its start or end.
+        self.assertLess(time_window.checkpoint_byte_range(time_checkpoints, [2000000, 3000000], 0, len(log_data))[1],
+                        len(log_data))
+        self.assertLess(0, time_window.checkpoint_byte_range(time_checkpoints, [4700000, 4800000], 0,
+                                                             len(log_data))[0])
+
+    def test_window_trimmer(self):
+        """Tests that only the rows inside the time window are kept"""
+        fmt_line = ["FMT", "1", "1", "TEST", "Qf", "TimeUS,Value"]
+        columns = [np.array([1, 2, 3, 4, 5], dtype=np.int64), np.array([1.5, 2.5, 3.5, 4.5, 5.5])]
+        trimmed = time_window.window_trimmer(fmt_line, columns, [2, 4])
+        self.assertEqual([2, 3], trimmed[0].tolist())
+        self.assertEqual([2.5, 3.5], trimmed[1].tolist())
+        # Time stamps out of order
+        columns = [np.array([3, 1, 5, 2], dtype=np.int64), np.array([3.5, 1.5, 5.5, 2.5])]
+        self.assertEqual([3.5, 2.5], time_window.window_trimmer(fmt_line, columns, [2, 4])[1].tolist())
+        # Message types without a time stamp are kept as they are.
+        self.assertIs(columns, time_window.window_trimmer(["FMT", "2", "1", "PARM", "Nf", "Name,Value"], columns,
+                                                          [2, 4]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the values_store.py code.
+
+@author Adrian Weishaeupl (aw6g15@soton.ac.uk)
+"""
+
+from autoflpy.util import flight_log_code, log_to_xlsx, values_store
+import unittest
+import os
+import pickle as pk
+import shutil
+import tempfile
+import numpy as np
+
+
+class TestValuesStore(unittest.TestCase):
+
+    def setUp(self):
+        # Create variables and assign directories before any test.
+        base_path = os.path.join(os.path.dirname(__file__),
+                                 "test_files") + os.sep
+        # Tidies up the base path for python.
+        self.base_path = base_path.replace(os.sep, "/")
+        self.directory = tempfile.mkdtemp() + os.sep
+        log_to_xlsx.log_reader(self.base_path + "test_short_log.log", self.base_path + "test_name_converter_list.txt",
+                               self.base_path + "test_data_sources.txt", self.directory, "short_log", "20190123", "2",
+                               {"Temperature_C": 10.2}, {"Runway_surface": "Grass"}, {}, export_xlsx=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_values_store(self):
+        """Tests that the values_list read from a values store is the same as the pickled values_list"""
+        for file_name in ["short_log.pkl", "short_log.values"]:
+            flight_log_code.compile_and_compress(self.directory, ["short_log.flightdata"], "", [""],
+                                                 self.directory + file_name)
+        pickled_values_list = values_store.values_list_reader(self.directory + "short_log.pkl")
+        values_list = values_store.values_list_reader(self.directory + "short_log.values")
+        # Only the names, units and data sources are read until the data is used.
+        lazy_channel = values_list[0][1][0][1]
+        self.assertIsInstance(lazy_channel, values_store.LazyChannel)
+        self.assertEqual(pickled_values_list[0][1][0][1][:2], [lazy_channel[0], lazy_channel[1]])
+        self.assertFalse(lazy_channel.loaded)
+        np.testing.assert_equal(pickled_values_list, values_list)
+        self.assertTrue(lazy_channel.loaded)
+        np.testing.assert_equal(pickled_values_list[0][1][0][1][2], list(lazy_channel)[2])
+        # The data is the memory mapped column, not a list.
+        self.assertIsInstance(lazy_channel[2], np.ndarray)
+        self.assertFalse(lazy_channel[2].flags.writeable)
+        # Pickled values_lists from older versions, with the data of each channel as a list, are still read.
+        list_values_list = [[flight, [[source[0]] + [[name, unit, np.asarray(data).tolist()]
+                                                     for name, unit, data in source[1:]] for source in sources]]
+                            for flight, sources in pickled_values_list]
+        with open(self.directory + "old.pkl", "wb") as pickle_file:
+            pk.dump(list_values_list, pickle_file)
+        old_values_list = values_store.values_list_reader(self.directory + "old.pkl")
+        self.assertIs(list, type(old_values_list[0][1][0][1]))
+        np.testing.assert_equal(pickled_values_list, old_values_list)
+
+    def test_in_memory_values(self):
+        """Tests that the values_list compiled from the data frames read in memory is the one compiled from the store"""
+        frame_lists = log_to_xlsx.log_reader_multi(
+            [self.base_path + "test_short_log.log"], self.base_path + "test_name_converter_list.txt",
+            self.base_path + "test_data_sources.txt", self.directory, ["short_log"], ["20190123"], ["2"],
+            [{"Temperature_C": 10.2}], [{"Runway_surface": "Grass"}], [{}], in_memory=True)
+        for file_name, flight_frame_lists in [["store.values", None], ["in_memory.values", frame_lists]]:
+            flight_log_code.compile_and_compress(self.directory, ["short_log.flightdata"], "", [""],
+                                                 self.directory + file_name, frame_lists=flight_frame_lists)
+        np.testing.assert_equal(values_store.values_list_reader(self.directory + "store.values"),
+                                values_store.values_list_reader(self.directory + "in_memory.values"))
+
+    def test_values_pickle(self):
+        """Tests that the arrays of a pickle with out-of-band buffers are read from the file without copying them"""
+        for file_name in ["short_log.pkl", "short_log.values"]:
+            flight_log_code.compile_and_compress(self.directory, ["short_log.flightdata"], "", [""],
+                                                 self.directory + file_name)
+        with open(self.directory + "short_log.pkl", "rb") as pickle_file:
+            self.assertEqual(values_store.PICKLE_MAGIC, pickle_file.read(len(values_store.PICKLE_MAGIC)))
+        values_list = values_store.values_list_reader(self.directory + "short_log.pkl", as_arrays=True)
+        array_list = values_store.values_list_reader(self.directory + "short_log.values", as_arrays=True)
+        np.testing.assert_equal(array_list, values_list)
+        data = values_list[0][1][0][1][2]
+        self.assertIsInstance(data, np.ndarray)
+        # The array is a view of the memory mapped file.
+        self.assertFalse(data.flags.owndata)
+        self.assertFalse(data.flags.writeable)
+        self.assertEqual(0, data.ctypes.data % values_store.BUFFER_ALIGNMENT)
+        # The arrays are also read without copying them without as_arrays.
+        data = values_store.values_list_reader(self.directory + "short_log.pkl")[0][1][0][1][2]
+        self.assertIsInstance(data, np.ndarray)
+        self.assertFalse(data.flags.owndata)
+        self.assertFalse(data.flags.writeable)
+
+    def test_report_values_pickle(self):
+        """Tests that the data of a flight log is saved as a pickle with out-of-band buffers if pickle_values is True"""
+        template_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "autoflpy", "data") + os.sep
+        blank_data = flight_log_code.multi_dictionary_data_formatter({}, ["20190123"], "weather_data")
+        flight_log_code.flight_log_maker(template_path, "Default_Template_(Full_Summary).ipynb", self.directory,
+                                         self.directory, ["short_log.flightdata"], "", [""], ["20190123"], ["2"],
+                                         "Flight_Log_", [], [""], [""], self.directory, blank_data, blank_data, False,
+                                         pickle_values=True)
+        self.assertFalse(os.path.exists(self.directory + "short_log.values"))
+        with open(self.directory + "short_log.pkl", "rb") as pickle_file:
+            self.assertEqual(values_store.PICKLE_MAGIC, pickle_file.read(len(values_store.PICKLE_MAGIC)))
+        with open(self.directory + "Flight_Log_short_log.ipynb") as flight_log_file:
+            contents = flight_log_file.read()
+        self.assertIn("short_log.pkl", contents)
+        # The flight log loads the data as a FlightDataset, so its channel index is shared by every figure.
+        self.assertIn("values_list = FlightDataset.from_file(data_file_path)", contents)
+        data = values_store.values_list_reader(self.directory + "short_log.pkl")[0][1][0][1][2]
+        self.assertFalse(data.flags.owndata)
+
+    def test_mixed_types(self):
+        """Tests that channels mixing numbers and text are saved"""
+        values_list = [["Flight 1", [["WEATHER", ["Wind speed", "mps", [1.5, "N/A"]], ["Time", "s", [0.0, 1.0]]]]]]
+        values_store.values_store_writer(self.directory + "mixed.values", values_list)
+        values_store.values_pickle_writer(self.directory + "mixed.pkl", values_list)
+        for file_name in ["mixed.values", "mixed.pkl"]:
+            read_values_list = values_store.values_list_reader(self.directory + file_name)
+            np.testing.assert_equal(values_list, read_values_list)
+            self.assertEqual([1.5, "N/A"], read_values_list[0][1][0][1][2])
+            array_list = values_store.values_list_reader(self.directory + file_name, as_arrays=True)
+            self.assertEqual(object, array_list[0][1][0][1][2].dtype)
+            self.assertEqual(float, array_list[0][1][0][2][2].dtype)
+        # Mixed types are kept in the manifest of a values store.
+        self.assertIs(list, type(values_store.values_list_reader(self.directory + "mixed.values")[0][1][0][1]))
+
+    def test_compact_values_store(self):
+        """Tests that a compact values store is read back as the values saved"""
+        flight_log_code.compile_and_compress(self.directory, ["short_log.flightdata"], "", [""],
+                                             self.directory + "short_log.values")
+        values_list = values_store.values_list_reader(self.directory + "short_log.values")
+        for compression in [None, "zlib", "lzma"]:
+            flight_log_code.compile_and_compress(self.directory, ["short_log.flightdata"], "", [""],
+                                                 self.directory + "compact.values", compact=True,
+                                                 compression=compression)
+            np.testing.assert_equal(values_list, values_store.values_list_reader(self.directory + "compact.values"))
+        # Arrays are read as they were saved.
+        array_list = values_store.values_list_reader(self.directory + "compact.values", as_arrays=True)
+        roll = array_list[0][1][2][2]
+        self.assertEqual(["ATT", "Roll", np.float32], [array_list[0][1][2][0], roll[0], roll[2].dtype])
+        report = {(row[1], row[2]): row[3] for row in values_store.compact_report(self.directory + "compact.values")}
+        self.assertEqual("float32", report[("ATT", "Roll")]["encoding"])
+        self.assertLess(report[("ATT", "Roll")]["error_bound"], 0.005)
+        self.assertEqual("delta", report[("ATT", "Time")]["encoding"])
+        self.assertEqual("integer", report[("GPS", "Status")]["encoding"])
+        # The latitude is logged with more decimal places than float32 keeps.
+        self.assertNotIn("encoding", report[("GPS", "Latitude")])
+        with self.assertRaises(ValueError):
+            flight_log_code.compile_and_compress(self.directory, ["short_log.flightdata"], "", [""],
+                                                 self.directory + "short_log.pkl", compact=True)
+        with self.assertRaises(ValueError):
+            values_store.values_store_writer(self.directory + "compact.values", values_list, compression="zip")
+
+    def test_column_compactor(self):
+        """Tests the encoding chosen for each type of column"""
+        test_cases = [[np.array([0.5, 1.25, -3.75, np.nan]), "float32", np.float32],
+                      [np.array([50.9361234, 50.9361301]), None, np.float64],
+                      [np.array([3.4, 3.5, 3.5, 3.75]), "delta", np.int32],
+                      [np.array([1800.000001, 1799.999999]), None, np.float64],
+                      [np.array([1, 200, 3]), "integer", np.uint8],
+                      [np.array([-1, 200]), "integer", np.int16],
+                      [np.array(["a", "b"]), None, np.dtype("<U1")]]
+        for column, encoding, dtype in test_cases:
+            compact_column, entries = values_store.column_compactor(column)
+            self.assertEqual(encoding, entries.get("encoding"))
+            self.assertEqual(dtype, compact_column.dtype)
+            channel = dict(entries, file="column.npy")
+            np.save(self.directory + "column.npy", compact_column)
+            np.testing.assert_equal(column, values_store.column_reader(self.directory, channel))
+
+    def test_lazy_channel(self):
+        """Tests that a lazy channel behaves as the list it replaces"""
+        data_path = self.directory + "channel.npy"
+        np.save(data_path, np.array([1.5, 2.5, 3.5]))
+        channel = values_store.LazyChannel("Altitude", "m", data_path)
+        self.assertEqual("Altitude", channel[0])
+        self.assertFalse(channel.loaded)
+        name, unit, data = channel
+        self.assertEqual([1.5, 2.5, 3.5], data.tolist())
+        self.assertFalse(data.flags.writeable)
+        self.assertEqual(["Altitude", "m", [1.5, 2.5, 3.5]], channel)
+        self.assertNotEqual(["Altitude", "m", [1.5, 2.5]], channel)
+        # Data replaced by the notebook is not read from the file.
+        channel = values_store.LazyChannel("Altitude", "m", data_path)
+        channel[2] = [1.0]
+        self.assertEqual(["Altitude", "m", [1.0]], channel)
+        # Copies are ordinary lists.
+        channel = values_store.LazyChannel("Altitude", "m", data_path)
+        copied_channel = pk.loads(pk.dumps(channel))
+        self.assertIs(list, type(copied_channel))
+        np.testing.assert_equal(["Altitude", "m", [1.5, 2.5, 3.5]], copied_channel)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the workbook_cache.py code.
+
+@author Adrian Weishaeupl (aw6g15@soton.ac.uk)
+"""
+
+from autoflpy.util import flight_log_code, log_to_xlsx, workbook_cache
+import unittest
+import os
+import shutil
+import tempfile
+import pandas as pd
+
+
+class TestWorkbookCache(unittest.TestCase):
+
+    def setUp(self):
+        # Create variables and assign directories before any test.
+        base_path = os.path.join(os.path.dirname(__file__),
+                                 "test_files") + os.sep
+        # Tidies up the base path for python.
+        self.base_path = base_path.replace(os.sep, "/")
+        self.directory = tempfile.mkdtemp()
+        self.cache_path = self.directory + os.sep + "cache"
+        self.xlsx_path = self.directory + os.sep + "short_log.xlsx"
+        log_to_xlsx.log_reader(self.base_path + "test_short_log.log", self.base_path + "test_name_converter_list.txt",
+                               self.base_path + "test_data_sources.txt", self.directory, "short_log", "20190123", "2",
+                               {}, {}, {}, export_xlsx=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def cached_flight_data(self, content_hash=False):
+        """Reads the test xlsx file using the cache."""
+        return flight_log_code.flight_data(self.directory + os.sep, "short_log.xlsx", use_cache=True,
+                                           cache_path=self.cache_path, content_hash=content_hash)
+
+    def test_flight_data_cache(self):
+        """Tests that the data frames read from the cache are the same as those read from the xlsx file"""
+        frame_list = flight_log_code.flight_data(self.directory + os.sep, "short_log.xlsx", use_cache=False)
+        self.assertIsNone(workbook_cache.cache_reader(self.xlsx_path, self.cache_path))
+        self.assertFalse(os.path.exists(self.cache_path))
+        # Nothing is cached unless it is asked for.
+        cache_path = workbook_cache.CACHE_PATH
+        workbook_cache.CACHE_PATH = self.cache_path
+        try:
+            flight_log_code.flight_data(self.directory + os.sep, "short_log.xlsx")
+        finally:
+            workbook_cache.CACHE_PATH = cache_path
+        self.assertFalse(os.path.exists(self.cache_path))
+        cached_frames = [self.cached_flight_data(), self.cached_flight_data()]
+        for frames in cached_frames:
+            self.assertEqual(len(frame_list), len(frames))
+            for frame, cached_frame in zip(frame_list, frames):
+                pd.testing.assert_frame_equal(frame, cached_frame)
+        self.assertEqual([workbook_cache.cache_entry_name(self.xlsx_path)], os.listdir(self.cache_path))
+
+    def test_cache_invalidation(self):
+        """Tests that a changed xlsx file is read again, and replaces its old cache entry"""
+        self.cached_flight_data()
+        entry_names = os.listdir(self.cache_path)
+        # A change in the modification time
+        stat = os.stat(self.xlsx_path)
+        os.utime(self.xlsx_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertIsNone(workbook_cache.cache_reader(self.xlsx_path, self.cache_path))
+        self.cached_flight_data()
+        self.assertEqual(1, len(os.listdir(self.cache_path)))
+        self.assertNotEqual(entry_names, os.listdir(self.cache_path))
+
+    def test_content_hash(self):
+        """Tests that a change keeping the size and modification time is only found with content_hash"""
+        self.cached_flight_data(content_hash=True)
+        self.assertIsNotNone(workbook_cache.cache_reader(self.xlsx_path, self.cache_path, content_hash=True))
+        stat = os.stat(self.xlsx_path)
+        with open(self.xlsx_path, "r+b") as xlsx_file:
+            xlsx_file.seek(stat.st_size - 1)
+            last_byte = xlsx_file.read(1)
+            xlsx_file.seek(stat.st_size - 1)
+            xlsx_file.write(bytes([last_byte[0] ^ 1]))
+        os.utime(self.xlsx_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        self.assertIsNone(workbook_cache.cache_reader(self.xlsx_path, self.cache_path, content_hash=True))
+
+    def test_cache_evictor(self):
+        """Tests that the least recently used entries are removed once the cache is too large"""
+        frame_list = [pd.DataFrame({"a": list(range(1000))})]
+        file_paths = []
+        for number in range(3):
+            file_paths.append(self.directory + os.sep + "{}.xlsx".format(number))
+            shutil.copy(self.xlsx_path, file_paths[-1])
+            workbook_cache.cache_writer(file_paths[-1], frame_list, self.cache_path)
+            entry_path = self.cache_path + os.sep + workbook_cache.cache_entry_name(file_paths[-1])
+            os.utime(entry_path, ns=(0, number * 10 ** 9))
+        entry_size = os.path.getsize(entry_path)
+        # The first entry is used, so the second is the least recently used.
+        self.assertIsNotNone(workbook_cache.cache_reader(file_paths[0], self.cache_path))
+        workbook_cache.cache_evictor(self.cache_path, 2 * entry_size)
+        self.assertEqual(sorted(workbook_cache.cache_entry_name(file_paths[number]) for number in [0, 2]),
+                         sorted(os.listdir(self.cache_path)))
+
+
+if __name__ == '__main__':
+    unittest.main()